@@ -11,7 +11,10 @@ if current_dir not in sys.path:
 
 # Tenta importar. Se falhar, mostra erro amigável.
 try:
-    from utils_mb import load_bets, load_players, load_contributions, _to_int_list, money
+    from utils_mb import get_snapshot, get_contest, list_contests, bet_numbers, money
+    from indice_mb import player_index
+    from exportar_mb import REPORTS, FORMATS, export_file
+    from razao_mb import ledger_for
 except ImportError as e:
     st.error(f"Erro crítico: Não foi possível importar 'utils_mb'. Detalhes: {e}")
     st.info("Verifique se o arquivo 'utils_mb.py' está na mesma pasta que este script no GitHub.")
@@ -22,17 +25,33 @@ except ImportError as e:
 # ==========================================
 st.set_page_config(page_title="Resumo do Bolão", page_icon="📢", layout="wide")
 
+# --- CONCURSO (ativo por padrão; outro pode vir em ?concurso=ID) ---
+try:
+    concursos = list_contests()
+    concurso = get_contest(st.query_params.get("concurso"))
+except Exception:
+    concursos, concurso = [], None
+
+if len(concursos) > 1:
+    ids = [c.id for c in concursos]
+    escolhido = st.sidebar.selectbox("🎯 Concurso", ids, index=ids.index(concurso.id),
+                                     format_func=lambda cid: next(c.nome for c in concursos if c.id == cid))
+    if escolhido != concurso.id:
+        st.query_params["concurso"] = escolhido
+        st.rerun()
+
 # --- CABEÇALHO ---
-st.title("📢 Transparência do Bolão 2025")
+st.title(f"📢 Transparência do {concurso.nome if concurso else 'Bolão'}")
 st.markdown("Acompanhe a saúde financeira e os jogos do grupo.")
 st.divider()
 
 # --- CARREGAMENTO DE DADOS (COM TRATAMENTO DE ERRO DE CONEXÃO) ---
 try:
     with st.spinner("Sincronizando dados..."):
-        bets = load_bets()
-        players = load_players()
-        contrib = load_contributions()
+        snap = get_snapshot(concurso.id if concurso else None)
+        bets = snap.bets_frame()
+        players = snap.players_frame()
+        contrib = snap.contributions_frame()
 except Exception as e:
     st.error("⚠️ Não foi possível conectar ao banco de dados.")
     st.warning("Se você é o administrador: Verifique se as credenciais (Secrets) estão configuradas corretamente no painel do Streamlit Cloud.")
@@ -40,38 +59,18 @@ except Exception as e:
         st.code(str(e))
     st.stop()
 
-# Configuração de Valores
-VALOR_COTA = 50.00
-JOGOS_POR_COTA = 5
-CUSTO_JOGOS_INDIVIDUAIS = 30.00 # 5 jogos de R$ 6,00
+# Configuração de Valores (por concurso, aba "concursos")
+VALOR_COTA = snap.contest.valor_cota
+JOGOS_POR_COTA = snap.contest.jogos_por_cota
+CUSTO_JOGOS_INDIVIDUAIS = snap.contest.custo_individual # ex.: 5 jogos de R$ 6,00
 
 # Identificar ID do Fundo
-id_fundo = 0
-nome_fundo = "Fundo Bolão"
-if not players.empty:
-    for _, row in players.iterrows():
-        if "fundo" in str(row["nome"]).lower():
-            id_fundo = row["player_id"]
-            nome_fundo = row["nome"]
-            break
-
-# Cruzamento de nomes e Pagamentos
-player_map = {}
-pagamentos_map = {}
-jogos_por_pessoa = {}
-
-if not contrib.empty:
-    pagamentos_map = contrib[contrib["pago"]==True].groupby("player_id")["valor"].sum().to_dict()
+id_fundo = snap.fund_id
+nome_fundo = snap.fund_name
 
-if not players.empty:
-    players["player_id"] = pd.to_numeric(players["player_id"], errors='coerce').fillna(0).astype(int)
-    player_map = players.set_index("player_id")["nome"].to_dict()
-
-# Contagem de jogos por pessoa
-if not bets.empty:
-    bets["player_id"] = pd.to_numeric(bets["player_id"], errors='coerce').fillna(0).astype(int)
-    # Conta quantos jogos cada ID tem
-    jogos_por_pessoa = bets["player_id"].value_counts().to_dict()
+# Pagamentos vêm do livro razão (saldos corridos); jogos por pessoa, do snapshot
+livro = ledger_for(snap)
+jogos_por_pessoa = snap.jogos_por_pessoa
 
 # --- CÁLCULO DE PARTICIPANTES (PAGOS vs PENDENTES) ---
 qtd_jogadores_reais = 0
@@ -84,7 +83,7 @@ if not players.empty:
     qtd_jogadores_reais = len(df_reais)
     
     for pid in df_reais["player_id"].unique():
-        valor_pago = pagamentos_map.get(pid, 0.0)
+        valor_pago = livro.paid(pid)
         # Consideramos "Pagante" quem já pagou pelo menos a cota cheia
         if valor_pago >= VALOR_COTA:
             qtd_pagantes += 1
@@ -105,8 +104,6 @@ df_feitos = pd.DataFrame()
 df_fila = pd.DataFrame()
 
 if not bets.empty:
-    bets["custo_total"] = pd.to_numeric(bets["custo_total"], errors='coerce').fillna(0)
-    
     df_feitos = bets[bets["conferido"] == True].copy()
     df_fila = bets[bets["conferido"] == False].copy()
     
@@ -161,7 +158,44 @@ st.divider()
 # ==========================================
 # ABAS PARA ORGANIZAÇÃO
 # ==========================================
-tab_jogos, tab_status, tab_fundo = st.tabs(["📋 Lista de Jogos", "📊 Status (Pagou/Jogou?)", "🏦 Fundo Extra"])
+tab_meus, tab_jogos, tab_status, tab_fundo = st.tabs(["🙋 Meus Jogos", "📋 Lista de Jogos", "📊 Status (Pagou/Jogou?)", "🏦 Fundo Extra"])
+indice = player_index(snap)
+
+# ------------------------------------------
+# ABA 0: MEUS JOGOS (SÓ OS DA PESSOA)
+# ------------------------------------------
+with tab_meus:
+    st.caption("Digite seu nome para ver apenas os seus jogos e pagamentos.")
+    busca = st.text_input("🔍 Seu nome:", placeholder="Ex.: Maria", key="meus_jogos_busca")
+
+    if busca.strip():
+        achados = indice.search(busca)
+        if not achados:
+            st.info("Nenhum participante encontrado com esse nome.")
+        else:
+            if len(achados) == 1:
+                pessoa = achados[0]
+            else:
+                pessoa = st.selectbox("Quem é você?", achados, format_func=lambda e: e.nome)
+
+            c1, c2, c3 = st.columns(3)
+            c1.metric("💵 Já pago", money(pessoa.pago))
+            c2.metric("🎟️ Jogos", f"{pessoa.conferidos}/{pessoa.jogos}", help="Registrados na Caixa / total cadastrado")
+            c3.metric("💸 Valor dos jogos", money(pessoa.gasto))
+            if not pessoa.fundo and pessoa.pago < VALOR_COTA:
+                st.warning(f"Falta {money(VALOR_COTA - pessoa.pago)} para completar a cota de {money(VALOR_COTA)}.")
+
+            # Só as linhas da pessoa: O(jogos dela)
+            for _, jogo in bets.iloc[pessoa.linhas].iterrows():
+                nums = bet_numbers(jogo)
+                status = "✅ Registrado" if jogo["conferido"] else "⏳ Aguardando registro"
+                cor = "#2e7d32" if jogo["conferido"] else "#ff9800"
+                st.markdown(f"""
+                <div style="background-color: rgba(255, 255, 255, 0.05); padding: 8px 12px; border-radius: 6px; margin-bottom: 8px; border-left: 4px solid {cor};">
+                    <span style="font-family: monospace; font-size: 18px; font-weight: bold; color: {cor}; letter-spacing: 1px;">{"  ".join(f"{n:02d}" for n in nums)}</span><br>
+                    <span style="font-size: 12px; color: #aaa;">{status} • {money(jogo['custo_total'])}</span>
+                </div>
+                """, unsafe_allow_html=True)
 
 # ------------------------------------------
 # ABA 1: LISTA DE JOGOS (AGRUPADA)
@@ -179,24 +213,22 @@ with tab_jogos:
             st.info("Nenhum jogo nesta lista.")
             return
 
-        search = st.text_input("🔍 Buscar participante:", placeholder="Digite o nome...", key=f"search_{cor_titulo}").strip().lower()
+        search = st.text_input("🔍 Buscar participante:", placeholder="Digite o nome...", key=f"search_{cor_titulo}").strip()
+        if search:
+            # Busca no índice (prefixo/fuzzy) e pega só as linhas de quem bateu
+            linhas = [i for pessoa in indice.search(search) for i in pessoa.linhas]
+            df_jogos = df_jogos.loc[df_jogos.index.intersection(linhas)]
 
         # Prepara dados
         dados_processados = []
         for _, row in df_jogos.iterrows():
-            pid = pd.to_numeric(row.get("player_id", 0), errors="coerce")
-            pid = int(pid) if not pd.isna(pid) else 0
-            
-            nome_real = player_map.get(pid, row.get("apostador", "Desconhecido"))
+            nome_real = row["nome"]
             if "fundo" in str(nome_real).lower():
                 nome_real = "🏢 FUNDO DO BOLÃO"
-            
-            if search and search not in str(nome_real).lower():
-                continue
                 
             dados_processados.append({
                 "Nome": nome_real,
-                "Numeros": str(row["numeros"]),
+                "Numeros": bet_numbers(row),
                 "Custo": float(row.get("custo_total", 0)),
                 "ID": str(row['id'])
             })
@@ -220,10 +252,10 @@ with tab_jogos:
                 st.divider()
                 
                 for _, jogo in grupo.iterrows():
-                    lista_nums = _to_int_list(jogo["Numeros"])
+                    lista_nums = jogo["Numeros"]
                     numeros_fmt = "  ".join([f"{n:02d}" for n in lista_nums])
                     qtd_dezenas = len(lista_nums)
-                    tipo_jogo = f"Bolão {qtd_dezenas}" if qtd_dezenas > 6 else "Simples"
+                    tipo_jogo = f"Bolão {qtd_dezenas}" if qtd_dezenas > snap.contest.rules.sorteadas else "Simples"
                     
                     st.markdown(f"""
                     <div style="background-color: rgba(255, 255, 255, 0.05); padding: 8px 12px; border-radius: 6px; margin-bottom: 8px; border-left: 4px solid {cor_titulo}; display: flex; justify-content: space-between; align-items: center;">
@@ -256,7 +288,7 @@ with tab_status:
             nome = row["nome"]
             if pid == id_fundo or "fundo" in str(nome).lower(): continue
                 
-            pago = pagamentos_map.get(pid, 0.0)
+            pago = livro.paid(pid)
             jogos_feitos = jogos_por_pessoa.get(pid, 0)
             
             # Status Jogos
@@ -330,28 +362,39 @@ with tab_status:
 # ------------------------------------------
 with tab_fundo:
     st.subheader("🏦 O Fundo do Bolão")
-    st.markdown("Valores arrecadados além da cota individual (sobras de R$ 30,00), usados para jogos coletivos.")
-
-    # Cálculos Específicos do Fundo
-    arrecadado_fundo = 0.0
-    for pid, valor_pago in pagamentos_map.items():
-        if pid == id_fundo: continue
-        sobra = max(0.0, valor_pago - CUSTO_JOGOS_INDIVIDUAIS)
-        arrecadado_fundo += sobra
+    st.markdown(f"Valores arrecadados além da cota individual (sobras de {money(CUSTO_JOGOS_INDIVIDUAIS)}), usados para jogos coletivos.")
 
-    gasto_fundo_calc = 0.0
-    if not bets.empty:
-        is_fundo_bet = (bets["player_id"] == id_fundo) | (bets["apostador"].str.lower().str.contains("fundo"))
-        gasto_fundo_calc = bets[is_fundo_bet]["custo_total"].sum()
-
-    saldo_fundo_calc = arrecadado_fundo - gasto_fundo_calc
+    # Saldos do Fundo mantidos pelo livro razão (sobras das cotas + transferências - apostas do Fundo)
+    fundo = livro.fund()
+    arrecadado_fundo = float(fundo["arrecadado"])
+    gasto_fundo_calc = float(fundo["gasto"])
+    saldo_fundo_calc = float(fundo["saldo"])
 
     with st.container(border=True):
         c1, c2, c3 = st.columns(3)
-        c1.metric("📥 Total Arrecadado (Fundo)", money(arrecadado_fundo), help="Soma dos R$ 20,00 de cada participante")
+        c1.metric("📥 Total Arrecadado (Fundo)", money(arrecadado_fundo), help=f"Soma dos {money(VALOR_COTA - CUSTO_JOGOS_INDIVIDUAIS)} de cada participante")
         c2.metric("🚀 Jogado pelo Fundo", money(gasto_fundo_calc), help="Valor já apostado em bolões extras")
         cor_f = "normal" if saldo_fundo_calc >= 0 else "inverse"
         c3.metric("💰 Saldo Disponível", money(saldo_fundo_calc), delta="Para novos jogos", delta_color=cor_f)
 
+# ==========================================
+# EXPORTAÇÃO (CSV / EXCEL)
+# ==========================================
+def arquivo_exportado(snap, relatorio, fmt):
+    # Chamado só no clique do download (data=função): o arquivo é gerado em disco e não fica em cache
+    titulo, gerar = REPORTS[relatorio]
+    return export_file(gerar(snap), fmt, titulo)
+
+with st.expander("📥 Exportar dados"):
+    e1, e2 = st.columns([2, 1])
+    relatorio = e1.selectbox("Relatório", list(REPORTS), format_func=lambda k: REPORTS[k][0])
+    fmt = e2.radio("Formato", list(FORMATS), format_func=str.upper, horizontal=True)
+    mime, ext = FORMATS[fmt]
+    st.download_button(
+        f"⬇️ Baixar {REPORTS[relatorio][0]}",
+        data=lambda: arquivo_exportado(snap, relatorio, fmt),
+        file_name=f"{relatorio}_{snap.contest.id}.{ext}", mime=mime, on_click="ignore", use_container_width=True,
+    )
+
 st.markdown("---")
 st.caption("Sistema desenvolvido por João Paulo Rodrigues. Boa sorte! 🍀")
@@ -0,0 +1,361 @@
+"""
+Teste de carga da conferência pública: simula a noite do sorteio sem tocar no Google.
+
+A planilha é trocada por uma cópia em memória (MemorySheet) que imita o Sheets:
+latência por chamada (crescendo com o tamanho da aba), cota de leituras por minuto
+(erro 429 quando estoura) e falhas aleatórias. Sobre ela, N sessões concorrentes
+abrem a página e lançam o sorteio, de dois jeitos:
+
+  apptest  roda a página de verdade com streamlit.testing.v1.AppTest (uma sessão por
+           AppTest, todas no mesmo processo e compartilhando os caches, como no servidor)
+  direto   só o trabalho de dados da página (snapshot, sorteios, pontuação e ranking),
+           sem renderizar — útil onde o AppTest não está disponível
+
+Para cada nível de concorrência o relatório traz os percentis de latência, quantas
+chamadas chegaram ao "Sheets", quantas estouraram a cota, a vazão (sessões/s) e a
+memória retida por sessão. O teto de vazão é o maior nível que ainda cumpre o SLO
+de p95.
+
+Exemplo:
+    python carga_mb.py --sessoes 200 --concorrencia 1 10 50 100 --apostas 3000 --oficial
+"""
+
+import argparse
+import gc
+import importlib.util
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# --- CONFIGURAÇÃO ---
+PUBLIC_PAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages", "01_Conferência Pública.py")
+LATENCY = 0.35            # segundos por chamada ao Sheets
+LATENCY_PER_1K = 0.15     # segundos a mais a cada 1.000 linhas lidas
+JITTER = 0.5              # sigma do fator lognormal aplicado à latência
+READ_QUOTA = 60           # leituras por minuto (cota padrão por usuário do Sheets)
+ERROR_RATE = 0.0          # fração de chamadas que falham com 503
+SLO_P95 = 3.0             # segundos, da abertura da página até o ranking
+APPTEST_TIMEOUT = 120
+PERCENTILES = (50, 90, 95, 99)
+
+class QuotaExceeded(Exception):
+    """Equivalente ao 429 RESOURCE_EXHAUSTED do Sheets."""
+    code = 429
+
+class BackendError(Exception):
+    """Equivalente a um 5xx intermitente do Sheets."""
+    code = 503
+
+def _not_found(name):
+    try:
+        from gspread.exceptions import WorksheetNotFound
+    except ImportError:
+        return KeyError(name)
+    return WorksheetNotFound(name)
+
+# --- PLANILHA EM MEMÓRIA ---
+class MemoryWorksheet:
+    def __init__(self, sheet, title, values):
+        self.sheet = sheet
+        self.title = title
+        self.values = values
+
+    def get_values(self):
+        self.sheet._call("get_values", len(self.values))
+        return [list(r) for r in self.values]
+
+    def clear(self):
+        self.sheet._call("clear", 0, write=True)
+        self.values = []
+
+    def update(self, values):
+        self.sheet._call("update", len(values), write=True)
+        self.values = [["" if v is None else str(v) for v in row] for row in values]
+
+class MemorySheet:
+    """
+    Substituto do gspread.Spreadsheet (só o que o app usa), com latência, cota e
+    falhas injetadas. Thread-safe; `stats` conta as chamadas desde o último reset_stats().
+    """
+
+    id = "memoria"
+
+    def __init__(self, tabs=None, latency=LATENCY, latency_per_1k=LATENCY_PER_1K, jitter=JITTER,
+                 read_quota=READ_QUOTA, error_rate=ERROR_RATE, seed=0):
+        self.tabs = {name: MemoryWorksheet(self, name, values) for name, values in (tabs or {}).items()}
+        self.latency, self.latency_per_1k, self.jitter = latency, latency_per_1k, jitter
+        self.read_quota, self.error_rate = read_quota, error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._reads = []            # instantes das leituras do último minuto
+        self.stats = Counter()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = Counter()
+
+    def _call(self, method, rows=0, write=False):
+        with self._lock:
+            self.stats[method] += 1
+            self.stats["escritas" if write else "leituras"] += 1
+            if not write and self.read_quota:
+                agora = time.monotonic()
+                self._reads = [t for t in self._reads if agora - t < 60]
+                if len(self._reads) >= self.read_quota:
+                    self.stats["cota_estourada"] += 1
+                    raise QuotaExceeded(f"429: cota de {self.read_quota} leituras/min excedida")
+                self._reads.append(agora)
+            falha = self._rng.random() < self.error_rate
+            fator = self._rng.lognormvariate(0, self.jitter) if self.jitter else 1.0
+        time.sleep((self.latency + self.latency_per_1k * rows / 1000) * fator)
+        if falha:
+            with self._lock:
+                self.stats["falhas"] += 1
+            raise BackendError(f"503: falha simulada em {method}")
+
+    def worksheet(self, title):
+        self._call("worksheet")
+        try:
+            return self.tabs[title]
+        except KeyError:
+            raise _not_found(title) from None
+
+    def add_worksheet(self, title, rows=100, cols=12):
+        self._call("add_worksheet", write=True)
+        with self._lock:
+            ws = self.tabs.setdefault(title, MemoryWorksheet(self, title, []))
+        return ws
+
+def fake_tabs(players=300, bets=2000, contributions=600, rules=None, draw=None, seed=0):
+    """Abas com dados sintéticos no formato da planilha (texto, valores em R$ com vírgula)."""
+    from utils_mb import DEFAULT_CONTEST, LEGACY_CONTEST_ID
+    rules = rules or DEFAULT_CONTEST.rules
+    rng = np.random.default_rng(seed)
+    nomes = [f"Jogador {i:04d}" for i in range(1, players + 1)] + ["Fundo Bolão"]
+    jogadores = [["player_id", "nome", "telefone"]] + [[str(i), n, ""] for i, n in enumerate(nomes, 1)]
+
+    apostas = [["id", "player_id", "apostador", "numeros", "custo_total", "conferido", "ts", "descricao"]]
+    tamanhos = np.arange(rules.sorteadas, min(rules.max_dezenas, rules.sorteadas + 3) + 1)
+    pesos = np.where(tamanhos == rules.sorteadas, 6.0, 1.0)   # a maioria é jogo simples
+    for i in range(bets):
+        pid = int(rng.integers(1, len(nomes) + 1))
+        qtd = int(rng.choice(tamanhos, p=pesos / pesos.sum()))
+        numeros = sorted((rng.choice(rules.universo, qtd, replace=False) + 1).tolist())
+        custo = f"{rules.price(qtd):.2f}".replace(".", ",")
+        apostas.append([f"b{i}", str(pid), nomes[pid - 1], str(numeros), custo, "FALSE", "2025-12-30 20:00:00", "Bolão"])
+
+    contribuicoes = [["id", "player_id", "valor", "pago", "data", "obs"]]
+    for i in range(contributions):
+        pid = int(rng.integers(1, players + 1))
+        contribuicoes.append([f"c{i}", str(pid), "R$ 50,00", "TRUE", "2025-12-20 10:00:00", "Pix"])
+
+    tabs = {"jogadores": jogadores, "apostas": apostas, "contribuicoes": contribuicoes}
+    if draw is not None:
+        tabs["sorteios"] = [["concurso", "dezenas", "ts"], [LEGACY_CONTEST_ID, str(sorted(draw)), "2025-12-31 22:00:00"]]
+    return tabs
+
+# --- TROCA DO BACKEND ---
+def reset_caches():
+    """Zera os caches compartilhados, como num servidor que acabou de subir."""
+    import streamlit as st
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+@contextmanager
+def memory_backend(sheet):
+    """Faz o app ler e gravar em `sheet` em vez do Google; páginas estáticas vão para uma pasta temporária."""
+    import estatico_mb
+    import utils_mb as mb
+    original, static_dir = mb.get_db_connection, estatico_mb.STATIC_DIR
+    mb.get_db_connection = lambda: sheet
+    reset_caches()
+    try:
+        with tempfile.TemporaryDirectory(prefix="carga_static_") as tmp:
+            estatico_mb.STATIC_DIR = tmp
+            yield sheet
+    finally:
+        mb.get_db_connection, estatico_mb.STATIC_DIR = original, static_dir
+        reset_caches()
+
+# --- SESSÕES ---
+def apptest_session(draw, page=PUBLIC_PAGE, timeout=APPTEST_TIMEOUT):
+    """Uma visita: abre a página e escolhe as dezenas. Devolve ({fase: segundos}, AppTest)."""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(page, default_timeout=timeout)
+    t0 = time.perf_counter()
+    at.run()
+    t1 = time.perf_counter()
+    _raise_for(at)
+    at.multiselect[0].set_value(sorted(draw)).run()
+    t2 = time.perf_counter()
+    _raise_for(at)
+    return {"abrir": t1 - t0, "conferir": t2 - t1}, at
+
+def _raise_for(at):
+    if len(at.exception):
+        raise RuntimeError(at.exception[0].value)
+
+def direct_session(draw, contest_id=None):
+    """O trabalho de dados da página, sem renderizar. Devolve ({fase: segundos}, ordem do ranking)."""
+    from utils_mb import get_contest, get_snapshot, load_draws
+    t0 = time.perf_counter()
+    contest = get_contest(contest_id)
+    snap = get_snapshot(contest.id)
+    t1 = time.perf_counter()
+    load_draws(contest.id)
+    acertos = snap.score(sorted(draw))["acertos"].astype(np.int64)
+    ordem = np.lexsort((snap.bets.qtd_numeros, -acertos))
+    t2 = time.perf_counter()
+    return {"abrir": t1 - t0, "conferir": t2 - t1}, ordem
+
+RUNNERS = {"apptest": apptest_session, "direto": direct_session}
+
+def default_runner():
+    try:
+        disponivel = importlib.util.find_spec("streamlit.testing.v1") is not None
+    except ImportError:  # nem o streamlit está instalado
+        disponivel = False
+    return "apptest" if disponivel else "direto"
+
+# --- MEDIÇÃO ---
+def _timed(session, draw):
+    try:
+        fases, _ = session(draw)
+        return fases, None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+def _percentiles(values, prefix):
+    if not values:
+        return {f"{prefix}_p{p}": np.nan for p in PERCENTILES} | {f"{prefix}_max": np.nan}
+    arr = np.asarray(values)
+    return {f"{prefix}_p{p}": float(np.percentile(arr, p)) for p in PERCENTILES} | {f"{prefix}_max": float(arr.max())}
+
+def run_level(sheet, session, draw, sessions, concurrency, cold=True):
+    """`sessions` visitas com até `concurrency` simultâneas. Devolve uma linha do relatório."""
+    if cold:
+        reset_caches()
+    sheet.reset_stats()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        resultados = list(pool.map(lambda _: _timed(session, draw), range(sessions)))
+    duracao = time.perf_counter() - inicio
+
+    ok = [f for f, erro in resultados if erro is None]
+    erros = Counter(erro.split(":")[0] for _, erro in resultados if erro is not None)
+    linha = {"concorrencia": concurrency, "sessoes": sessions, "ok": len(ok), "erros": sum(erros.values()),
+             "duracao_s": duracao, "vazao_sessoes_s": len(ok) / duracao if duracao else np.nan}
+    linha |= _percentiles([sum(f.values()) for f in ok], "total")
+    for fase in ("abrir", "conferir"):
+        linha |= _percentiles([f[fase] for f in ok], fase)
+    linha |= {"leituras": sheet.stats["leituras"], "escritas": sheet.stats["escritas"],
+              "cota_estourada": sheet.stats["cota_estourada"], "falhas_backend": sheet.stats["falhas"],
+              "tipos_de_erro": dict(erros)}
+    return linha
+
+def memory_per_session(session, draw, samples=5):
+    """Bytes retidos por sessão viva (tracemalloc), com os caches já aquecidos."""
+    session(draw)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        vivas = [session(draw)[1] for _ in range(samples)]
+        gc.collect()
+        atual = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del vivas
+    return max(0, atual - base) / samples
+
+def load_test(sheet, levels=(1, 10, 50), sessions=100, runner=None, draw=None, cold=True,
+              memory_samples=5, slo=SLO_P95):
+    """
+    Roda os níveis de concorrência em sequência contra `sheet`. Devolve (DataFrame
+    com uma linha por nível, resumo com memória por sessão e teto de vazão).
+    """
+    from utils_mb import get_contest
+    runner = runner or default_runner()
+    session = RUNNERS[runner]
+    with memory_backend(sheet):
+        if draw is None:
+            rules = get_contest().rules
+            draw = sorted((np.random.default_rng(0).choice(rules.universo, rules.sorteadas, replace=False) + 1).tolist())
+        linhas = [run_level(sheet, session, draw, sessions, n, cold) for n in levels]
+        memoria = memory_per_session(session, draw, memory_samples) if memory_samples else np.nan
+    df = pd.DataFrame(linhas)
+    dentro = df[(df["erros"] == 0) & (df["total_p95"] <= slo)]
+    resumo = {
+        "runner": runner,
+        "sorteio": draw,
+        "memoria_por_sessao_mb": memoria / 2**20,
+        "slo_p95_s": slo,
+        "teto_vazao_sessoes_s": float(dentro["vazao_sessoes_s"].max()) if not dentro.empty else 0.0,
+        "teto_concorrencia": int(dentro["concorrencia"].max()) if not dentro.empty else 0,
+    }
+    return df, resumo
+
+def format_report(df, resumo):
+    cols = ["concorrencia", "ok", "erros", "vazao_sessoes_s", "total_p50", "total_p95", "total_p99",
+            "abrir_p95", "conferir_p95", "leituras", "cota_estourada", "falhas_backend"]
+    linhas = [
+        f"Runner: {resumo['runner']} | sorteio: {' '.join(f'{n:02d}' for n in resumo['sorteio'])}",
+        df[cols].to_string(index=False, float_format=lambda v: f"{v:.3f}"),
+        "",
+        f"Memória retida por sessão: {resumo['memoria_por_sessao_mb']:.2f} MB",
+        f"Teto de vazão com p95 <= {resumo['slo_p95_s']:.1f}s e sem erros: "
+        f"{resumo['teto_vazao_sessoes_s']:.1f} sessões/s (concorrência {resumo['teto_concorrencia']})",
+    ]
+    erros = {n: e for n, e in zip(df["concorrencia"], df["tipos_de_erro"]) if e}
+    if erros:
+        linhas.append(f"Erros por nível: {erros}")
+    return "\n".join(linhas)
+
+# --- LINHA DE COMANDO ---
+def build_parser():
+    parser = argparse.ArgumentParser(prog="carga_mb", description="Teste de carga da conferência pública.")
+    parser.add_argument("--sessoes", type=int, default=100, help="visitas por nível de concorrência")
+    parser.add_argument("--concorrencia", type=int, nargs="+", default=[1, 10, 50], help="níveis de sessões simultâneas")
+    parser.add_argument("--runner", choices=list(RUNNERS), default=None, help="padrão: apptest, se disponível")
+    parser.add_argument("--jogadores", type=int, default=300)
+    parser.add_argument("--apostas", type=int, default=2000)
+    parser.add_argument("--contribuicoes", type=int, default=600)
+    parser.add_argument("--oficial", action="store_true", help="grava o sorteio na aba sorteios (conferência do resultado oficial)")
+    parser.add_argument("--latencia", type=float, default=LATENCY, help="segundos por chamada ao Sheets")
+    parser.add_argument("--latencia-mil-linhas", type=float, default=LATENCY_PER_1K)
+    parser.add_argument("--cota", type=int, default=READ_QUOTA, help="leituras por minuto (0 = sem cota)")
+    parser.add_argument("--taxa-erro", type=float, default=ERROR_RATE, help="fração de chamadas com 503")
+    parser.add_argument("--quente", action="store_true", help="não zera os caches entre os níveis")
+    parser.add_argument("--amostras-memoria", type=int, default=5, help="sessões vivas na medição de memória (0 = pula)")
+    parser.add_argument("--slo", type=float, default=SLO_P95, help="p95 máximo aceito, em segundos")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default=None, help="CSV com as linhas do relatório")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    from utils_mb import DEFAULT_CONTEST
+    rules = DEFAULT_CONTEST.rules
+    draw = sorted((np.random.default_rng(args.seed).choice(rules.universo, rules.sorteadas, replace=False) + 1).tolist())
+    tabs = fake_tabs(args.jogadores, args.apostas, args.contribuicoes, rules, draw if args.oficial else None, args.seed)
+    sheet = MemorySheet(tabs, latency=args.latencia, latency_per_1k=args.latencia_mil_linhas,
+                        read_quota=args.cota, error_rate=args.taxa_erro, seed=args.seed)
+    df, resumo = load_test(sheet, args.concorrencia, args.sessoes, args.runner, draw, cold=not args.quente,
+                           memory_samples=args.amostras_memoria, slo=args.slo)
+    print(format_report(df, resumo))
+    if args.output:
+        df.to_csv(args.output, index=False)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
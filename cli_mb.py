@@ -0,0 +1,278 @@
+"""
+Linha de comando do bolão (sem navegador): conferência de sorteios, rateio e saldos.
+
+Exemplos:
+    python cli_mb.py conferir --sorteio "04 12 23 35 47 58" --premio quadras=1200 > ranking.csv
+    python cli_mb.py conferir --arquivo-sorteios sorteios.txt --resumo --workers 8 -o resumo.csv
+    python cli_mb.py rateio --fonte data/bolao_snapshot.npz --sorteio "1 2 3 4 5 6" --premio senas=850000000
+    python cli_mb.py saldos --concurso 2025
+    python cli_mb.py lancar --sorteio "04 12 23 35 47 58"                  (grava e publica a página)
+    python cli_mb.py publicar                                              (regera as páginas dos sorteios gravados)
+    python cli_mb.py simular --sorteios 1000000 --premio senas=850000000 -o chances.csv
+    python cli_mb.py pix extrato_dezembro.ofx -o conciliacao.csv           (só o relatório)
+    python cli_mb.py pix extrato.csv extrato_pj.xlsx --gravar                (lança as novas)
+
+`--fonte` é "planilha" (Google Sheets, padrão) ou o caminho de um snapshot .npz
+(ver snapshot_mb). A saída é CSV escrito em blocos, sem montar a tabela inteira na memória.
+"""
+
+import argparse
+import csv
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# --- CONFIGURAÇÃO ---
+CHUNK_ROWS = 5_000      # linhas de CSV por escrita
+
+# --- FONTE DOS DADOS ---
+def load_source(fonte="planilha", contest_id=None):
+    """Snapshot a partir da planilha ou de um arquivo .npz local."""
+    if fonte and fonte != "planilha":
+        from snapshot_mb import import_snapshot
+        return import_snapshot(fonte, contest_id=contest_id)
+    from utils_mb import get_snapshot
+    return get_snapshot(contest_id)
+
+def parse_draw(text):
+    return sorted({int(n) for n in re.findall(r"\d+", str(text))})
+
+def read_draws(args, rules):
+    sorteios = [parse_draw(s) for s in args.sorteio or []]
+    if args.arquivo_sorteios:
+        with open(args.arquivo_sorteios, encoding="utf-8") as f:
+            sorteios += [parse_draw(linha) for linha in f if linha.strip()]
+    for d in sorteios:
+        if len(d) != rules.sorteadas or d[0] < 1 or d[-1] > rules.universo:
+            raise SystemExit(f"Sorteio inválido para {rules.nome}: {d}")
+    if not sorteios:
+        raise SystemExit("Informe --sorteio ou --arquivo-sorteios.")
+    return sorteios
+
+def parse_prizes(items):
+    """["quadras=1.200,50", ...] -> {"quadras": Decimal("1200.50")} (valores no formato brasileiro ou com ponto)."""
+    from utils_mb import parse_money
+    premios = {}
+    for item in items or []:
+        key, _, valor = item.partition("=")
+        premios[key.strip()] = parse_money(valor)
+        if premios[key.strip()] is None:
+            raise SystemExit(f"Prêmio inválido: {item!r} (use FAIXA=VALOR, ex.: quadras=1.200,50)")
+    return premios
+
+def open_output(path):
+    return open(path, "w", newline="", encoding="utf-8") if path and path != "-" else sys.stdout
+
+def write_rows(out, header, rows):
+    """Escreve as linhas (qualquer iterável) em blocos de CHUNK_ROWS."""
+    writer = csv.writer(out)
+    writer.writerow(header)
+    bloco = []
+    for row in rows:
+        bloco.append(row)
+        if len(bloco) >= CHUNK_ROWS:
+            writer.writerows(bloco)
+            bloco.clear()
+    writer.writerows(bloco)
+    out.flush()
+
+# --- CONFERÊNCIA EM PARALELO ---
+_worker = {}
+
+def _init_worker(lo, hi, rules):
+    _worker.update(lo=lo, hi=hi, rules=rules)
+
+def _score_draw(numeros):
+    from utils_mb import draw_masks, score_masks
+    return score_masks(_worker["lo"], _worker["hi"], *draw_masks(numeros), _worker["rules"])
+
+def score_many(snap, sorteios, workers=None):
+    """Pontua cada sorteio contra todas as apostas; gera os placares na ordem dos sorteios."""
+    args = (np.ascontiguousarray(snap.bets.mascara), np.ascontiguousarray(snap.bets.mascara_hi), snap.contest.rules)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(sorteios) == 1:
+        _init_worker(*args)
+        yield from map(_score_draw, sorteios)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=args) as pool:
+        yield from pool.map(_score_draw, sorteios, chunksize=max(1, len(sorteios) // (workers * 4)))
+
+# --- COMANDOS ---
+def cmd_conferir(args):
+    from rateio_mb import bet_prizes_cents, from_cents
+    snap = load_source(args.fonte, args.concurso)
+    rules = snap.contest.rules
+    sorteios = read_draws(args, rules)
+    premios = parse_prizes(args.premio)
+    faixas = [key for _, key, _ in rules.faixas]
+    ids, nomes, qtd = snap.bets.id, snap.bet_nome, snap.bets.qtd_numeros
+
+    def ranking():
+        for n, (numeros, placar) in enumerate(zip(sorteios, score_many(snap, sorteios, args.workers)), 1):
+            centavos = bet_prizes_cents(placar, premios, rules)
+            sorteio = " ".join(f"{d:02d}" for d in numeros)
+            if args.resumo:
+                yield [n, sorteio, *(int(placar[k].sum()) for k in faixas), from_cents(centavos.sum())]
+                continue
+            ordem = np.lexsort((-centavos, -placar["acertos"].astype(np.int64)))
+            for i in ordem:
+                yield [n, sorteio, ids[i], nomes[i], int(qtd[i]), int(placar["acertos"][i]),
+                       *(int(placar[k][i]) for k in faixas), from_cents(centavos[i])]
+
+    header = (["sorteio", "dezenas", *faixas, "premio"] if args.resumo
+              else ["sorteio", "dezenas", "id", "nome", "qtd_numeros", "acertos", *faixas, "premio"])
+    out = open_output(args.output)
+    try:
+        write_rows(out, header, ranking())
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+def cmd_rateio(args):
+    from rateio_mb import payout
+    snap = load_source(args.fonte, args.concurso)
+    premios = parse_prizes(args.premio)
+    out = open_output(args.output)
+    try:
+        for n, numeros in enumerate(read_draws(args, snap.contest.rules), 1):
+            df = payout(snap, numeros, premios)
+            if not args.todos:
+                df = df[df["total"] > 0]
+            df.insert(0, "sorteio", n)
+            df.to_csv(out, index=False, header=n == 1)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+def cmd_simular(args):
+    from simulador_mb import SIM_SEED, simulate
+    snap = load_source(args.fonte, args.concurso)
+    semente = SIM_SEED if args.semente is None else args.semente
+    sim = simulate(snap, parse_prizes(args.premio), draws=args.sorteios, seed=semente, workers=args.workers)
+    out = open_output(args.output)
+    try:
+        sim.jogadores.to_csv(out, index=False)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"{sim.draws} sorteios (semente {sim.seed}): prêmio em {sim.p_any:.3%} deles.", file=sys.stderr)
+
+def cmd_lancar(args):
+    from utils_mb import save_draw
+    if args.fonte != "planilha":
+        raise SystemExit("lancar só funciona com --fonte planilha.")
+    snap = load_source(args.fonte, args.concurso)
+    for numeros in read_draws(args, snap.contest.rules):
+        if not save_draw(numeros, snap.contest.id):
+            raise SystemExit(f"Não foi possível gravar o sorteio {numeros}.")
+        print(f"Sorteio {' '.join(f'{n:02d}' for n in numeros)} gravado.", file=sys.stderr)
+
+def cmd_publicar(args):
+    from estatico_mb import publish_result, result_url
+    from utils_mb import load_draws
+    snap = load_source(args.fonte, args.concurso)
+    if args.sorteio or args.arquivo_sorteios:
+        sorteios = read_draws(args, snap.contest.rules)
+    else:
+        sorteios = [d["dezenas"] for d in load_draws(snap.contest.id)]
+    if not sorteios:
+        raise SystemExit("Nenhum sorteio gravado para este concurso.")
+    for numeros in sorteios:
+        path = publish_result(snap, numeros)
+        print(result_url(os.path.basename(path)) or path)
+
+def cmd_saldos(args):
+    from exportar_mb import balance_rows
+    linhas = balance_rows(load_source(args.fonte, args.concurso))
+    out = open_output(args.output)
+    try:
+        write_rows(out, next(linhas), linhas)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+def cmd_pix(args):
+    from itertools import chain
+    from pix_mb import COLUNAS, commit_new, read_statement, reconcile
+    if args.gravar and args.fonte != "planilha":
+        raise SystemExit("--gravar só funciona com --fonte planilha.")
+    snap = load_source(args.fonte, args.concurso)
+    relatorio = reconcile(snap, chain.from_iterable(read_statement(p) for p in args.extrato), auto=args.corte)
+    out = open_output(args.output)
+    try:
+        write_rows(out, COLUNAS, relatorio.itertuples(index=False, name=None))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    resumo = relatorio["status"].value_counts().to_dict()
+    print("Conciliação: " + ", ".join(f"{k}={v}" for k, v in sorted(resumo.items())), file=sys.stderr)
+    if args.gravar:
+        from fila_mb import flush
+        n = commit_new(relatorio, snap.contest.id, include_review=args.incluir_revisao)
+        res = flush() if n else {"gravadas": 0, "conflitos": [], "nao_lidas": []}
+        print(f"{n} contribuições lançadas ({res['gravadas']} operação gravada, {len(res['conflitos'])} conflitos).",
+              file=sys.stderr)
+        if res["nao_lidas"]:
+            print(f"Planilha não pôde ser lida ({', '.join(res['nao_lidas'])}): a gravação fica na fila "
+                  f"e é tentada de novo.", file=sys.stderr)
+
+# --- ARGUMENTOS ---
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli_mb", description="Bolão sem navegador.")
+    comum = argparse.ArgumentParser(add_help=False)
+    comum.add_argument("--fonte", default="planilha", help='"planilha" ou caminho de um snapshot .npz')
+    comum.add_argument("--concurso", default=None, help="id do concurso (padrão: o ativo)")
+    comum.add_argument("-o", "--output", default="-", help="arquivo CSV de saída (padrão: stdout)")
+
+    sorteio = argparse.ArgumentParser(add_help=False)
+    sorteio.add_argument("--sorteio", action="append", help='dezenas, ex.: "04 12 23 35 47 58" (pode repetir)')
+    sorteio.add_argument("--arquivo-sorteios", help="arquivo com um sorteio por linha")
+    sorteio.add_argument("--premio", action="append", metavar="FAIXA=VALOR",
+                         help="valor por jogo premiado na faixa, ex.: quadras=1200 (pode repetir)")
+
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p = sub.add_parser("conferir", parents=[comum, sorteio], help="ranking das apostas por sorteio")
+    p.add_argument("--resumo", action="store_true", help="uma linha por sorteio em vez de uma por aposta")
+    p.add_argument("--workers", type=int, default=None, help="processos em paralelo (padrão: todos os núcleos)")
+    p.set_defaults(func=cmd_conferir)
+
+    p = sub.add_parser("rateio", parents=[comum, sorteio], help="quanto cada participante recebe")
+    p.add_argument("--todos", action="store_true", help="inclui quem não recebe nada")
+    p.set_defaults(func=cmd_rateio)
+
+    p = sub.add_parser("simular", parents=[comum], help="Monte Carlo: chance e prêmio médio de cada participante")
+    p.add_argument("--sorteios", type=int, default=1_000_000, help="sorteios aleatórios (padrão: 1.000.000)")
+    p.add_argument("--semente", type=int, default=None, help="semente (padrão: a do simulador)")
+    p.add_argument("--premio", action="append", metavar="FAIXA=VALOR",
+                   help="valor por jogo premiado na faixa, ex.: quadras=1200 (pode repetir)")
+    p.add_argument("--workers", type=int, default=None, help="processos em paralelo (padrão: todos os núcleos)")
+    p.set_defaults(func=cmd_simular)
+
+    p = sub.add_parser("lancar", parents=[comum, sorteio], help="grava o sorteio oficial e publica a página do resultado")
+    p.set_defaults(func=cmd_lancar)
+
+    p = sub.add_parser("publicar", parents=[comum, sorteio],
+                       help="regera as páginas de resultado (padrão: todos os sorteios gravados)")
+    p.set_defaults(func=cmd_publicar)
+
+    p = sub.add_parser("saldos", parents=[comum], help="relatório de pago x gasto por jogador")
+    p.set_defaults(func=cmd_saldos)
+
+    p = sub.add_parser("pix", parents=[comum], help="concilia extratos (CSV/OFX/XLSX) com as contribuições")
+    p.add_argument("extrato", nargs="+", help="arquivo(s) de extrato do banco")
+    p.add_argument("--gravar", action="store_true", help="lança as contribuições novas (sem isto, só o relatório)")
+    p.add_argument("--incluir-revisao", action="store_true", help="lança também os pares de confiança média")
+    p.add_argument("--corte", type=int, default=90, help="nota mínima (0-100) para lançar sem revisão")
+    p.set_defaults(func=cmd_pix)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
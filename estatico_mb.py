@@ -0,0 +1,151 @@
+"""
+Páginas estáticas de resultado: quando o sorteio oficial é lançado (save_draw, ou
+`cli_mb.py lancar` / `publicar`), o resultado completo (resumo, rateio e os cartões de
+todas as apostas) é renderizado uma única vez num HTML autocontido, gravado em static/
+junto com a versão .html.gz. Só se publica com as estimativas padrão de prêmio
+(utils_mb.default_prizes), e cada publicação apaga as versões anteriores do mesmo sorteio.
+
+Quem serve os arquivos é um servidor web/CDN apontado para static/ (gzip_static no
+nginx, por exemplo), em BOLAO_STATIC_URL; a página pública só aponta para lá e oferece
+o arquivo para baixar. O static serving do Streamlit não serve: ele entrega .html como
+text/plain. Visitas nunca geram páginas.
+"""
+
+import gzip
+import hashlib
+import html
+import os
+
+import numpy as np
+
+from utils_mb import join_mask, mask_to_numbers
+
+# --- CONFIGURAÇÃO ---
+STATIC_DIR = os.environ.get("BOLAO_STATIC_DIR", "static")
+STATIC_URL = os.environ.get("BOLAO_STATIC_URL", "")     # ex.: https://cdn.exemplo.com/bolao
+
+CSS = """
+body { background: #0e1117; color: #fafafa; font-family: -apple-system, Segoe UI, Roboto, sans-serif; margin: 0 auto; max-width: 900px; padding: 12px; }
+h1 { font-size: 22px; } h2 { font-size: 16px; text-transform: uppercase; color: #aaa; margin-top: 28px; }
+.ball { display: inline-flex; align-items: center; justify-content: center; width: 30px; height: 30px; border-radius: 50%; font-size: 12px; font-weight: bold; margin: 2px; }
+.hit { background: radial-gradient(circle at 30% 30%, #4CAF50, #1B5E20); color: #fff; }
+.miss { background: #333; color: #777; }
+.draw .ball { width: 40px; height: 40px; font-size: 16px; background: radial-gradient(circle at 30% 30%, #fff, #e0e0e0); color: #333; }
+.panel { background: #111; padding: 16px; border-radius: 16px; text-align: center; border: 1px solid #333; }
+.metrics { display: flex; gap: 8px; flex-wrap: wrap; } .metric { flex: 1; background: #1e1e1e; border-radius: 12px; padding: 12px; text-align: center; }
+.metric b { display: block; font-size: 26px; }
+.card { background: #1e1e1e; border-radius: 12px; padding: 12px; margin-bottom: 10px; border-left: 6px solid #555; }
+.t0 { border-left-color: #FFD700; } .t1 { border-left-color: #4CAF50; } .t2 { border-left-color: #2196F3; }
+.head { display: flex; justify-content: space-between; } .pts { font-size: 20px; font-weight: 900; }
+table { width: 100%; border-collapse: collapse; } td, th { padding: 6px; border-bottom: 1px solid #333; text-align: left; }
+"""
+
+def _brl(valor):
+    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+# --- CAMINHOS ---
+def _draw_prefix(snap, draw_numbers):
+    dezenas = "-".join(f"{n:02d}" for n in sorted(int(n) for n in draw_numbers))
+    return f"resultado_{snap.contest.id}_{dezenas}_"
+
+def result_filename(snap, draw_numbers):
+    """Nome do arquivo: muda se o sorteio ou os dados mudarem."""
+    versao = hashlib.blake2b(snap.version.encode("utf-8"), digest_size=6).hexdigest()
+    return f"{_draw_prefix(snap, draw_numbers)}{versao}.html"
+
+def result_path(snap, draw_numbers):
+    return os.path.join(STATIC_DIR, result_filename(snap, draw_numbers))
+
+def result_url(filename):
+    return f"{STATIC_URL.rstrip('/')}/{filename}" if STATIC_URL else None
+
+# --- RENDERIZAÇÃO ---
+def render_result_html(snap, draw_numbers, premios=None):
+    """HTML completo do resultado (um documento só, CSS embutido)."""
+    from rateio_mb import bet_prizes_cents, distribute, from_cents
+    rules, contest = snap.contest.rules, snap.contest
+    draw = sorted(int(n) for n in draw_numbers)
+    draw_set = set(draw)
+    placar = snap.score(draw)
+    acertos = np.asarray(placar["acertos"]).astype(np.int64)
+    faixas = rules.faixas[:3]
+    esc = html.escape
+
+    partes = [
+        "<!DOCTYPE html><html lang='pt-BR'><head><meta charset='utf-8'>",
+        "<meta name='viewport' content='width=device-width, initial-scale=1'>",
+        f"<title>{esc(contest.nome)} — Resultado</title><style>{CSS}</style></head><body>",
+        f"<h1>🤞 {esc(contest.nome)} — {esc(rules.nome)}</h1>",
+        "<div class='panel draw'>",
+        *(f"<span class='ball'>{n:02d}</span>" for n in draw),
+        "</div><h2>Resumo</h2><div class='metrics'>",
+    ]
+    for ac, _, rot in faixas:
+        partes.append(f"<div class='metric'>{esc(rot)} ({ac})<b>{int((acertos == ac).sum())}</b></div>")
+    partes.append("</div>")
+
+    if premios:
+        centavos = bet_prizes_cents(placar, premios, rules)
+        partes.append(f"<div class='panel' style='margin-top:12px'>💰 Prêmio estimado do bolão<br><b style='font-size:28px'>{_brl(from_cents(centavos.sum()))}</b></div>")
+        rateio = distribute(snap, centavos)
+        rateio = rateio[rateio["total"] > 0]
+        if not rateio.empty:
+            partes.append("<h2>Quanto cada um recebe</h2><table><tr><th>Participante</th><th>Jogos próprios</th><th>Parte do Fundo</th><th>Total</th></tr>")
+            for r in rateio.itertuples(index=False):
+                partes.append(f"<tr><td>{esc(str(r.nome))}</td><td>{_brl(r.individual)}</td><td>{_brl(r.fundo)}</td><td><b>{_brl(r.total)}</b></td></tr>")
+            partes.append("</table>")
+
+    bets = snap.bets
+    ordem = np.lexsort((bets.qtd_numeros, -acertos))
+    partes.append(f"<h2>Ranking ({len(ordem)} jogos)</h2>")
+    for i in ordem:
+        nome = str(snap.bet_nome[i])
+        if "fundo" in nome.lower():
+            nome = "🏢 FUNDO BOLÃO"
+        classe = next((f" t{j}" for j, (ac, _, _) in enumerate(faixas) if acertos[i] == ac), "")
+        bolas = "".join(
+            f"<span class='ball {'hit' if n in draw_set else 'miss'}'>{n:02d}</span>"
+            for n in mask_to_numbers(join_mask(bets.mascara[i], bets.mascara_hi[i]))
+        )
+        partes.append(
+            f"<div class='card{classe}'><div class='head'><div><b>{esc(nome)}</b><br>"
+            f"<small>{int(bets.qtd_numeros[i])} dezenas</small></div><div class='pts'>{acertos[i]}</div></div>"
+            f"<div>{bolas}</div></div>"
+        )
+    partes.append(f"<p><small>Dados: versão {esc(snap.version)}</small></p></body></html>")
+    return "".join(partes)
+
+def _write_atomic(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def _prune(snap, draw_numbers, keep):
+    """Apaga as páginas do mesmo sorteio geradas com versões anteriores dos dados."""
+    prefixo = _draw_prefix(snap, draw_numbers)
+    for nome in os.listdir(STATIC_DIR):
+        if nome.startswith(prefixo) and nome not in (keep, f"{keep}.gz"):
+            try:
+                os.remove(os.path.join(STATIC_DIR, nome))
+            except OSError:
+                pass
+
+def publish_result(snap, draw_numbers):
+    """
+    Gera (ou regera) o .html e o .html.gz do resultado com as estimativas padrão de
+    prêmio e remove as versões antigas; devolve o caminho do .html. Só para o admin.
+    """
+    from utils_mb import default_prizes
+    path = result_path(snap, draw_numbers)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    data = render_result_html(snap, draw_numbers, default_prizes(snap.contest.rules)).encode("utf-8")
+    _write_atomic(path, data)
+    _write_atomic(f"{path}.gz", gzip.compress(data, compresslevel=9, mtime=0))
+    _prune(snap, draw_numbers, os.path.basename(path))
+    return path
+
+def published_result(snap, draw_numbers):
+    """Caminho da página já publicada para esta versão dos dados, ou None (nunca gera)."""
+    path = result_path(snap, draw_numbers)
+    return path if os.path.exists(path) else None
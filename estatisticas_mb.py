@@ -0,0 +1,244 @@
+"""
+Estatísticas materializadas das apostas: frequência por dezena, índice de jogos
+repetidos e histograma de sobreposição entre pares de apostas (quantas dezenas em comum).
+
+Tudo é mantido por delta. Ao inserir ou apagar uma aposta, as listas de postagem
+(dezena -> apostas que a contêm) dão na hora as apostas que dividem alguma dezena com
+ela, e só esses pares são atualizados — custo O(apostas afetadas), em vez de comparar
+todos os pares de novo. Cada sincronização acrescenta ao diário só as apostas que
+mudaram (O(delta)); de CHECKPOINT_EVERY em CHECKPOINT_EVERY mudanças gravamos a foto
+completa e o diário recomeça vazio. A página de estatísticas só lê o que já está pronto.
+"""
+
+import json
+import os
+import threading
+from collections import Counter
+
+from utils_mb import join_mask, mask_to_numbers
+
+# --- CONFIGURAÇÃO ---
+STATS_DIR = os.environ.get("BOLAO_STATS_DIR", "data")
+MIN_LEVEL = 2           # pares com menos dezenas em comum entram só no histograma
+CHECKPOINT_EVERY = 2000 # apostas alteradas entre duas compactações do diário
+
+def _par(a, b):
+    return (a, b) if a < b else (b, a)
+
+# --- ESTADO DE UM CONCURSO ---
+class StatsStore:
+    def __init__(self, contest_id, universo, folder=STATS_DIR):
+        self.contest_id = str(contest_id)
+        self.universo = universo
+        self.valid = (1 << universo) - 1       # dezenas fora do universo são ignoradas
+        self.path = os.path.join(folder, f"estatisticas_{self.contest_id}.json")
+        self.journal = os.path.join(folder, f"estatisticas_{self.contest_id}.jsonl")
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.version = None
+        self.seq = 0
+        self._desde_checkpoint = 0
+        self.masks = {}                         # id -> máscara (int do Python, até 128 bits)
+        self.nomes = {}                         # id -> nome do dono
+        self.freq = [0] * self.universo
+        self.postings = [set() for _ in range(self.universo)]
+        self.dups = {}                          # máscara -> {ids} (dict como conjunto ordenado)
+        self.dup_groups = set()                 # máscaras com mais de uma aposta
+        self.hist = Counter()                   # dezenas em comum -> nº de pares (>= 1)
+        self.pairs = {}                         # dezenas em comum -> {(id_a, id_b): None}
+
+    # --- DELTAS ---
+    def _overlaps(self, numeros):
+        """Apostas que dividem alguma dezena com `numeros` -> quantas dividem."""
+        comum = Counter()
+        for n in numeros:
+            comum.update(self.postings[n - 1])
+        return comum
+
+    def add(self, bet_id, mask, nome=""):
+        mask = int(mask) & self.valid
+        if bet_id in self.masks:
+            self.remove(bet_id)
+        numeros = mask_to_numbers(mask)
+        for outro, k in self._overlaps(numeros).items():
+            self.hist[k] += 1
+            if k >= MIN_LEVEL:
+                self.pairs.setdefault(k, {})[_par(bet_id, outro)] = None
+        for n in numeros:
+            self.postings[n - 1].add(bet_id)
+            self.freq[n - 1] += 1
+        self.masks[bet_id] = mask
+        self.nomes[bet_id] = nome
+        grupo = self.dups.setdefault(mask, {})
+        grupo[bet_id] = None
+        if len(grupo) > 1:
+            self.dup_groups.add(mask)
+
+    def remove(self, bet_id):
+        mask = self.masks.pop(bet_id, None)
+        if mask is None:
+            return
+        self.nomes.pop(bet_id, None)
+        numeros = mask_to_numbers(mask)
+        for n in numeros:
+            self.postings[n - 1].discard(bet_id)
+            self.freq[n - 1] -= 1
+        for outro, k in self._overlaps(numeros).items():
+            self.hist[k] -= 1
+            if not self.hist[k]:
+                del self.hist[k]
+            if k >= MIN_LEVEL:
+                self.pairs.get(k, {}).pop(_par(bet_id, outro), None)
+        grupo = self.dups[mask]
+        grupo.pop(bet_id, None)
+        if len(grupo) < 2:
+            self.dup_groups.discard(mask)
+        if not grupo:
+            del self.dups[mask]
+
+    def sync(self, snap):
+        """Aplica só as apostas que entraram, saíram ou mudaram desde a última versão vista."""
+        with self._lock:
+            if snap.version == self.version:
+                return 0
+            bets = snap.bets
+            atuais = {str(bid): join_mask(lo, hi) & self.valid for bid, lo, hi in zip(bets.id, bets.mascara, bets.mascara_hi)}
+            saiu = [bid for bid, m in self.masks.items() if atuais.get(bid) != m]
+            entrou = [bid for bid, m in atuais.items() if self.masks.get(bid) != m]
+            for bid in saiu:
+                self.remove(bid)
+            nomes = dict(zip(map(str, bets.id), map(str, snap.bet_nome)))
+            for bid in entrou:
+                self.add(bid, atuais[bid], nomes.get(bid, ""))
+            # renomear jogador não mexe nas contagens
+            renomeados = {bid: nome for bid, nome in nomes.items() if self.nomes.get(bid) != nome}
+            self.nomes.update(nomes)
+            self.version = snap.version
+            if saiu or entrou or renomeados:
+                self._commit(saiu, {bid: [str(atuais[bid]), nomes.get(bid, "")] for bid in entrou}, renomeados)
+            return len(saiu) + len(entrou)
+
+    # --- PERSISTÊNCIA ---
+    def _commit(self, saiu, entrou, renomeados):
+        """Acrescenta ao diário só o que mudou nesta sincronização."""
+        self.seq += 1
+        registro = {"seq": self.seq, "version": self.version, "del": saiu, "add": entrou, "nomes": renomeados}
+        os.makedirs(os.path.dirname(self.journal) or ".", exist_ok=True)
+        with open(self.journal, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        self._desde_checkpoint += len(saiu) + len(entrou) + len(renomeados)
+        if self._desde_checkpoint >= CHECKPOINT_EVERY:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Grava a foto completa (escrita atômica) e compacta o diário: o replay recomeça daqui."""
+        with self._lock:
+            estado = {
+                "seq": self.seq, "version": self.version,
+                "bets": {bid: [str(m), self.nomes.get(bid, "")] for bid, m in self.masks.items()},
+                "hist": {str(k): v for k, v in self.hist.items()},
+                "pairs": {str(k): list(map(list, v)) for k, v in self.pairs.items()},
+            }
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(estado, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+            # se cair antes daqui, o replay pula os registros com seq <= o da foto
+            open(self.journal, "w").close()
+            self._desde_checkpoint = 0
+
+    def load(self):
+        """
+        Foto gravada + registros posteriores do diário. Listas de postagem e frequências
+        saem das máscaras (sem comparar pares); só as apostas do diário refazem sobreposições.
+        """
+        with self._lock:
+            try:
+                self._load_checkpoint()
+            except (OSError, ValueError, KeyError, TypeError):
+                # foto corrompida: recomeça do zero no próximo sync e compacta na primeira gravação
+                self._reset()
+                self._desde_checkpoint = CHECKPOINT_EVERY
+                return self
+            if os.path.exists(self.journal):
+                with open(self.journal, encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            registro = json.loads(line)
+                        except ValueError:
+                            continue  # linha truncada por queda no meio da escrita
+                        if registro["seq"] > self.seq:
+                            self._replay(registro)
+        return self
+
+    def _replay(self, registro):
+        for bid in registro["del"]:
+            self.remove(bid)
+        for bid, (m, nome) in registro["add"].items():
+            self.add(bid, int(m), nome)
+        self.nomes.update(registro["nomes"])
+        self.seq, self.version = registro["seq"], registro["version"]
+        self._desde_checkpoint += len(registro["del"]) + len(registro["add"]) + len(registro["nomes"])
+
+    def _load_checkpoint(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            estado = json.load(f)
+        for bid, (m, nome) in estado["bets"].items():
+            mask = int(m) & self.valid
+            self.masks[bid] = mask
+            self.nomes[bid] = nome
+            for n in mask_to_numbers(mask):
+                self.postings[n - 1].add(bid)
+                self.freq[n - 1] += 1
+            grupo = self.dups.setdefault(mask, {})
+            grupo[bid] = None
+            if len(grupo) > 1:
+                self.dup_groups.add(mask)
+        self.hist = Counter({int(k): v for k, v in estado["hist"].items()})
+        self.pairs = {int(k): {tuple(p): None for p in v} for k, v in estado["pairs"].items()}
+        self.seq, self.version = estado.get("seq", 0), estado["version"]
+
+    # --- LEITURA ---
+    def histogram(self):
+        """{dezenas em comum: nº de pares}, incluindo os pares sem nada em comum."""
+        n = len(self.masks)
+        total = n * (n - 1) // 2
+        out = dict(self.hist)
+        out[0] = total - sum(self.hist.values())
+        return out
+
+    def duplicates(self):
+        """[(números, [nomes])] dos jogos idênticos."""
+        return [(mask_to_numbers(m), [self.nomes.get(b, "") for b in self.dups[m]]) for m in self.dup_groups]
+
+    def pair_count(self, k):
+        return len(self.pairs.get(k, ()))
+
+    def pair_list(self, k, limit=50):
+        """Os primeiros `limit` pares com `k` dezenas em comum: (nome_a, nome_b, dezenas comuns)."""
+        out = []
+        for a, b in self.pairs.get(k, {}):
+            if len(out) >= limit:
+                break
+            out.append((self.nomes.get(a, ""), self.nomes.get(b, ""), mask_to_numbers(self.masks[a] & self.masks[b])))
+        return out
+
+# --- UM POR CONCURSO ---
+_lock = threading.Lock()
+_stores = {}
+
+def stats_for(snap):
+    """Estatísticas do concurso do snapshot, sincronizadas com ele."""
+    contest = snap.contest
+    with _lock:
+        store = _stores.get(contest.id)
+        if store is None:
+            store = StatsStore(contest.id, contest.rules.universo).load()
+            _stores[contest.id] = store
+    store.sync(snap)
+    return store
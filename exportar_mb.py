@@ -0,0 +1,138 @@
+"""
+Exportações (CSV / Excel) do bolão: ranking de um sorteio, saldos, jogos por pessoa
+e extrato de contribuições.
+
+Cada relatório é um gerador de linhas (a primeira é o cabeçalho), lido direto dos
+arrays do snapshot e do livro razão — nada de montar um DataFrame inteiro. Os
+escritores consomem o gerador em blocos direto num arquivo temporário em disco (o
+Excel no modo write_only do openpyxl, que não guarda a planilha na memória), e
+export_file devolve esse arquivo aberto. As páginas só chamam export_file quando o
+visitante clica em baixar (st.download_button com data=função), sem cache dos bytes.
+"""
+
+import csv
+import io
+import os
+import tempfile
+
+import numpy as np
+
+from utils_mb import mask_to_numbers, join_mask
+
+# --- CONFIGURAÇÃO ---
+CHUNK_ROWS = 5_000
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+def _dezenas(lo, hi):
+    return " ".join(f"{n:02d}" for n in mask_to_numbers(join_mask(lo, hi)))
+
+# --- RELATÓRIOS (GERADORES) ---
+def ranking_rows(snap, draw_numbers, premios=None):
+    """Apostas ordenadas por acertos (e prêmio) num sorteio."""
+    from rateio_mb import bet_prizes_cents, from_cents
+    rules = snap.contest.rules
+    placar = snap.score(draw_numbers)
+    centavos = bet_prizes_cents(placar, premios or {}, rules)
+    faixas = [key for _, key, _ in rules.faixas]
+    yield ["posicao", "nome", "dezenas", "qtd_numeros", "acertos", *faixas, "premio"]
+    bets = snap.bets
+    ordem = np.lexsort((-centavos, -placar["acertos"].astype(np.int64)))
+    for pos, i in enumerate(ordem, 1):
+        yield [pos, snap.bet_nome[i], _dezenas(bets.mascara[i], bets.mascara_hi[i]), int(bets.qtd_numeros[i]),
+               int(placar["acertos"][i]), *(int(placar[k][i]) for k in faixas), from_cents(centavos[i])]
+
+def balance_rows(snap):
+    """Saldos do livro razão (mesmos valores de utils_mb.balances)."""
+    from razao_mb import BALANCE_COLUMNS, ledger_for
+    livro = ledger_for(snap)
+    yield list(BALANCE_COLUMNS)
+    yield from livro.rows(snap.player_map)
+
+def games_rows(snap):
+    """Jogos agrupados por pessoa (ordem alfabética), um por linha."""
+    bets = snap.bets
+    yield ["nome", "id", "dezenas", "qtd_numeros", "custo", "registrado", "descricao"]
+    nomes = np.asarray(snap.bet_nome, dtype=object).astype(str)
+    for i in np.argsort(nomes, kind="stable"):
+        yield [nomes[i], bets.id[i], _dezenas(bets.mascara[i], bets.mascara_hi[i]), int(bets.qtd_numeros[i]),
+               round(float(bets.custo_total[i]), 2), "SIM" if bets.conferido[i] else "NÃO", bets.descricao[i]]
+
+def statement_rows(snap):
+    """Extrato de contribuições por pessoa, com saldo acumulado."""
+    c = snap.contributions
+    yield ["nome", "data", "valor", "pago", "acumulado", "obs"]
+    if "player_id" not in c or len(c["player_id"]) == 0:
+        return
+    pids = np.asarray(c["player_id"]).astype(np.int64)
+    ts = np.asarray(c["ts"], dtype=object).astype(str) if "ts" in c else np.full(len(pids), "")
+    obs = np.asarray(c["obs"], dtype=object) if "obs" in c else np.full(len(pids), "", dtype=object)
+    pago = np.asarray(c["pago"]) if "pago" in c else np.ones(len(pids), dtype=bool)
+    valor = np.asarray(c["valor"], dtype=np.float64)
+    atual, acumulado = None, 0.0
+    for i in np.lexsort((ts, pids)):
+        if pids[i] != atual:
+            atual, acumulado = pids[i], 0.0
+        if pago[i] == True:
+            acumulado += valor[i]
+        yield [snap.player_map.get(int(pids[i]), "Desconhecido"), ts[i], round(valor[i], 2),
+               "SIM" if pago[i] == True else "NÃO", round(acumulado, 2), "" if obs[i] is None else obs[i]]
+
+def ledger_rows(snap):
+    """Trilha de auditoria do livro razão (razao_mb), evento a evento."""
+    from razao_mb import ledger_for
+    yield ["seq", "ts", "tipo", "nome", "valor", "referencia", "fundo"]
+    for ev in ledger_for(snap).events():
+        yield [ev["seq"], ev.get("ts", ""), ev["tipo"], snap.player_map.get(ev["player_id"], "Desconhecido"),
+               round(ev["valor"] / 100, 2), ev.get("ref") or "", "SIM" if ev.get("fundo") else ""]
+
+REPORTS = {
+    "saldos": ("Saldos", balance_rows),
+    "jogos": ("Jogos por pessoa", games_rows),
+    "extrato": ("Extrato de contribuições", statement_rows),
+    "razao": ("Livro razão", ledger_rows),
+}
+
+# --- ESCRITORES ---
+def write_csv(rows, fileobj):
+    """Escreve as linhas em blocos num arquivo binário (UTF-8 com BOM, abre certo no Excel)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=";")
+    fileobj.write("\ufeff".encode("utf-8"))
+    for n, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if n % CHUNK_ROWS == 0:
+            fileobj.write(buf.getvalue().encode("utf-8"))
+            buf.seek(0)
+            buf.truncate()
+    fileobj.write(buf.getvalue().encode("utf-8"))
+
+def write_xlsx(rows, fileobj, title="Dados"):
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=title[:31])
+    for row in rows:
+        ws.append(row)
+    wb.save(fileobj)
+
+def export_file(rows, fmt="csv", title="Dados"):
+    """
+    Grava o arquivo em disco e o devolve aberto para leitura (o que st.download_button
+    aceita). O nome já sai da pasta temporária: o espaço volta quando o arquivo é fechado.
+    """
+    fd, path = tempfile.mkstemp(prefix="bolao_", suffix="." + FORMATS[fmt][1])
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            if fmt == "xlsx":
+                write_xlsx(rows, tmp, title)
+            else:
+                write_csv(rows, tmp)
+        return open(path, "rb")
+    finally:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass  # Windows não apaga arquivo aberto: fica para a limpeza da pasta temporária
@@ -0,0 +1,303 @@
+"""
+Fila de escrita com journal local (append-only) para as mutações do admin.
+
+Cada add/delete/toggle de apostas e contribuições é gravado no journal e confirmado
+na hora. As páginas já enxergam a mudança, porque get_snapshot() aplica as operações
+pendentes por cima do snapshot remoto. A gravação na planilha acontece em lote:
+um timer junta tudo o que chegou em FLUSH_DELAY segundos e reescreve cada aba
+uma única vez (ou chame flush() para gravar na hora).
+
+Depois de um crash, as operações sem confirmação no journal são reaplicadas.
+Reaplicar é seguro: inserções carregam o próprio id e o toggle grava o valor final.
+Exclusões e toggles guardam a "impressão digital" da linha; se a linha mudou na
+planilha desde então, a operação vira conflito (ver conflicts()) em vez de sobrescrever.
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import utils_mb as mb
+
+FILA_FILE = os.environ.get("BOLAO_FILA_FILE", "data/fila_escrita.jsonl")
+FLUSH_DELAY = 10  # segundos entre a primeira operação pendente e a gravação do lote
+
+_FINGERPRINT_COLS = ["id", "player_id", "mascara", "mascara_hi", "custo_total", "conferido", "descricao", "valor", "pago", "obs"]
+
+_lock = threading.RLock()        # estado da fila
+_flush_lock = threading.Lock()   # um lote por vez
+_state = {"loaded": False, "seq": 0, "pending": {}, "conflicts": [], "revision": 0}
+_timer = None
+_overlay = {}
+
+# --- JOURNAL ---
+def _append(records):
+    folder = os.path.dirname(FILA_FILE)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(FILA_FILE, "a", encoding="utf-8") as f:
+        for rec in records:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def _load_journal():
+    """Relê o journal uma vez por processo (é aqui que o replay pós-crash acontece)."""
+    if _state["loaded"]:
+        return
+    pending, conflicts, seq = {}, [], 0
+    if os.path.exists(FILA_FILE):
+        with open(FILA_FILE, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # linha truncada por queda no meio da escrita
+                if "op" in rec:
+                    pending[rec["seq"]] = rec
+                    seq = max(seq, rec["seq"])
+                elif "done" in rec:
+                    for s in rec["done"]:
+                        pending.pop(s, None)
+                elif "conflict" in rec:
+                    pending.pop(rec["conflict"], None)
+                    conflicts.append(rec)
+                    seq = max(seq, rec["conflict"])
+    _state.update(loaded=True, seq=seq, pending=pending, conflicts=conflicts)
+    if pending:
+        _schedule_flush()
+
+def _compact():
+    """Com a fila vazia, reescreve o journal só com os conflitos ainda não resolvidos."""
+    tmp = FILA_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for rec in _state["conflicts"]:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, FILA_FILE)
+
+# --- OPERAÇÕES ---
+def row_fingerprint(row):
+    """Hash curto dos campos gravados de uma linha (Series) de apostas ou contribuições."""
+    vals = [f"{c}={row[c]}" for c in _FINGERPRINT_COLS if c in row.index]
+    return hashlib.blake2b("|".join(vals).encode("utf-8"), digest_size=8).hexdigest()
+
+def _new_row_frame(op, row):
+    if op == "add_bet":
+        row = dict(row)
+        mascara = mb.numbers_to_mask(row.pop("numeros"))
+        lo, hi = mb.split_mask(mascara)
+        row.update(mascara=lo, mascara_hi=hi, qtd_numeros=bin(mascara).count("1"))
+        # Mantém os tipos do store (uint64 misturado com int64 viraria float e perderia bits)
+        return pd.DataFrame([row]).astype({"mascara": np.uint64, "mascara_hi": np.uint64,
+                                           "qtd_numeros": np.uint8, "custo_total": np.float32})
+    return pd.DataFrame([{**row, "contrib_id": row["id"]}])
+
+def _apply(df, rec):
+    """Aplica uma operação ao DataFrame da aba. Devolve (df, motivo do conflito ou None)."""
+    op, p = rec["op"], rec["payload"]
+    ids = df["id"].astype(str)
+
+    if op in ("add_bet", "add_contribution"):
+        if (ids == p["row"]["id"]).any():
+            return df, None  # já está na planilha (replay)
+        return pd.concat([df, _new_row_frame(op, p["row"])], ignore_index=True), None
+
+    if op == "add_contributions":
+        existentes = set(ids)
+        rows = [r for r in p["rows"] if r["id"] not in existentes]  # as que já estão na planilha (replay) ficam de fora
+        if not rows:
+            return df, None
+        return pd.concat([df, pd.DataFrame([{**r, "contrib_id": r["id"]} for r in rows])], ignore_index=True), None
+
+    if op in ("delete_bets", "delete_contributions"):
+        sel = ids.isin(p["ids"])
+        for _, row in df[sel].iterrows():
+            expected = p["expected"].get(str(row["id"]))
+            if expected and expected != row_fingerprint(row):
+                return df, f"linha {row['id']} foi alterada na planilha depois do pedido de exclusão"
+        return df[~sel], None
+
+    if op == "set_bet_verified":
+        hits = df.index[ids == p["id"]]
+        if len(hits) == 0:
+            return df, f"aposta {p['id']} não existe mais na planilha"
+        idx = hits[0]
+        if bool(df.at[idx, "conferido"]) == p["conferido"]:
+            return df, None
+        if p.get("expected") and p["expected"] != row_fingerprint(df.loc[idx]):
+            return df, f"aposta {p['id']} foi alterada na planilha depois do pedido"
+        df.at[idx, "conferido"] = p["conferido"]
+        return df, None
+
+    return df, f"operação desconhecida: {op}"
+
+def enqueue(op, tab, payload, contest_id=mb.LEGACY_CONTEST_ID):
+    """Grava a operação no journal e devolve o registro (confirmação imediata)."""
+    with _lock:
+        _load_journal()
+        _state["seq"] += 1
+        rec = {"seq": _state["seq"], "op": op, "tab": tab, "concurso": str(contest_id), "payload": payload,
+               "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        _append([rec])
+        _state["pending"][rec["seq"]] = rec
+        _state["revision"] += 1
+        _schedule_flush()
+        return rec
+
+def pending():
+    with _lock:
+        _load_journal()
+        return [_state["pending"][s] for s in sorted(_state["pending"])]
+
+def conflicts():
+    with _lock:
+        _load_journal()
+        return list(_state["conflicts"])
+
+def dismiss_conflicts():
+    with _lock:
+        _load_journal()
+        _state["conflicts"] = []
+        if not _state["pending"]:
+            _compact()
+
+# --- VISÃO OTIMISTA ---
+def _contest_of(rec):
+    # Registros gravados antes dos concursos particionados são do concurso legado
+    return rec.get("concurso", mb.LEGACY_CONTEST_ID)
+
+def with_pending(snap):
+    """Snapshot com as operações pendentes do concurso aplicadas (o próprio snap se não houver)."""
+    contest = snap.contest
+    ops = [rec for rec in pending() if _contest_of(rec) == contest.id]
+    if not ops:
+        return snap
+    key = (snap.version, _state["revision"])
+    cached = _overlay.get(contest.id)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    frames = {contest.tab("apostas"): snap.bets.to_frame().copy(),
+              contest.tab("contribuicoes"): snap.contributions_frame().copy()}
+    for rec in ops:
+        frames[rec["tab"]], _ = _apply(frames[rec["tab"]], rec)
+    overlay = mb._assemble_snapshot(
+        f"{snap.version}+{key[1]}", snap.players_frame().copy(), frames[contest.tab("contribuicoes")],
+        mb.BetStore.from_frame(frames[contest.tab("apostas")]), contest,
+        # a cópia local continua marcada como tal, mesmo com a fila por cima
+        source="fila" if snap.source == "planilha" else snap.source,
+    )
+    _overlay[contest.id] = (key, overlay)
+    return overlay
+
+# --- GRAVAÇÃO EM LOTE ---
+def _known_rows(ops):
+    """Linhas que cada aba tinha no último snapshot visto (para desconfiar de uma leitura vazia)."""
+    known = {}
+    for cid in {_contest_of(rec) for rec in ops}:
+        contest = mb.get_contest(cid)
+        try:
+            snap = mb._remote_snapshot(contest.id)
+        except Exception:
+            continue
+        known[contest.tab("apostas")] = len(snap.bets)
+        c = snap.contributions
+        known[contest.tab("contribuicoes")] = len(c["player_id"]) if "player_id" in c else 0
+    return known
+
+def _remote_frame(rec, known):
+    """
+    A aba como está agora na planilha, lida direto (nunca do cache nem do .npz local).
+    Levanta mb.SheetReadError se a leitura falhar ou voltar vazia sem motivo.
+    """
+    contest = mb.get_contest(_contest_of(rec))
+    tab = rec["tab"]
+    raw = mb.read_tab_strict(tab, known.get(tab, 0))
+    if tab == contest.tab("apostas"):
+        # to_frame() aponta para os arrays do store (somente leitura); _apply altera a cópia
+        return mb.bet_sheet_frame(raw).copy()
+    players = mb._remote_snapshot(contest.id).players_frame()
+    return mb._prepare_contributions(raw, players)
+
+def flush():
+    """
+    Grava na planilha todas as operações pendentes: uma leitura e uma escrita por aba.
+    Aba que não pôde ser lida não é gravada, e as operações dela continuam pendentes.
+    Devolve {"gravadas": n, "conflitos": [...], "nao_lidas": [abas]}.
+    """
+    global _timer
+    with _flush_lock:
+        with _lock:
+            _load_journal()
+            _timer = None
+            ops = [_state["pending"][s] for s in sorted(_state["pending"])]
+        if not ops:
+            return {"gravadas": 0, "conflitos": [], "nao_lidas": []}
+
+        # A rede fica fora do _lock: as páginas continuam lendo a fila enquanto grava
+        known = _known_rows(ops)
+        _refresh_remote()
+        frames, done, tab_conflicts, failed = {}, {}, {}, set()
+        for rec in ops:
+            tab = rec["tab"]
+            if tab in failed:
+                continue
+            if tab not in frames:
+                try:
+                    frames[tab] = _remote_frame(rec, known)
+                except mb.SheetReadError:
+                    failed.add(tab)
+                    continue
+                done[tab], tab_conflicts[tab] = [], []
+            frames[tab], motivo = _apply(frames[tab], rec)
+            if motivo:
+                tab_conflicts[tab].append({"conflict": rec["seq"], "motivo": motivo, "entry": rec})
+            else:
+                done[tab].append(rec["seq"])
+
+        saved, new_conflicts = [], []
+        for tab, df in frames.items():
+            # Se a gravação falhar, as operações da aba continuam pendentes
+            if not done[tab] or mb.save_to_sheet(tab, df):
+                saved.extend(done[tab])
+                new_conflicts.extend(tab_conflicts[tab])
+
+        with _lock:
+            _append([{"done": saved}] + new_conflicts)
+            for s in saved:
+                _state["pending"].pop(s, None)
+            for c in new_conflicts:
+                _state["pending"].pop(c["conflict"], None)
+            _state["conflicts"].extend(new_conflicts)
+            _state["revision"] += 1
+            if not _state["pending"]:
+                _compact()
+            else:
+                _schedule_flush()
+        return {"gravadas": len(saved), "conflitos": new_conflicts, "nao_lidas": sorted(failed)}
+
+def _refresh_remote():
+    mb.st.cache_data.clear()
+    mb._remote_snapshot.clear()
+
+def _flush_in_background():
+    try:
+        flush()
+    except Exception:
+        # Planilha fora do ar: as operações continuam no journal; tenta de novo depois
+        with _lock:
+            _schedule_flush()
+
+def _schedule_flush():
+    global _timer
+    with _lock:
+        if _timer is None:
+            _timer = threading.Timer(FLUSH_DELAY, _flush_in_background)
+            _timer.daemon = True
+            _timer.start()
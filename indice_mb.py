@@ -0,0 +1,144 @@
+"""
+Índice por participante: nome normalizado / player_id -> linhas das apostas + resumo de pagamentos.
+
+Montado uma única vez por versão dos dados (Snapshot.version) e compartilhado entre as
+sessões, então "meus jogos" custa só O(apostas da pessoa) e a busca por nome é uma
+busca binária por prefixo (com fuzzy via rapidfuzz quando o prefixo não acha nada).
+"""
+
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+import numpy as np
+
+from utils_mb import _normalize_text
+
+# --- ESTRUTURAS ---
+@dataclass(frozen=True)
+class PlayerEntry:
+    chave: str                  # nome normalizado (sem acento, minúsculo)
+    nome: str
+    player_id: Optional[int]
+    linhas: np.ndarray          # posições das apostas em snap.bets (somente leitura)
+    pago: float
+    gasto: float
+    jogos: int
+    conferidos: int
+    fundo: bool
+
+    @property
+    def saldo(self):
+        return self.pago - self.gasto
+
+@dataclass(frozen=True)
+class PlayerIndex:
+    version: str
+    entries: Mapping            # chave -> PlayerEntry
+    by_id: Mapping              # player_id -> chave
+    _tokens: tuple              # (palavra ou nome inteiro, chave), ordenado
+
+    def get(self, player_id):
+        chave = self.by_id.get(int(player_id))
+        return self.entries.get(chave) if chave else None
+
+    def lookup(self, nome):
+        return self.entries.get(_normalize_text(nome))
+
+    def prefix(self, query):
+        """Participantes com o nome (ou alguma palavra do nome) começando por `query`."""
+        q = _normalize_text(query)
+        if not q:
+            return []
+        found = {}
+        i = bisect_left(self._tokens, (q, ""))
+        while i < len(self._tokens) and self._tokens[i][0].startswith(q):
+            found.setdefault(self._tokens[i][1])
+            i += 1
+        return [self.entries[c] for c in sorted(found)]
+
+    def fuzzy(self, query, limit=5, score_cutoff=70):
+        """Nomes parecidos (erros de digitação), via rapidfuzz."""
+        from rapidfuzz import fuzz, process
+        q = _normalize_text(query)
+        if not q:
+            return []
+        hits = process.extract(q, list(self.entries), scorer=fuzz.WRatio, limit=limit, score_cutoff=score_cutoff)
+        return [self.entries[c] for c, _, _ in hits]
+
+    def search(self, query, limit=5):
+        return self.prefix(query) or self.fuzzy(query, limit=limit)
+
+# --- CONSTRUÇÃO ---
+def build_player_index(snap):
+    store = snap.bets
+    nomes = np.asarray(snap.bet_nome, dtype=object)
+    # normaliza cada nome distinto uma vez só
+    distintos, codigos = np.unique(nomes.astype(str), return_inverse=True)
+    chaves = np.array([_normalize_text(n) for n in distintos], dtype=object)
+    chave_aposta = chaves[codigos]
+
+    ordem = np.argsort(chave_aposta, kind="stable")
+    ordenadas = chave_aposta[ordem]
+    cortes = np.flatnonzero(ordenadas[1:] != ordenadas[:-1]) + 1 if len(ordem) else np.array([], dtype=np.intp)
+    grupos = np.split(ordem, cortes) if len(ordem) else []
+
+    custo = store.custo_total.astype(np.float64)
+    entries, by_id = {}, {}
+    for linhas in grupos:
+        linhas.setflags(write=False)
+        i = int(linhas[0])
+        chave = chave_aposta[i]
+        pids = np.unique(store.player_id[linhas])
+        pid = int(pids[0]) if len(pids) == 1 else None
+        entries[chave] = PlayerEntry(
+            chave=chave, nome=str(nomes[i]), player_id=pid, linhas=linhas,
+            pago=float(snap.pagamentos.get(pid, 0.0)) if pid is not None else 0.0,
+            gasto=float(custo[linhas].sum()), jogos=len(linhas),
+            conferidos=int(store.conferido[linhas].sum()),
+            fundo=pid == snap.fund_id or "fundo" in chave,
+        )
+        for p in pids.tolist():
+            by_id.setdefault(int(p), chave)
+
+    # jogadores sem apostas também aparecem (para ver o que já pagaram)
+    vazio = np.array([], dtype=np.intp)
+    vazio.setflags(write=False)
+    for pid, nome in snap.player_map.items():
+        chave = _normalize_text(nome)
+        if pid in by_id or not chave:
+            continue
+        entries.setdefault(chave, PlayerEntry(
+            chave=chave, nome=str(nome), player_id=int(pid), linhas=vazio,
+            pago=float(snap.pagamentos.get(pid, 0.0)), gasto=0.0, jogos=0, conferidos=0,
+            fundo=pid == snap.fund_id or "fundo" in chave,
+        ))
+        by_id[int(pid)] = chave
+
+    tokens = set()
+    for chave in entries:
+        tokens.add((chave, chave))
+        tokens.update((palavra, chave) for palavra in chave.split())
+    return PlayerIndex(
+        version=snap.version,
+        entries=MappingProxyType(entries),
+        by_id=MappingProxyType(by_id),
+        _tokens=tuple(sorted(tokens)),
+    )
+
+# --- CACHE POR VERSÃO ---
+_lock = threading.Lock()
+_cache = {}  # id do concurso -> PlayerIndex da última versão vista
+
+def player_index(snap):
+    """Índice do snapshot; só é reconstruído quando a versão dos dados muda."""
+    with _lock:
+        cached = _cache.get(snap.contest.id)
+        if cached is not None and cached.version == snap.version:
+            return cached
+    index = build_player_index(snap)
+    with _lock:
+        _cache[snap.contest.id] = index
+    return index
@@ -7,10 +7,22 @@ import os
 # CONFIGURAÇÃO E IMPORTS
 # ==========================================
 try:
-    from utils_mb import load_bets, load_players, check_bet_results, _to_int_list
+    from utils_mb import get_snapshot, get_contest, bet_numbers, load_draws, latest_draw, LIVE_POLL_SECONDS, PRIZE_ESTIMATES, default_prizes
+    from probabilidades_mb import group_odds
+    from simulador_mb import simulate, PUBLIC_MAX_DRAWS, SIM_SEED
+    from rateio_mb import bet_prizes_cents, distribute
+    from indice_mb import player_index
+    from exportar_mb import ranking_rows, export_file, FORMATS
+    from estatico_mb import published_result, result_url
 except ImportError:
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from utils_mb import load_bets, load_players, check_bet_results, _to_int_list
+    from utils_mb import get_snapshot, get_contest, bet_numbers, load_draws, latest_draw, LIVE_POLL_SECONDS, PRIZE_ESTIMATES, default_prizes
+    from probabilidades_mb import group_odds
+    from simulador_mb import simulate, PUBLIC_MAX_DRAWS, SIM_SEED
+    from rateio_mb import bet_prizes_cents, distribute
+    from indice_mb import player_index
+    from exportar_mb import ranking_rows, export_file, FORMATS
+    from estatico_mb import published_result, result_url
 
 st.set_page_config(page_title="Conferência Pública", page_icon="🤞", layout="wide", initial_sidebar_state="collapsed")
 
@@ -67,12 +79,86 @@ st.markdown("""
 # ==========================================
 # LÓGICA E ESTADO
 # ==========================================
+# O multiselect grava direto nesta chave; cada mudança reexecuta só o fragmento da conferência
 if "public_draw" not in st.session_state:
     st.session_state["public_draw"] = []
 
+concurso = get_contest(st.query_params.get("concurso"))
+regras = concurso.rules
+# As três faixas exibidas (Sena / Quina / Quadra na Mega-Sena)
+(ac_1, fx_1, rot_1), (ac_2, fx_2, rot_2), (ac_3, fx_3, rot_3) = regras.faixas[:3]
+
 def fmt_brl(valor):
     return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
+def limpar_sorteio():
+    st.session_state["public_draw"] = []
+
+@st.cache_data(show_spinner="Calculando chances...")
+def chances_do_bolao(versao, concurso_id, premios, min_acertos):
+    # `versao` entra só na chave do cache: muda quando as apostas mudam
+    return group_odds(get_snapshot(concurso_id), premios, min_acertos)
+
+@st.cache_data(max_entries=8, show_spinner="Sorteando...")
+def simulacao(versao, concurso_id, premios, sorteios, seed):
+    # Mesma chave (apostas, prêmios, sorteios, semente) = mesmo resultado: simula uma vez
+    # só, num processo, e com teto; simulações maiores ficam para `cli_mb.py simular`.
+    return simulate(get_snapshot(concurso_id), premios, draws=min(sorteios, PUBLIC_MAX_DRAWS), seed=seed, workers=1)
+
+def ranking_exportado(snap, dezenas, premios, fmt):
+    # Só roda quando o visitante clica em baixar (data=função); nada fica em cache
+    return export_file(ranking_rows(snap, list(dezenas), premios), fmt, "Ranking")
+
+@st.cache_resource(max_entries=32, show_spinner="Conferindo jogos...")
+def conferencia_do_sorteio(versao, concurso_id, dezenas):
+    """
+    Cartões ordenados de um sorteio, calculados uma vez para todas as sessões
+    (cache_resource: o mesmo objeto, sem cópia; só leitura).
+    """
+    snap = get_snapshot(concurso_id)
+    bets = snap.bets_frame()
+    draw_set = set(dezenas)
+    # Pontuação vetorizada de todas as apostas de uma vez
+    acertos_todos = snap.score(list(dezenas))["acertos"]
+    resultados = []
+    for i in range(len(bets)):
+        row = bets.iloc[i]
+        lista_aposta = bet_numbers(row)
+        acertos = int(acertos_todos[i])
+
+        nome = row["nome"]
+        if "fundo" in str(nome).lower(): nome = "🏢 FUNDO BOLÃO"
+
+        html_balls = ""
+        for n in lista_aposta:
+            css = "ball-hit" if n in draw_set else "ball-miss"
+            html_balls += f"<div class='lottery-ball {css}' style='width:30px; height:30px; font-size:12px;'>{n:02d}</div>"
+
+        css_class = "card-normal"; cor_pts = "#555"; label_premio = ""
+        if acertos == ac_1: css_class="card-sena"; cor_pts="#FFD700"; label_premio=f"{rot_1.upper()} 🏆"
+        elif acertos == ac_2: css_class="card-quina"; cor_pts="#4CAF50"; label_premio=f"{rot_2.upper()} 🥈"
+        elif acertos == ac_3: css_class="card-quadra"; cor_pts="#2196F3"; label_premio=f"{rot_3.upper()} 🥉"
+
+        resultados.append({
+            "linha": i, "nome": nome, "html": html_balls, "acertos": acertos,
+            "css": css_class, "cor_pts": cor_pts, "label": label_premio,
+            "qtd": len(lista_aposta)
+        })
+
+    resultados.sort(key=lambda x: (x['acertos'], -x['qtd']), reverse=True)
+    return resultados
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def rateio_do_sorteio(versao, concurso_id, dezenas, premios):
+    """
+    Jogos premiados por faixa e rateio saídos do mesmo placar (score_masks, com
+    desdobramento): o faturamento do resumo é a soma do que cada um recebe.
+    """
+    snap = get_snapshot(concurso_id)
+    placar = snap.score(list(dezenas))
+    jogos = tuple(int(placar[key].sum()) for _, key, _ in regras.faixas[:3])
+    return jogos, distribute(snap, bet_prizes_cents(placar, premios, regras))
+
 # ==========================================
 # SIDEBAR - CONFIGURAÇÃO DE PRÊMIOS
 # ==========================================
@@ -81,129 +167,101 @@ with st.sidebar:
     st.markdown("### 💰 Estimativa de Prêmios")
     
     # --- ATUALIZADO AQUI PARA 850 MILHÕES ---
-    est_sena = st.number_input("Prêmio Sena (6)", value=850000000.0, step=1000000.0, format="%.2f")
-    est_quina = st.number_input("Prêmio Quina (5)", value=55000.0, step=1000.0, format="%.2f")
-    est_quadra = st.number_input("Prêmio Quadra (4)", value=1200.0, step=50.0, format="%.2f")
+    est_sena = st.number_input(f"Prêmio {rot_1} ({ac_1})", value=PRIZE_ESTIMATES[0], step=1000000.0, format="%.2f")
+    est_quina = st.number_input(f"Prêmio {rot_2} ({ac_2})", value=PRIZE_ESTIMATES[1], step=1000.0, format="%.2f")
+    est_quadra = st.number_input(f"Prêmio {rot_3} ({ac_3})", value=PRIZE_ESTIMATES[2], step=50.0, format="%.2f")
     
     st.divider()
-    if st.button("Limpar Sorteio", type="primary", use_container_width=True):
-        st.session_state["public_draw"] = []
-        st.rerun()
+    st.button("Limpar Sorteio", type="primary", use_container_width=True, on_click=limpar_sorteio)
+
+premios = {fx_1: est_sena, fx_2: est_quina, fx_3: est_quadra}
 
 # ==========================================
 # UI - TOPO (SORTEIO)
 # ==========================================
 st.markdown("<h2 style='text-align: center; margin-bottom: 5px;'>🤞 Conferência da Sorte</h2>", unsafe_allow_html=True)
 
-picked = st.session_state["public_draw"]
+ao_vivo = st.toggle("🔴 Acompanhar ao vivo", help=f"Mostra o último sorteio lançado e atualiza sozinho a cada {LIVE_POLL_SECONDS} segundos.")
 
-with st.container():
-    st.markdown('<div class="draw-panel">', unsafe_allow_html=True)
-    st.markdown('<div class="draw-title">Dezenas Sorteadas</div>', unsafe_allow_html=True)
-    if picked:
-        html = "".join([f"<div class='lottery-ball ball-hit' style='width:45px; height:45px; font-size:18px;'>{n:02d}</div>" for n in sorted(picked)])
-        st.markdown(html, unsafe_allow_html=True)
-    else:
-        st.caption("Aguardando sorteio...")
-    st.markdown('</div>', unsafe_allow_html=True)
+def painel_sorteio(picked):
+    with st.container():
+        st.markdown('<div class="draw-panel">', unsafe_allow_html=True)
+        st.markdown('<div class="draw-title">Dezenas Sorteadas</div>', unsafe_allow_html=True)
+        if picked:
+            html = "".join([f"<div class='lottery-ball ball-hit' style='width:45px; height:45px; font-size:18px;'>{n:02d}</div>" for n in sorted(picked)])
+            st.markdown(html, unsafe_allow_html=True)
+        else:
+            st.caption("Aguardando sorteio...")
+        st.markdown('</div>', unsafe_allow_html=True)
 
-col_sel, col_space = st.columns([1, 0.01])
-novos_numeros = st.multiselect(
-    "Simular Resultado (Escolha 6)", 
-    options=list(range(1, 61)),
-    default=picked,
-    format_func=lambda x: f"{x:02d}",
-    placeholder="Digite ou selecione os números...",
-    max_selections=6,
-    label_visibility="collapsed"
-)
+# ==========================================
+# RESUMO (FRAGMENTO)
+# ==========================================
+@st.fragment
+def resumo(versao, dezenas):
+    (senas, quinas, quadras), rateio = rateio_do_sorteio(versao, concurso.id, dezenas, premios)
+    total_premio = rateio["total"].sum()
 
-if novos_numeros != st.session_state["public_draw"]:
-    st.session_state["public_draw"] = sorted(novos_numeros)
-    st.rerun()
+    if senas > 0:
+        # No modo ao vivo o fragmento roda de novo a cada poucos segundos: balões uma vez por sorteio
+        if st.session_state.get("baloes") != dezenas:
+            st.session_state["baloes"] = dezenas
+            st.balloons()
+        st.success(f"🎉 PARABÉNS! TEMOS {senas} {rot_1.upper()}(S)!")
+    
+    if total_premio > 0:
+        st.markdown(f"""
+        <div style="background: #1B5E20; color: #fff; padding: 15px; border-radius: 12px; text-align: center; margin-bottom: 25px; border: 1px solid #4CAF50; box-shadow: 0 4px 15px rgba(0,255,0,0.2);">
+            <h3 style="margin:0; font-size: 14px; text-transform: uppercase; opacity: 0.9;">💰 Faturamento Estimado do Bolão</h3>
+            <h1 style="margin:5px 0 0 0; font-size: 32px; font-weight: 800;">{fmt_brl(total_premio)}</h1>
+        </div>
+        """, unsafe_allow_html=True)
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric(f"{rot_1} ({ac_1})", senas, delta=fmt_brl(est_sena), delta_color="normal")
+    c2.metric(f"{rot_2} ({ac_2})", quinas, delta=fmt_brl(est_quina), delta_color="normal")
+    c3.metric(f"{rot_3} ({ac_3})", quadras, delta=fmt_brl(est_quadra), delta_color="normal")
+
+    if total_premio > 0:
+        with st.expander("💸 Quanto cada um recebe"):
+            rateio = rateio[rateio["total"] > 0]
+            st.dataframe(pd.DataFrame({
+                "Participante": rateio["nome"],
+                "Jogos próprios": rateio["individual"].map(fmt_brl),
+                "Parte do Fundo": rateio["fundo"].map(fmt_brl),
+                "Total": rateio["total"].map(fmt_brl),
+            }), hide_index=True, use_container_width=True)
+            st.caption("Prêmios do Fundo divididos pelo que cada um pagou além dos jogos individuais.")
 
 # ==========================================
-# PROCESSAMENTO
+# RANKING (FRAGMENTO)
 # ==========================================
-st.divider()
+@st.fragment
+def ranking(versao, dezenas):
+    # Filtro e formato do download reexecutam só este trecho; os cartões vêm do cache
+    resultados = conferencia_do_sorteio(versao, concurso.id, dezenas)
 
-if len(picked) == 6:
-    try:
-        bets = load_bets()
-        players = load_players()
-    except Exception as e:
-        st.error(f"Erro ao conectar no banco: {e}")
-        st.stop()
+    fmt = st.radio("Baixar ranking em", list(FORMATS), format_func=str.upper, horizontal=True, key="fmt_ranking")
+    mime, ext = FORMATS[fmt]
+    snap = get_snapshot(concurso.id)
+    st.download_button(
+        "⬇️ Baixar ranking completo",
+        data=lambda: ranking_exportado(snap, dezenas, premios, fmt),
+        file_name=f"ranking_{concurso.id}.{ext}", mime=mime, on_click="ignore",
+    )
 
-    if bets.empty:
-        st.info("Nenhuma aposta cadastrada.")
-    else:
-        player_map = {}
-        if not players.empty:
-            players["player_id"] = pd.to_numeric(players["player_id"], errors='coerce').fillna(0).astype(int)
-            player_map = players.set_index("player_id")["nome"].to_dict()
-
-        draw_set = set(picked)
-        resultados = []
-
-        for _, row in bets.iterrows():
-            str_nums = str(row["numeros"]).replace("[","").replace("]","").replace(","," ")
-            lista_aposta = _to_int_list(str_nums)
-            
-            stats = check_bet_results(lista_aposta, draw_set)
-            acertos = stats['best_hits']
-            
-            pid = int(pd.to_numeric(row.get("player_id", 0), errors="coerce") or 0)
-            nome = player_map.get(pid, row.get("apostador", "Desconhecido"))
-            if "fundo" in str(nome).lower(): nome = "🏢 FUNDO BOLÃO"
-
-            html_balls = ""
-            for n in lista_aposta:
-                css = "ball-hit" if n in draw_set else "ball-miss"
-                html_balls += f"<div class='lottery-ball {css}' style='width:30px; height:30px; font-size:12px;'>{n:02d}</div>"
-
-            css_class = "card-normal"; cor_pts = "#555"; label_premio = ""
-            if acertos == 6: css_class="card-sena"; cor_pts="#FFD700"; label_premio="SENA 🏆"
-            elif acertos == 5: css_class="card-quina"; cor_pts="#4CAF50"; label_premio="QUINA 🥈"
-            elif acertos == 4: css_class="card-quadra"; cor_pts="#2196F3"; label_premio="QUADRA 🥉"
-
-            resultados.append({
-                "nome": nome, "html": html_balls, "acertos": acertos,
-                "css": css_class, "cor_pts": cor_pts, "label": label_premio,
-                "qtd": len(lista_aposta)
-            })
-
-        resultados.sort(key=lambda x: (x['acertos'], -x['qtd']), reverse=True)
-
-        senas = len([r for r in resultados if r['acertos'] == 6])
-        quinas = len([r for r in resultados if r['acertos'] == 5])
-        quadras = len([r for r in resultados if r['acertos'] == 4])
-        
-        total_premio = (senas * est_sena) + (quinas * est_quina) + (quadras * est_quadra)
-
-        if senas > 0: 
-            st.balloons()
-            st.success(f"🎉 PARABÉNS! TEMOS {senas} SENA(S)!")
-        
-        if total_premio > 0:
-            st.markdown(f"""
-            <div style="background: #1B5E20; color: #fff; padding: 15px; border-radius: 12px; text-align: center; margin-bottom: 25px; border: 1px solid #4CAF50; box-shadow: 0 4px 15px rgba(0,255,0,0.2);">
-                <h3 style="margin:0; font-size: 14px; text-transform: uppercase; opacity: 0.9;">💰 Faturamento Estimado do Bolão</h3>
-                <h1 style="margin:5px 0 0 0; font-size: 32px; font-weight: 800;">{fmt_brl(total_premio)}</h1>
-            </div>
-            """, unsafe_allow_html=True)
-
-        c1, c2, c3 = st.columns(3)
-        c1.metric("Sena (6)", senas, delta=fmt_brl(est_sena), delta_color="normal")
-        c2.metric("Quina (5)", quinas, delta=fmt_brl(est_quina), delta_color="normal")
-        c3.metric("Quadra (4)", quadras, delta=fmt_brl(est_quadra), delta_color="normal")
-        
-        st.write("")
-        st.caption(f"Conferindo {len(resultados)} jogos...")
-        
-        for r in resultados:
-            premio_html = f"<div style='color: {r['cor_pts']}; font-size: 11px; font-weight: bold; margin-top: 4px;'>{r['label']}</div>" if r['label'] else ""
-            card_html = f"""
+    # Cartões só de quem o visitante procurou (o resumo continua sendo do grupo todo)
+    filtro = st.text_input("🔍 Ver só os jogos de:", placeholder="Seu nome (vazio = todos)", key="filtro_publico").strip()
+    if filtro:
+        linhas = {i for pessoa in player_index(get_snapshot(concurso.id)).search(filtro) for i in pessoa.linhas}
+        resultados = [r for r in resultados if r["linha"] in linhas]
+
+    st.write("")
+    st.caption(f"Conferindo {len(resultados)} jogos...")
+    
+    for r in resultados:
+        premio_html = f"<div style='color: {r['cor_pts']}; font-size: 11px; font-weight: bold; margin-top: 4px;'>{r['label']}</div>" if r['label'] else ""
+        card_html = f"""
 <div class="player-card {r['css']}">
 <div class="card-header">
 <div style="flex: 1;">
@@ -220,7 +278,118 @@ if len(picked) == 6:
 </div>
 </div>
 """
-            st.markdown(card_html, unsafe_allow_html=True)
+        st.markdown(card_html, unsafe_allow_html=True)
+
+# ==========================================
+# CONFERÊNCIA (FRAGMENTO: SORTEIO + RESUMO + RANKING)
+# ==========================================
+# Trocar as dezenas reexecuta só este fragmento (CSS, sidebar e chances ficam como estão).
+# Ao vivo, ele se repete sozinho e lê o último sorteio gravado (latest_draw, cache curto).
+@st.fragment(run_every=LIVE_POLL_SECONDS if ao_vivo else None)
+def conferencia():
+    if ao_vivo:
+        ultimo = latest_draw(concurso.id)
+        picked = sorted(ultimo["dezenas"]) if ultimo else []
+        painel_sorteio(picked)
+        st.caption(f"🔴 Ao vivo — último lançamento: {ultimo['ts'] if ultimo else '—'}")
+    else:
+        picked = sorted(st.session_state["public_draw"])
+        painel_sorteio(picked)
+        st.multiselect(
+            f"Simular Resultado (Escolha {regras.sorteadas})", 
+            options=list(range(1, regras.universo + 1)),
+            key="public_draw",
+            format_func=lambda x: f"{x:02d}",
+            placeholder="Digite ou selecione os números...",
+            max_selections=regras.sorteadas,
+            label_visibility="collapsed"
+        )
+
+    st.divider()
+
+    # Ao vivo o ranking acompanha as dezenas já sorteadas; simulando, só com o sorteio completo
+    completo = len(picked) == regras.sorteadas
+    if not (completo or (ao_vivo and picked)):
+        st.info(f"👆 Selecione as {regras.sorteadas} dezenas no topo para conferir os resultados.")
+        return
+
+    try:
+        snap = get_snapshot(concurso.id)
+    except Exception as e:
+        st.error(f"Erro ao conectar no banco: {e}")
+        return
+
+    # Sorteio oficial com a página publicada pelo admin (estatico_mb, estimativas padrão):
+    # aponta para o arquivo pronto; a conferência abaixo segue igual, do cache compartilhado
+    if completo and premios == default_prizes(regras):
+        try:
+            oficial = list(picked) in [d["dezenas"] for d in load_draws(concurso.id)]
+            path = published_result(snap, picked) if oficial else None
+        except Exception:
+            path = None
+        if path:
+            st.success("✅ Resultado oficial publicado.")
+            link = result_url(os.path.basename(path))
+            if link:
+                st.markdown(f"🔗 [Abrir / compartilhar o resultado]({link})")
+            st.download_button("⬇️ Baixar página do resultado", data=lambda: open(path, "rb"),
+                               file_name=os.path.basename(path), mime="text/html", on_click="ignore")
+
+    if snap.bets.id.size == 0:
+        st.info("Nenhuma aposta cadastrada.")
+        return
+
+    resumo(snap.version, tuple(picked))
+    ranking(snap.version, tuple(picked))
+
+conferencia()
+
+# ==========================================
+# CHANCES DO BOLÃO (ANTES DO SORTEIO)
+# ==========================================
+st.divider()
+
+@st.fragment
+def chances():
+    if not st.toggle("📈 Ver chances do bolão"):
+        return
+    snap = get_snapshot(concurso.id)
+    if snap.bets.id.size == 0:
+        st.info("Nenhuma aposta cadastrada.")
+        return
+    odds = chances_do_bolao(snap.version, concurso.id, premios, ac_3)
+
+    def uma_em(p):
+        return f"1 em {1 / p:,.0f}".replace(",", ".") if p > 0 else "—"
+
+    p_uniao = odds["p_uniao"]
+    c1, c2, c3 = st.columns(3)
+    c1.metric(f"Chance de ao menos uma {rot_3.lower()}", f"{p_uniao:.4%}", uma_em(p_uniao), delta_color="off")
+    c2.metric("Valor esperado do bolão", fmt_brl(odds["valor_esperado"]))
+    c3.metric("Custo das apostas", fmt_brl(odds["custo"]))
+
+    st.markdown("**Prêmios esperados por faixa** (média por sorteio)")
+    st.dataframe(pd.DataFrame({
+        "Faixa": [f"{rot} ({ac})" for ac, _, rot in regras.faixas],
+        "Jogos premiados esperados": [odds["faixas"][key] for _, key, _ in regras.faixas],
+    }), hide_index=True, use_container_width=True)
+
+    if odds["metodo"] == "exato":
+        st.caption("Chance da união calculada de forma exata.")
+    else:
+        st.caption(f"Chance da união estimada por simulação (± {1.96 * odds['erro_padrao']:.4%}, 95%).")
+
+    with st.expander("🎲 Simular sorteios aleatórios"):
+        opcoes = [n for n in (10_000, 50_000, 100_000) if n <= PUBLIC_MAX_DRAWS]
+        n_sim = st.select_slider("Quantidade de sorteios", options=opcoes, value=opcoes[0])
+        if st.button("Simular", use_container_width=True):
+            sim = simulacao(snap.version, concurso.id, premios, n_sim, SIM_SEED)
+            st.metric("Sorteios com algum prêmio", f"{sim.p_any:.3%}")
+            dist = sim.distribution()
+            dist["valor"] = dist["valor"].map(fmt_brl)
+            st.markdown("**Prêmio total do bolão**")
+            st.dataframe(dist, hide_index=True, use_container_width=True)
+            st.markdown("**Por participante**")
+            st.dataframe(sim.jogadores.drop(columns="player_id"), hide_index=True, use_container_width=True)
 
-else:
-    st.info("👆 Selecione as 6 dezenas no topo para conferir os resultados.")
+chances()
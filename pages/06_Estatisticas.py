@@ -1,36 +1,29 @@
 import streamlit as st
 import pandas as pd
-import altair as alt
 import sys, os
-import itertools
 
 # Garante path
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
-from utils_mb import load_bets, _to_int_list
+from utils_mb import get_snapshot
+from estatisticas_mb import stats_for
 
 st.set_page_config(page_title="Estatísticas do Grupo", page_icon="📊", layout="wide")
 st.title("📊 Estatísticas e Curiosidades")
 
-bets = load_bets()
+snap = get_snapshot(st.query_params.get("concurso"))
 
-if bets.empty:
+if snap.bets.id.size == 0:
     st.info("Cadastre apostas para ver as estatísticas.")
     st.stop()
 
 # --- PROCESSAMENTO DOS NÚMEROS ---
-todas_dezenas = []
-bets['lista_numeros'] = bets['numeros'].apply(lambda x: _to_int_list(str(x)))
-
-for lista in bets['lista_numeros']:
-    todas_dezenas.extend(lista)
-
-# Conta frequência de cada número (1 a 60)
-freq = pd.Series(todas_dezenas).value_counts().sort_index()
-df_freq = pd.DataFrame({"Dezena": range(1, 61)})
-df_freq["Vezes"] = df_freq["Dezena"].map(freq).fillna(0).astype(int)
+# Estatísticas mantidas por delta a cada aposta nova/apagada (estatisticas_mb): aqui só lemos
+stats = stats_for(snap)
+universo = stats.universo
+df_freq = pd.DataFrame({"Dezena": range(1, universo + 1), "Vezes": stats.freq})
 
 # --- 1. NÚMEROS MAIS E MENOS JOGADOS (6 DEZENAS) ---
 c1, c2, c3 = st.columns(3)
@@ -53,7 +46,7 @@ if esquecidos:
     with st.expander("Ver números esquecidos"):
         st.write(f"Ninguém jogou nestes: {str(esquecidos)}")
 else:
-    st.success("Parabéns! O grupo cobriu todos os 60 números da Mega!")
+    st.success(f"Parabéns! O grupo cobriu todos os {universo} números da {snap.contest.rules.nome}!")
 
 st.divider()
 
@@ -61,118 +54,82 @@ st.divider()
 st.subheader("👯 Radar de Coincidências")
 st.caption("Verifica jogos idênticos e semelhanças (Quinas, Quadras, Ternos e Duques em comum).")
 
-# Prepara dados para comparação
-bets['tuple_numeros'] = bets['lista_numeros'].apply(lambda x: tuple(sorted(x)))
+# A. JOGOS IDÊNTICOS (mesma máscara) - índice de repetidos já pronto
+duplicados = stats.duplicates()
 
-# A. JOGOS IDÊNTICOS (6 iguais)
-duplicados = bets[bets.duplicated('tuple_numeros', keep=False)]
-
-if not duplicados.empty:
-    st.error(f"🚨 ALERTA: Encontramos {len(duplicados)} apostas com as mesmas 6 dezenas!")
-    grupos_dup = duplicados.groupby('tuple_numeros')['apostador'].apply(list).reset_index()
-    for _, row in grupos_dup.iterrows():
-        nums_fmt = " - ".join([f"{n:02d}" for n in row['tuple_numeros']])
-        nomes_fmt = ", ".join([f"**{n}**" for n in row['apostador']])
+if duplicados:
+    st.error(f"🚨 ALERTA: Encontramos {sum(len(nomes) for _, nomes in duplicados)} apostas com as mesmas dezenas!")
+    for numeros, nomes in duplicados:
+        nums_fmt = " - ".join([f"{n:02d}" for n in numeros])
+        nomes_fmt = ", ".join([f"**{n}**" for n in nomes])
         st.warning(f"🔢 {nums_fmt}\n\n👥 Jogadores: {nomes_fmt}")
 else:
-    st.success("✅ Nenhum jogo idêntico (6 dezenas). Todos são únicos.")
+    st.success("✅ Nenhum jogo idêntico. Todos são únicos.")
 
 st.write("")
 
-# B. JOGOS PARECIDOS (5, 4, 3, 2)
+# B. JOGOS PARECIDOS (5, 4, 3, 2) - pares já separados por dezenas em comum
 st.markdown("### 🔍 Detetive de Semelhanças")
 
-# Listas para armazenar pares
-pares_quina = []  # 5
-pares_quadra = [] # 4
-pares_terno = []  # 3
-pares_duque = []  # 2
-
-# Lista de jogos para comparação
-lista_jogos = []
-for idx, row in bets.iterrows():
-    lista_jogos.append({
-        "id": row.get("id", idx),
-        "nome": row["apostador"],
-        "nums": set(row["lista_numeros"])
-    })
-
-# Comparação combinatória
-for a, b in itertools.combinations(lista_jogos, 2):
-    iguais = a["nums"].intersection(b["nums"])
-    qtd = len(iguais)
-    
-    # Se forem 6 iguais, já foi mostrado no alerta de duplicados acima
-    if qtd == 6 and len(a["nums"]) == 6 and len(b["nums"]) == 6:
-        continue
-
-    item = {
-        "j1": a["nome"],
-        "j2": b["nome"],
-        "comuns": sorted(list(iguais))
-    }
-
-    if qtd == 5:
-        pares_quina.append(item)
-    elif qtd == 4:
-        pares_quadra.append(item)
-    elif qtd == 3:
-        pares_terno.append(item)
-    elif qtd == 2:
-        pares_duque.append(item)
-
 # Exibição em Abas
 tab5, tab4, tab3, tab2 = st.tabs([
-    f"5️⃣ Quinas ({len(pares_quina)})", 
-    f"4️⃣ Quadras ({len(pares_quadra)})", 
-    f"3️⃣ Ternos ({len(pares_terno)})",
-    f"2️⃣ Duques ({len(pares_duque)})"
+    f"5️⃣ Quinas ({stats.pair_count(5)})", 
+    f"4️⃣ Quadras ({stats.pair_count(4)})", 
+    f"3️⃣ Ternos ({stats.pair_count(3)})",
+    f"2️⃣ Duques ({stats.pair_count(2)})"
 ])
 
-def listar_pares(lista, emoji_b):
-    if not lista:
+def listar_pares(nivel, emoji_b):
+    total = stats.pair_count(nivel)
+    if not total:
         st.caption("Nenhum par encontrado nesta categoria.")
         return
     
     # Limita para não travar se tiver milhares de duques
     limit = 50
-    if len(lista) > limit:
-        st.caption(f"Mostrando os primeiros {limit} de {len(lista)} pares encontrados.")
-        lista = lista[:limit]
+    if total > limit:
+        st.caption(f"Mostrando os primeiros {limit} de {total} pares encontrados.")
         
-    for p in lista:
-        nums_str = str(p['comuns']).replace("[","").replace("]","")
-        st.markdown(f"{emoji_b} **{p['j1']}** vs **{p['j2']}**: `{nums_str}`")
+    for j1, j2, comuns in stats.pair_list(nivel, limit):
+        nums_str = str(comuns).replace("[","").replace("]","")
+        st.markdown(f"{emoji_b} **{j1}** vs **{j2}**: `{nums_str}`")
 
 with tab5:
     st.caption("Jogos que bateram na trave de serem iguais (5 números em comum).")
-    listar_pares(pares_quina, "🔥")
+    listar_pares(5, "🔥")
 
 with tab4:
     st.caption("Jogos com 4 números em comum.")
-    listar_pares(pares_quadra, "🔶")
+    listar_pares(4, "🔶")
 
 with tab3:
     st.caption("Jogos com 3 números em comum.")
     with st.expander("Ver lista de Ternos"):
-        listar_pares(pares_terno, "🔹")
+        listar_pares(3, "🔹")
 
 with tab2:
     st.caption("Jogos com 2 números em comum (apenas curiosidade).")
     with st.expander("Ver lista de Duques"):
-        listar_pares(pares_duque, "⚪")
+        listar_pares(2, "⚪")
+
+with st.expander("📈 Pares de jogos por dezenas em comum"):
+    hist = stats.histogram()
+    st.bar_chart(pd.DataFrame({"Pares": [hist.get(k, 0) for k in range(max(hist) + 1)]}), height=200)
 
 st.divider()
 
 # --- 3. MAPA DE CALOR (HEATMAP) ---
 st.subheader("🗺️ Mapa de Calor do Bolão")
 
-# Cria grade 6x10 para o visual
+# Cria grade de 10 colunas para o visual (6x10 na Mega)
 rows = []
-for r in range(6):
+for r in range(-(-universo // 10)):
     cols_data = []
     for c in range(10):
         num = r * 10 + (c + 1)
+        if num > universo:
+            cols_data.append("")
+            continue
         qtd = df_freq.loc[df_freq["Dezena"]==num, "Vezes"].values[0]
         
         # Define cor baseada na quantidade
@@ -220,6 +177,8 @@ st.divider()
 
 # --- 4. GRÁFICO DE BARRAS ---
 st.subheader("📊 Frequência Detalhada")
+import altair as alt  # só aqui: o resto da página já aparece enquanto o altair carrega
+
 chart = alt.Chart(df_freq).mark_bar().encode(
     x=alt.X("Dezena:O", title="Dezena"),
     y=alt.Y("Vezes:Q", title="Qtd Apostas"),
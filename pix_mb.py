@@ -0,0 +1,279 @@
+"""
+Conciliação de extratos bancários (CSV, OFX ou XLSX) com as contribuições do bolão.
+
+O extrato é lido em fluxo, uma transação por vez. Para cada crédito:
+  1. o nome de quem pagou sai da coluna de pagador ou da descrição do Pix;
+  2. o nome é casado com os jogadores pelo índice de nomes (indice_mb), com fuzzy via
+     rapidfuzz, e o resultado fica memorizado por nome, pois o mesmo pagador se repete;
+  3. a transação ganha um hash estável (FITID do banco, ou data|valor|descrição mais o
+     número da ocorrência). O hash vira o id da contribuição ("pix-<hash>"), então
+     importar o mesmo extrato de novo não duplica nada. Contribuições lançadas à mão
+     também contam: mesmo jogador e mesmo valor, com até DIAS_TOLERANCIA dias de diferença.
+
+As contribuições novas entram na fila de escrita (fila_mb) numa operação só, e a
+planilha é gravada numa única escrita.
+
+Situações no relatório:
+  novo        casado com confiança (>= AUTO_SCORE); é lançado
+  revisar     casado com confiança média ou empatado com outro nome; lançado só se pedido
+  sem_par     nenhum jogador parecido
+  ja_lancado  a contribuição já existe (mesmo hash ou lançamento manual equivalente)
+  ignorado    débito, estorno ou valor zero
+"""
+
+import csv
+import hashlib
+import os
+import re
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from rateio_mb import from_cents, to_cents
+from utils_mb import _normalize_text, parse_money
+
+# --- CONFIGURAÇÃO ---
+AUTO_SCORE = 90         # a partir daqui o par é lançado direto
+REVIEW_SCORE = 75       # entre REVIEW_SCORE e AUTO_SCORE o par fica para revisão
+MARGEM = 5              # se o 2º nome chega a menos disto do 1º, é ambíguo
+DIAS_TOLERANCIA = 1     # lançamento manual conta como o mesmo Pix até 1 dia depois
+ID_PREFIX = "pix-"
+SAMPLE_BYTES = 64 * 1024
+
+COLUNAS = ["hash", "data", "valor", "pagador", "descricao", "player_id", "nome", "score", "status"]
+
+# Cabeçalhos aceitos (já normalizados com _normalize_text)
+ALIASES = {
+    "data": ("data", "data lancamento", "data do lancamento", "data movimento", "data da transacao", "date", "dt"),
+    "valor": ("valor", "valor (r$)", "valor r$", "valor credito", "credito (r$)", "amount"),
+    "descricao": ("descricao", "historico", "lancamento", "detalhes", "memo", "description"),
+    "pagador": ("nome", "pagador", "nome do pagador", "remetente", "origem", "de"),
+    "fitid": ("identificador", "id", "id da transacao", "codigo", "fitid", "autenticacao"),
+}
+
+# Palavras da descrição que não são nome de gente
+RUIDO = {
+    "pix", "transferencia", "recebida", "recebido", "recebimento", "pelo", "transf", "ted", "doc",
+    "credito", "cred", "conta", "agencia", "pagamentos", "pagamento", "banco", "instituicao", "ltda",
+    "ip", "sa", "cp", "cpf", "cnpj", "qr", "code", "via", "app",
+}
+
+# --- CONVERSÕES ---
+_FORMATOS_DATA = ("%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y", "%d/%m/%y",
+                  "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d")
+
+def parse_data(valor):
+    """Data do extrato (texto, datetime ou data OFX) -> "AAAA-MM-DD HH:MM:SS" (None se não der)."""
+    if isinstance(valor, datetime):
+        return valor.strftime("%Y-%m-%d %H:%M:%S")
+    s = str(valor or "").strip()
+    digitos = re.match(r"(\d{14}|\d{8})", s)        # OFX: 20251220 ou 20251220103000[-3:BRT]
+    if digitos:
+        fmt = "%Y%m%d%H%M%S" if len(digitos.group(1)) == 14 else "%Y%m%d"
+        return datetime.strptime(digitos.group(1), fmt).strftime("%Y-%m-%d %H:%M:%S")
+    for fmt in _FORMATOS_DATA:
+        try:
+            return datetime.strptime(s[:19], fmt).strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            continue
+    return None
+
+def payer_name(descricao):
+    """Nome de quem pagou, tirado da descrição do lançamento ("Pix recebido - MARIA SILVA - ...")."""
+    melhor, pontos = "", 0
+    for trecho in re.split(r"\s+-\s+|[:;|\"/*]", str(descricao or "")):
+        palavras = [p for p in re.findall(r"[^\W\d_]+", trecho) if len(p) > 1]
+        uteis = [p for p in palavras if len(p) > 2 and _normalize_text(p) not in RUIDO]
+        if len(uteis) > pontos:
+            pontos = len(uteis)
+            melhor = " ".join(p for p in palavras if _normalize_text(p) not in RUIDO)
+    return melhor
+
+# --- LEITURA DOS EXTRATOS (GERADORES) ---
+def _encoding(path):
+    with open(path, "rb") as f:
+        amostra = f.read(SAMPLE_BYTES)
+    try:
+        amostra.decode("utf-8")
+    except UnicodeDecodeError as e:
+        if e.start < len(amostra) - 3:              # erro de verdade, não caractere cortado no fim
+            return "cp1252"
+    return "utf-8-sig"
+
+def _header_map(row):
+    """Cabeçalho -> {campo: posição}; None se a linha não tem ao menos data e valor."""
+    nomes = [_normalize_text(c) for c in row]
+    campos = {}
+    for campo, aliases in ALIASES.items():
+        for i, nome in enumerate(nomes):
+            if nome in aliases:
+                campos.setdefault(campo, i)
+    return campos if "data" in campos and "valor" in campos else None
+
+def _table_transactions(rows):
+    """Linhas de uma tabela (CSV/XLSX), pulando o preâmbulo até achar o cabeçalho."""
+    campos = None
+    for row in rows:
+        row = ["" if c is None else c for c in row]
+        if campos is None:
+            campos = _header_map(row)
+            continue
+        if not any(str(c).strip() for c in row):
+            continue
+        def get(campo):
+            i = campos.get(campo)
+            return row[i] if i is not None and i < len(row) else ""
+        yield {"data": get("data"), "valor": get("valor"), "descricao": str(get("descricao")).strip(),
+               "pagador": str(get("pagador")).strip(), "fitid": str(get("fitid")).strip()}
+
+def read_csv(path):
+    with open(path, encoding=_encoding(path), newline="") as f:
+        amostra = f.read(SAMPLE_BYTES)
+        f.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=";,\t")
+        except csv.Error:
+            dialeto = csv.excel
+        yield from _table_transactions(csv.reader(f, dialeto))
+
+def read_xlsx(path):
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from _table_transactions(wb.worksheets[0].iter_rows(values_only=True))
+    finally:
+        wb.close()
+
+_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)")
+
+def read_ofx(path):
+    """OFX 1.x (SGML) ou 2.x (XML): um <STMTTRN> por transação."""
+    atual = None
+    with open(path, encoding=_encoding(path), errors="replace") as f:
+        for linha in f:
+            for fecha, tag, valor in _TAG.findall(linha):
+                tag = tag.upper()
+                if tag == "STMTTRN":
+                    if not fecha:
+                        atual = {}
+                    elif atual is not None:
+                        yield {"data": atual.get("DTPOSTED", ""), "valor": atual.get("TRNAMT", ""),
+                               "descricao": " - ".join(v for v in (atual.get("NAME"), atual.get("MEMO")) if v),
+                               "pagador": "", "fitid": atual.get("FITID", "")}
+                        atual = None
+                elif atual is not None and not fecha and valor.strip():
+                    atual[tag] = valor.strip()
+
+READERS = {".csv": read_csv, ".txt": read_csv, ".ofx": read_ofx, ".xlsx": read_xlsx}
+
+def read_statement(path):
+    """Transações do extrato, normalizadas: data, valor (Decimal), descrição, pagador e hash."""
+    leitor = READERS.get(os.path.splitext(path)[1].lower())
+    if leitor is None:
+        raise ValueError(f"Formato de extrato não suportado: {path} (use CSV, OFX ou XLSX)")
+    vistos = Counter()
+    for t in leitor(path):
+        valor = parse_money(t["valor"])
+        data = parse_data(t["data"])
+        if valor is None or data is None:
+            continue                                # rodapé, saldo do dia etc.
+        chave = f"fitid|{t['fitid']}" if t["fitid"] else f"{data}|{to_cents(valor)}|{_normalize_text(t['descricao'])}"
+        vistos[chave] += 1
+        chave = f"{chave}#{vistos[chave]}"          # pagamentos idênticos no mesmo dia continuam distintos
+        yield {"hash": hashlib.blake2b(chave.encode("utf-8"), digest_size=8).hexdigest(), "data": data,
+               "valor": valor, "descricao": t["descricao"], "pagador": t["pagador"] or payer_name(t["descricao"])}
+
+# --- CONCILIAÇÃO ---
+class _Matcher:
+    """Pagador -> (player_id, nome, score, situação), memorizado por nome normalizado."""
+
+    def __init__(self, index, auto=AUTO_SCORE, review=REVIEW_SCORE):
+        self.index, self.auto, self.review = index, auto, review
+        self.escolhas = {c: e for c, e in index.entries.items() if e.player_id is not None and not e.fundo}
+        self.chaves = list(self.escolhas)
+        self._memo = {}
+
+    def __call__(self, pagador):
+        q = _normalize_text(pagador)
+        if q not in self._memo:
+            self._memo[q] = self._match(q)
+        return self._memo[q]
+
+    def _match(self, q):
+        if not q:
+            return None, "", 0.0, "sem_par"
+        exato = self.escolhas.get(q)
+        if exato is not None:
+            return exato.player_id, exato.nome, 100.0, "novo"
+        from rapidfuzz import fuzz, process
+        hits = process.extract(q, self.chaves, scorer=fuzz.WRatio, limit=2, score_cutoff=self.review)
+        if not hits:
+            return None, "", 0.0, "sem_par"
+        entry, score = self.escolhas[hits[0][0]], float(hits[0][1])
+        ambiguo = len(hits) > 1 and score - hits[1][1] < MARGEM and self.escolhas[hits[1][0]].player_id != entry.player_id
+        return entry.player_id, entry.nome, score, "novo" if score >= self.auto and not ambiguo else "revisar"
+
+def _recorded(snap):
+    """(ids já lançados, {(player_id, centavos): [datas dos lançamentos manuais]})."""
+    c = snap.contributions
+    ids, manuais = set(), defaultdict(list)
+    if "player_id" not in c or len(c["player_id"]) == 0:
+        return ids, manuais
+    n = len(c["player_id"])
+    cids = c.get("contrib_id", c.get("id"))
+    cids = [str(x) for x in cids] if cids is not None else [""] * n
+    ts = [str(x) for x in c["ts"]] if "ts" in c else [""] * n
+    pago = c["pago"] if "pago" in c else [True] * n
+    for cid, pid, valor, data, ok in zip(cids, c["player_id"], c["valor"], ts, pago):
+        ids.add(cid)
+        if ok == True and not cid.startswith(ID_PREFIX):
+            manuais[(int(pid), to_cents(valor))].append(parse_data(data))
+    return ids, manuais
+
+def _consume_manual(manuais, pid, centavos, data):
+    """Usa (e retira) um lançamento manual equivalente, se houver."""
+    datas = manuais.get((pid, centavos))
+    if not datas:
+        return False
+    quando = datetime.strptime(data, "%Y-%m-%d %H:%M:%S").date()
+    for i, d in enumerate(datas):
+        if d is None:
+            continue
+        dia = datetime.strptime(d, "%Y-%m-%d %H:%M:%S").date()
+        if timedelta(0) <= dia - quando <= timedelta(days=DIAS_TOLERANCIA):
+            del datas[i]
+            return True
+    return False
+
+def reconcile(snap, transactions, auto=AUTO_SCORE, review=REVIEW_SCORE):
+    """Relatório de conciliação (DataFrame com COLUNAS), uma linha por transação do extrato."""
+    from indice_mb import player_index
+    match = _Matcher(player_index(snap), auto, review)
+    ids, manuais = _recorded(snap)
+    linhas = []
+    for t in transactions:
+        centavos = to_cents(t["valor"])
+        pid, nome, score, status = None, "", 0.0, "ignorado"
+        if centavos > 0:
+            pid, nome, score, status = match(t["pagador"])
+            if ID_PREFIX + t["hash"] in ids:
+                status = "ja_lancado"
+            elif pid is not None and _consume_manual(manuais, pid, centavos, t["data"]):
+                status = "ja_lancado"
+        linhas.append([t["hash"], t["data"], float(from_cents(centavos)), t["pagador"], t["descricao"],
+                       pid, nome, round(score, 1), status])
+    df = pd.DataFrame(linhas, columns=COLUNAS)
+    df["player_id"] = df["player_id"].astype("Int64")
+    return df
+
+def commit_new(report, contest_id=None, include_review=False):
+    """Lança as contribuições "novo" (e "revisar", se pedido) numa única operação da fila."""
+    from utils_mb import add_contributions
+    status = ["novo", "revisar"] if include_review else ["novo"]
+    sel = report[report["status"].isin(status) & report["player_id"].notna()]
+    return add_contributions(
+        ({"id": ID_PREFIX + r.hash, "player_id": int(r.player_id), "valor": r.valor, "ts": r.data,
+          "obs": f"Pix {r.pagador}".strip()} for r in sel.itertuples(index=False)),
+        contest_id,
+    )
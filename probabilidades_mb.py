@@ -0,0 +1,188 @@
+"""
+Probabilidades e valor esperado do bolão, vetorizados sobre a tabela inteira de apostas.
+
+Por aposta: como a chance de cada faixa só depende de quantas dezenas a aposta tem,
+montamos uma tabela hipergeométrica por tamanho (n = sorteadas .. max_dezenas) e
+indexamos pela coluna `qtd_numeros` — uma única operação para todas as apostas.
+
+Para o grupo: o valor esperado é a soma dos valores esperados (linearidade).
+Já a chance de "alguém do bolão ganhar pelo menos a menor faixa" é uma união de
+eventos correlacionados (apostas repetem dezenas). Em vez de inclusão–exclusão sobre
+todos os subconjuntos de apostas, agrupamos as dezenas em "átomos" (dezenas que
+aparecem exatamente no mesmo conjunto de apostas) e contamos, de forma exata, os
+sorteios em que nenhuma aposta chega lá. Quando há átomos demais, caímos para uma
+estimativa Monte Carlo com semente fixa e número de sorteios limitado.
+"""
+
+from fractions import Fraction
+from functools import lru_cache
+from math import comb, sqrt
+
+import numpy as np
+import pandas as pd
+
+from utils_mb import MEGA_SENA, popcount64, random_draw_masks
+
+# --- CONFIGURAÇÃO ---
+EXACT_LIMIT = 200_000       # máximo (estimado) de composições para a contagem exata
+MC_DRAWS = 200_000          # sorteios simulados quando a contagem exata é cara demais
+MC_CHUNK = 2_000_000        # células (sorteios x apostas) por bloco no Monte Carlo
+MC_SEED = 2025
+
+# --- TABELAS POR TAMANHO DE APOSTA ---
+@lru_cache(maxsize=None)
+def _size_tables(rules):
+    """
+    Para cada tamanho n (linhas 0..max_dezenas; tamanhos inválidos ficam zerados):
+      p_hits[n, h]   -> P(exatamente h acertos)
+      esperado[n, j] -> número esperado de jogos simples premiados na faixa j
+      p_faixa[n, j]  -> P(ganhar ao menos um prêmio da faixa j)
+    """
+    U, k, top = rules.universo, rules.sorteadas, rules.max_dezenas
+    total = comb(U, k)
+    n_faixas = len(rules.faixas)
+    p_hits = np.zeros((top + 1, k + 1))
+    esperado = np.zeros((top + 1, n_faixas))
+    p_faixa = np.zeros((top + 1, n_faixas))
+    for n in range(k, top + 1):
+        for h in range(k + 1):
+            ph = comb(n, h) * comb(U - n, k - h) / total
+            p_hits[n, h] = ph
+            for j, (t, _, _) in enumerate(rules.faixas):
+                jogos = comb(h, t) * comb(n - h, k - t)
+                esperado[n, j] += ph * jogos
+                if jogos:
+                    p_faixa[n, j] += ph
+    for arr in (p_hits, esperado, p_faixa):
+        arr.setflags(write=False)
+    return p_hits, esperado, p_faixa
+
+def _min_hits(rules, min_hits):
+    return rules.faixas[-1][0] if min_hits is None else int(min_hits)
+
+# --- POR APOSTA ---
+def bet_odds(store, rules=MEGA_SENA, premios=None, min_hits=None):
+    """
+    DataFrame com uma linha por aposta: `p_<faixa>` (chance de ao menos um prêmio na
+    faixa), `e_<faixa>` (jogos premiados esperados), `p_premio` (chance de acertar
+    `min_hits` ou mais) e, se `premios` ({chave da faixa: valor}) for dado, `valor_esperado`.
+    """
+    p_hits, esperado, p_faixa = _size_tables(rules)
+    n = store.qtd_numeros.astype(np.intp)
+    valid = (n >= rules.sorteadas) & (n <= rules.max_dezenas)
+    idx = np.where(valid, n, 0)  # linha 0 da tabela é toda zero
+
+    out = {"id": store.id, "qtd_numeros": store.qtd_numeros}
+    for j, (_, key, _) in enumerate(rules.faixas):
+        out[f"p_{key}"] = p_faixa[idx, j]
+        out[f"e_{key}"] = esperado[idx, j]
+    out["p_premio"] = p_hits[idx, _min_hits(rules, min_hits):].sum(axis=1)
+    if premios:
+        ev = np.zeros(len(idx))
+        for j, (_, key, _) in enumerate(rules.faixas):
+            ev += esperado[idx, j] * float(premios.get(key, 0) or 0)
+        out["valor_esperado"] = ev
+    return pd.DataFrame(out)
+
+# --- UNIÃO (GRUPO) ---
+def _valid_masks(store, rules):
+    """Máscaras distintas das apostas com tamanho válido (repetidas não mudam a união)."""
+    n = store.qtd_numeros.astype(np.intp)
+    valid = (n >= rules.sorteadas) & (n <= rules.max_dezenas)
+    pares = np.unique(np.stack([store.mascara[valid], store.mascara_hi[valid]], axis=1), axis=0)
+    return pares[:, 0], pares[:, 1]
+
+def _atoms(lo, hi, universo):
+    """Agrupa as dezenas pelo conjunto de apostas que as contém: [(tamanho, índices das apostas)]."""
+    dezenas = np.arange(universo, dtype=np.uint64)
+    low = dezenas < 64
+    shift = np.where(low, dezenas, dezenas - np.uint64(64))
+    word = np.where(low[:, None], lo[None, :], hi[None, :])
+    member = ((word >> shift[:, None]) & np.uint64(1)).astype(bool)   # universo x apostas
+    assinaturas, tamanhos = np.unique(np.packbits(member, axis=1), axis=0, return_counts=True)
+    atoms = []
+    for sig, size in zip(assinaturas, tamanhos):
+        bets = np.flatnonzero(np.unpackbits(sig)[:len(lo)]).tolist()
+        atoms.append((int(size), bets))
+    # átomo "de fora" (sem apostas) por último: fecha a recursão com uma combinação só
+    atoms.sort(key=lambda a: len(a[1]) == 0)
+    return atoms
+
+def _losing_draws(atoms, k, m, n_bets):
+    """Conta (exato) os sorteios em que nenhuma aposta chega a `m` acertos."""
+    suffix = [0] * (len(atoms) + 1)
+    for j in range(len(atoms) - 1, -1, -1):
+        suffix[j] = suffix[j + 1] + atoms[j][0]
+    hits = [0] * n_bets
+
+    def rec(j, left):
+        if left == 0:
+            return 1
+        if j == len(atoms) or suffix[j] < left:
+            return 0
+        size, bets = atoms[j]
+        if not bets:  # átomo de fora: sempre o último
+            return comb(size, left)
+        total = 0
+        for c in range(min(size, left) + 1):
+            if c and any(hits[b] + c >= m for b in bets):
+                break  # c maior só piora
+            for b in bets:
+                hits[b] += c
+            total += comb(size, c) * rec(j + 1, left - c)
+            for b in bets:
+                hits[b] -= c
+        return total
+
+    return rec(0, k)
+
+def _union_monte_carlo(lo, hi, rules, m, draws, seed):
+    rng = np.random.default_rng(seed)
+    chunk = max(1, MC_CHUNK // len(lo))
+    wins = done = 0
+    while done < draws:
+        d = min(chunk, draws - done)
+        d_lo, d_hi = random_draw_masks(rng, d, rules)
+        hits = popcount64(d_lo[:, None] & lo) + popcount64(d_hi[:, None] & hi)
+        wins += int(np.count_nonzero((hits >= m).any(axis=1)))
+        done += d
+    p = wins / draws
+    return p, sqrt(p * (1 - p) / draws)
+
+def union_probability(store, rules=MEGA_SENA, min_hits=None, draws=MC_DRAWS, seed=MC_SEED):
+    """
+    Chance de ao menos uma aposta do bolão acertar `min_hits` ou mais (padrão: a menor faixa).
+    Devolve (probabilidade, método, erro padrão) — método "exato" (erro 0) ou "monte_carlo".
+    """
+    m = _min_hits(rules, min_hits)
+    k = rules.sorteadas
+    lo, hi = _valid_masks(store, rules)
+    if len(lo) == 0:
+        return 0.0, "exato", 0.0
+    atoms = _atoms(lo, hi, rules.universo)
+    # limite superior de nós da recursão: composições de k em len(atoms) partes
+    if comb(len(atoms) + k - 1, k) <= EXACT_LIMIT:
+        perdas = _losing_draws(atoms, k, m, len(lo))
+        return float(1 - Fraction(perdas, comb(rules.universo, k))), "exato", 0.0
+    p, erro = _union_monte_carlo(lo, hi, rules, m, draws, seed)
+    return p, "monte_carlo", erro
+
+def group_odds(snap, premios=None, min_hits=None, draws=MC_DRAWS, seed=MC_SEED):
+    """
+    Resumo do bolão inteiro: jogos premiados esperados por faixa, valor esperado
+    (se houver `premios`), custo total e a chance da união na menor faixa.
+    """
+    rules = snap.contest.rules
+    por_aposta = bet_odds(snap.bets, rules, premios, min_hits)
+    p, metodo, erro = union_probability(snap.bets, rules, min_hits, draws, seed)
+    resumo = {
+        "faixas": {key: float(por_aposta[f"e_{key}"].sum()) for _, key, _ in rules.faixas},
+        "custo": float(snap.bets.custo_total.sum(dtype=np.float64)),
+        "p_uniao": p,
+        "metodo": metodo,
+        "erro_padrao": erro,
+        "min_acertos": _min_hits(rules, min_hits),
+    }
+    if premios:
+        resumo["valor_esperado"] = float(por_aposta["valor_esperado"].sum())
+    return resumo
@@ -0,0 +1,138 @@
+"""
+Rateio dos prêmios do bolão entre os participantes.
+
+Regras:
+  - Prêmio de aposta individual vai inteiro para o dono da aposta.
+  - Prêmio de aposta do Fundo é dividido entre quem contribuiu para o Fundo,
+    na proporção do que cada um pagou além do custo dos jogos individuais
+    (max(0, pago - custo_individual)) — a mesma conta da aba "Fundo Extra".
+  - Se ninguém contribuiu para o Fundo, o prêmio fica com o próprio Fundo.
+
+Os valores são tratados em centavos inteiros (e expostos como Decimal), então não
+há erro de ponto flutuante; a divisão usa o método dos maiores restos, de modo que
+a soma das partes é sempre exatamente igual ao prêmio.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+import pandas as pd
+
+CENT = Decimal("0.01")
+
+# --- CONVERSÕES ---
+def to_cents(valor):
+    """Valor em reais (float, str ou Decimal) -> centavos (int), arredondando meio para cima."""
+    return int((Decimal(str(valor or 0)) / CENT).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def from_cents(cents):
+    return (Decimal(int(cents)) * CENT).quantize(CENT)
+
+def split_cents(total, weights):
+    """
+    Divide `total` centavos proporcionalmente a `weights` (inteiros >= 0) pelo método
+    dos maiores restos; empates no resto favorecem quem vem primeiro. Devolve int64.
+    """
+    w = np.asarray(weights, dtype=object)
+    soma = int(w.sum()) if len(w) else 0
+    if soma == 0 or total == 0:
+        return np.zeros(len(w), dtype=np.int64)
+    produto = w * int(total)              # inteiros do Python: sem estouro
+    base, resto = produto // soma, produto % soma
+    faltam = int(total) - int(base.sum())
+    ordem = np.lexsort((np.arange(len(w)), -resto.astype(np.float64)))
+    base[ordem[:faltam]] += 1
+    return base.astype(np.int64)
+
+# --- QUEM RECEBE O QUÊ ---
+def fund_bet_mask(snap):
+    """Apostas do Fundo: do jogador Fundo ou com "fundo" no nome do apostador."""
+    nomes = pd.Series(snap.bet_nome, dtype=object).astype(str)
+    apostador = pd.Series(np.asarray(snap.bets.apostador, dtype=object)).astype(str)
+    return (
+        (snap.bets.player_id == snap.fund_id)
+        | nomes.str.contains("fundo", case=False).to_numpy()
+        | apostador.str.contains("fundo", case=False).to_numpy()
+    )
+
+def fund_weights(snap):
+    """(player_ids, centavos que cada um colocou no Fundo) — o Fundo fica de fora."""
+    custo = to_cents(snap.contest.custo_individual)
+    ids, pesos = [], []
+    for pid, nome in sorted(snap.player_map.items()):
+        if pid == snap.fund_id or "fundo" in str(nome).lower():
+            continue
+        ids.append(pid)
+        pesos.append(max(0, to_cents(snap.pagamentos.get(pid, 0)) - custo))
+    return np.array(ids, dtype=np.int64), np.array(pesos, dtype=np.int64)
+
+def _participants(snap):
+    """Todos que podem receber algo: jogadores cadastrados, donos de apostas e o Fundo."""
+    ids = set(snap.player_map) | set(np.unique(snap.bets.player_id).tolist()) | {snap.fund_id}
+    ids = np.array(sorted(int(i) for i in ids), dtype=np.int64)
+    nomes = [snap.player_map.get(int(pid), snap.fund_name if pid == snap.fund_id else "Desconhecido") for pid in ids]
+    return ids, nomes
+
+def bet_shares(snap):
+    """
+    Como o prêmio de cada aposta se divide, sem montar a matriz apostas x participantes:
+    (dono, fatia, player_ids, nomes). `dono[i]` é a coluna do participante que leva a
+    aposta i inteira, ou -1 nas apostas do Fundo; `fatia` é a fração de cada participante
+    no prêmio das apostas do Fundo. Usada pelo simulador.
+    """
+    ids, nomes = _participants(snap)
+    fundo = fund_bet_mask(snap)
+    dono = np.searchsorted(ids, snap.bets.player_id).astype(np.int64)
+    dono[fundo] = -1
+
+    w_ids, pesos = fund_weights(snap)
+    if pesos.sum() > 0:
+        fatia = np.zeros(len(ids))
+        fatia[np.searchsorted(ids, w_ids)] = pesos / pesos.sum()
+    else:
+        fatia = (ids == snap.fund_id).astype(np.float64)
+    return dono, fatia, ids, nomes
+
+# --- RATEIO DE UM SORTEIO ---
+def bet_prizes_cents(placar, premios, rules):
+    """Prêmio (centavos) de cada aposta a partir do placar de score_masks e {faixa: valor}."""
+    total = None
+    for _, key, _ in rules.faixas:
+        parcela = np.asarray(placar[key], dtype=np.int64) * to_cents(premios.get(key, 0))
+        total = parcela if total is None else total + parcela
+    return total
+
+def distribute(snap, bet_cents):
+    """
+    Rateia os prêmios por aposta (centavos) entre os participantes.
+    DataFrame com player_id, nome, individual, fundo e total (Decimal), maiores primeiro.
+    """
+    ids, nomes = _participants(snap)
+    bet_cents = np.asarray(bet_cents, dtype=np.int64)
+    fundo = fund_bet_mask(snap)
+
+    individual = np.zeros(len(ids), dtype=np.int64)
+    np.add.at(individual, np.searchsorted(ids, snap.bets.player_id[~fundo]), bet_cents[~fundo])
+
+    do_fundo = np.zeros(len(ids), dtype=np.int64)
+    total_fundo = int(bet_cents[fundo].sum())
+    w_ids, pesos = fund_weights(snap)
+    if pesos.sum() > 0:
+        do_fundo[np.searchsorted(ids, w_ids)] = split_cents(total_fundo, pesos)
+    else:
+        do_fundo[ids == snap.fund_id] = total_fundo
+
+    total = individual + do_fundo
+    df = pd.DataFrame({
+        "player_id": ids,
+        "nome": nomes,
+        "individual": [from_cents(c) for c in individual],
+        "fundo": [from_cents(c) for c in do_fundo],
+        "total": [from_cents(c) for c in total],
+    })
+    return df.iloc[np.argsort(-total, kind="stable")].reset_index(drop=True)
+
+def payout(snap, draw_numbers, premios):
+    """Quanto cada participante recebe num sorteio, com os prêmios {faixa: valor por jogo}."""
+    placar = snap.score(draw_numbers)
+    return distribute(snap, bet_prizes_cents(placar, premios, snap.contest.rules))
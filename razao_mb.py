@@ -0,0 +1,373 @@
+"""
+Livro razão do bolão: diário append-only de eventos financeiros com saldos corridos.
+
+Eventos:
+  contribuicao         Pix recebido de um jogador (contribuição com pago = TRUE)
+  custo_aposta         custo de uma aposta, debitado do dono (ou do Fundo, se for aposta do Fundo)
+  estorno              desfaz um evento anterior (linha apagada ou alterada na planilha)
+  transferencia_fundo  jogador passa parte do saldo dele para o Fundo (só existe aqui)
+
+A planilha continua sendo a fonte dos dados; a cada nova versão do snapshot comparamos
+as linhas com os eventos ativos e registramos só a diferença (linhas novas viram
+eventos, linhas que sumiram ou mudaram viram estornos). Cada evento atualiza os saldos
+em O(1), então consultar um saldo é só uma busca no dicionário. De CHECKPOINT_EVERY em
+CHECKPOINT_EVERY eventos gravamos uma foto dos saldos, e ao subir o processo só os
+eventos depois dela são reaplicados.
+
+O app e a linha de comando podem gravar no mesmo diário: quem grava segura uma trava
+do arquivo e antes relê o que os outros processos acrescentaram. Reaplicar é
+idempotente por referência (o mesmo lançamento duas vezes conta uma só).
+
+Só a planilha lida ao vivo alimenta o diário. Snapshots de arquivo (.npz), a cópia
+local de fallback e a visão com a fila pendente recebem um livro em memória
+(folder=None), copiado do gravado, que não escreve nada em disco.
+
+Valores em centavos inteiros (rateio_mb.to_cents), sem erro de arredondamento.
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from rateio_mb import fund_bet_mask, from_cents, to_cents
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+# --- CONFIGURAÇÃO ---
+RAZAO_DIR = os.environ.get("BOLAO_RAZAO_DIR", "data/razao")
+CHECKPOINT_EVERY = 500
+
+TIPOS = ("contribuicao", "custo_aposta", "estorno", "transferencia_fundo")
+BALANCE_COLUMNS = ("player_id", "nome", "total_pago", "total_gasto", "saldo")
+
+def _chave(ev):
+    """O que define um lançamento (para saber se a planilha ainda diz o mesmo)."""
+    return ev["tipo"], ev["player_id"], ev["valor"], bool(ev.get("fundo"))
+
+# --- LIVRO DE UM CONCURSO ---
+class Ledger:
+    """
+    Saldos corridos de um concurso. Métodos públicos são thread-safe.
+    Com folder=None o livro vive só na memória (eventos em self._memoria).
+    """
+
+    def __init__(self, contest_id, custo_individual, fund_id, folder=RAZAO_DIR):
+        self.contest_id = str(contest_id)
+        self.custo = to_cents(custo_individual)
+        self.fund_id = int(fund_id)
+        self.journal = self.checkpoint_file = self.lock_file = None
+        if folder is not None:
+            self.journal = os.path.join(folder, f"razao_{self.contest_id}.jsonl")
+            self.checkpoint_file = os.path.join(folder, f"razao_{self.contest_id}.checkpoint.json")
+            self.lock_file = self.journal + ".lock"
+        self._memoria = []          # eventos do livro em memória
+        self._historico = None      # (diário, offset) de onde uma cópia em memória partiu
+        self.version = None
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.seq = 0
+        self.saldos = {}            # player_id -> [pago, gasto, transferido] em centavos
+        self.ativos = {}            # ref -> evento ainda em vigor (para estornar)
+        self.fundo_cotas = 0        # soma de max(0, pago - custo individual) dos jogadores
+        self.fundo_transferido = 0
+        self.fundo_gasto = 0
+        self._desde_checkpoint = 0
+        self._offset = 0            # bytes do diário já aplicados
+
+    # --- APLICAÇÃO (O(1) por evento) ---
+    def _conta(self, pid):
+        return self.saldos.setdefault(pid, [0, 0, 0])
+
+    def _mexe_pago(self, pid, delta):
+        conta = self._conta(pid)
+        antes = conta[0]
+        conta[0] += delta
+        if pid != self.fund_id:
+            self.fundo_cotas += max(0, conta[0] - self.custo) - max(0, antes - self.custo)
+
+    def _aplica(self, ev, sinal=1):
+        pid, valor = ev["player_id"], sinal * ev["valor"]
+        if ev["tipo"] == "contribuicao":
+            self._mexe_pago(pid, valor)
+        elif ev["tipo"] == "custo_aposta":
+            if ev.get("fundo"):
+                self.fundo_gasto += valor
+            else:
+                self._conta(pid)[1] += valor
+        elif ev["tipo"] == "transferencia_fundo":
+            self._conta(pid)[2] += valor
+            self.fundo_transferido += valor
+
+    def _registra(self, ev):
+        """Aplica o evento e atualiza a tabela de eventos ativos."""
+        self.seq = max(self.seq, ev["seq"])
+        if ev["tipo"] == "estorno":
+            original = self.ativos.pop(ev["ref"], None)
+            if original is not None:
+                self._aplica(original, -1)
+            return
+        ref = ev.get("ref")
+        anterior = self.ativos.get(ref) if ref else None
+        if anterior is not None:
+            if _chave(anterior) == _chave(ev):
+                return  # o mesmo lançamento gravado por dois processos: conta uma vez
+            self._aplica(anterior, -1)
+        self._aplica(ev)
+        if ref:
+            self.ativos[ref] = ev
+
+    # --- PERSISTÊNCIA ---
+    @contextmanager
+    def _file_lock(self):
+        """Trava exclusiva do diário entre processos (app e CLI gravam na mesma pasta)."""
+        if fcntl is None or self.journal is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(self.lock_file) or ".", exist_ok=True)
+        with open(self.lock_file, "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _read_new(self):
+        """Eventos completos gravados no diário depois de self._offset (avança o offset)."""
+        if self.journal is None or not os.path.exists(self.journal) or os.path.getsize(self.journal) == self._offset:
+            return []
+        with open(self.journal, "rb") as f:
+            f.seek(self._offset)
+            dados = f.read()
+        fim = dados.rfind(b"\n") + 1   # linha sem "\n" ainda está sendo escrita
+        self._offset += fim
+        eventos = []
+        for line in dados[:fim].splitlines():
+            try:
+                eventos.append(json.loads(line))
+            except ValueError:
+                continue  # linha truncada por queda no meio da escrita
+        return eventos
+
+    def _catch_up(self):
+        """Aplica o que outros processos acrescentaram ao diário."""
+        for ev in self._read_new():
+            self._registra(ev)
+            self._desde_checkpoint += 1
+
+    def _append(self, eventos):
+        if self.journal is None:
+            self._memoria.extend(eventos)
+            return
+        os.makedirs(os.path.dirname(self.journal) or ".", exist_ok=True)
+        with open(self.journal, "a", encoding="utf-8") as f:
+            for ev in eventos:
+                f.write(json.dumps(ev, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._offset = os.path.getsize(self.journal)
+
+    def _novo(self, tipo, player_id=0, valor=0, ref=None, **extra):
+        self.seq += 1
+        ev = {"seq": self.seq, "tipo": tipo, "player_id": int(player_id), "valor": int(valor),
+              "ref": ref, "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), **extra}
+        return ev
+
+    def _commit(self, eventos):
+        """Grava e aplica `eventos` (chamar com a trava do arquivo e depois de _catch_up)."""
+        if not eventos:
+            return
+        self._append(eventos)
+        for ev in eventos:
+            self._registra(ev)
+        self._desde_checkpoint += len(eventos)
+        if self._desde_checkpoint >= CHECKPOINT_EVERY:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Grava a foto dos saldos (escrita atômica); o replay recomeça daqui."""
+        if self.journal is None:
+            return
+        with self._lock:
+            estado = {
+                "seq": self.seq, "offset": self._offset, "version": self.version, "custo": self.custo,
+                "fund_id": self.fund_id,
+                "saldos": {str(k): v for k, v in self.saldos.items()},
+                "ativos": self.ativos,
+                "fundo_transferido": self.fundo_transferido, "fundo_gasto": self.fundo_gasto,
+            }
+            os.makedirs(os.path.dirname(self.checkpoint_file) or ".", exist_ok=True)
+            tmp = self.checkpoint_file + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(estado, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.checkpoint_file)
+            self._desde_checkpoint = 0
+
+    def load(self):
+        """Checkpoint + eventos posteriores do diário."""
+        with self._lock:
+            self._reset()
+            if self.journal is None:
+                return self
+            if os.path.exists(self.checkpoint_file):
+                with open(self.checkpoint_file, encoding="utf-8") as f:
+                    estado = json.load(f)
+                self.seq, self.version = estado["seq"], estado.get("version")
+                self.saldos = {int(k): list(v) for k, v in estado["saldos"].items()}
+                self.ativos = estado["ativos"]
+                self.fundo_transferido, self.fundo_gasto = estado["fundo_transferido"], estado["fundo_gasto"]
+                # foto antiga (sem offset) ou diário recriado: relê tudo e filtra pelo seq
+                offset = estado.get("offset", 0)
+                if os.path.exists(self.journal) and os.path.getsize(self.journal) >= offset:
+                    self._offset = offset
+            base = self.seq
+            for ev in self._read_new():
+                if ev["seq"] > base:
+                    self._registra(ev)
+                    self._desde_checkpoint += 1
+            # a parte do Fundo depende do custo individual, que pode ter mudado no concurso
+            self.fundo_cotas = sum(max(0, c[0] - self.custo) for pid, c in self.saldos.items() if pid != self.fund_id)
+        return self
+
+    # --- SINCRONIZAÇÃO COM A PLANILHA ---
+    def sync(self, snap):
+        """Registra só a diferença entre o snapshot e os eventos ativos. Devolve quantos eventos gerou."""
+        with self._lock:
+            self._catch_up()
+            if snap.version == self.version:
+                return 0
+            with self._file_lock():
+                self._catch_up()
+                eventos = self._diff(snap)
+                self.version = snap.version
+                self._commit(eventos)
+            return len(eventos)
+
+    def _diff(self, snap):
+        """Eventos que levam os ativos do livro ao que o snapshot diz (estornos + lançamentos)."""
+        atuais = {}
+        c = snap.contributions
+        if "player_id" in c and len(c["player_id"]):
+            ids = c.get("contrib_id", c.get("id"))
+            ids = np.asarray(ids if ids is not None else [""] * len(c["player_id"]), dtype=object).astype(str)
+            pago = np.asarray(c["pago"]) if "pago" in c else np.ones(len(ids), dtype=bool)
+            for i, (cid, pid, valor, ok) in enumerate(zip(ids, np.asarray(c["player_id"]), np.asarray(c["valor"]), pago)):
+                if ok == True:
+                    # linhas antigas sem id ficam identificadas pela posição
+                    ref = f"c:{cid}" if cid not in ("", "nan", "None") else f"c:#{i}"
+                    atuais[ref] = ("contribuicao", int(pid), to_cents(valor), False)
+        bets = snap.bets
+        fundo = fund_bet_mask(snap)
+        for bid, pid, custo, f in zip(bets.id, bets.player_id, bets.custo_total, fundo):
+            atuais[f"a:{bid}"] = ("custo_aposta", int(pid), to_cents(round(float(custo), 2)), bool(f))
+
+        eventos = []
+        for ref, ev in list(self.ativos.items()):
+            novo = atuais.get(ref)
+            if novo is None or novo != _chave(ev):
+                eventos.append(self._novo("estorno", ev["player_id"], ev["valor"], ref))
+        for ref, (tipo, pid, valor, f) in atuais.items():
+            ev = self.ativos.get(ref)
+            if ev is None or _chave(ev) != (tipo, pid, valor, f):
+                eventos.append(self._novo(tipo, pid, valor, ref, fundo=f))
+        return eventos
+
+    def transfer_to_fund(self, player_id, valor, obs=""):
+        """Move `valor` (reais) do saldo do jogador para o Fundo."""
+        with self._lock, self._file_lock():
+            self._catch_up()
+            self._commit([self._novo("transferencia_fundo", player_id, to_cents(valor), None, obs=obs)])
+
+    # --- CONSULTAS (buscas em dicionário) ---
+    def balance(self, player_id):
+        pago, gasto, transf = self.saldos.get(int(player_id), (0, 0, 0))
+        return {"total_pago": from_cents(pago), "total_gasto": from_cents(gasto),
+                "transferido": from_cents(transf), "saldo": from_cents(pago - gasto - transf)}
+
+    def paid(self, player_id):
+        return self.saldos.get(int(player_id), (0,))[0] / 100
+
+    def fund(self):
+        entrada = self.fundo_cotas + self.fundo_transferido
+        return {"arrecadado": from_cents(entrada), "gasto": from_cents(self.fundo_gasto),
+                "saldo": from_cents(entrada - self.fundo_gasto)}
+
+    def rows(self, player_map):
+        """Uma tupla (BALANCE_COLUMNS) por jogador, lida direto dos saldos."""
+        for pid, nome in player_map.items():
+            pago, gasto, transf = self.saldos.get(int(pid), (0, 0, 0))
+            yield int(pid), nome, pago / 100, gasto / 100, (pago - gasto - transf) / 100
+
+    def frame(self, player_map):
+        """Mesmo formato de utils_mb.balances(), com os valores do livro."""
+        return pd.DataFrame(list(self.rows(player_map)), columns=list(BALANCE_COLUMNS))
+
+    def events(self):
+        """Trilha de auditoria: todos os eventos do diário (e os da memória), em ordem."""
+        path, fim = (self.journal, None) if self.journal else self._historico or (None, 0)
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                dados = f.read() if fim is None else f.read(fim)
+            for line in dados.splitlines():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+        yield from self._memoria
+
+    def detached(self):
+        """Cópia só em memória do estado atual (sincronizar a cópia não grava nada)."""
+        with self._lock:
+            copia = Ledger(self.contest_id, from_cents(self.custo), self.fund_id, folder=None)
+            copia.seq, copia.version = self.seq, self.version
+            copia.saldos = {pid: list(conta) for pid, conta in self.saldos.items()}
+            copia.ativos = dict(self.ativos)
+            copia.fundo_cotas, copia.fundo_transferido, copia.fundo_gasto = (
+                self.fundo_cotas, self.fundo_transferido, self.fundo_gasto)
+            copia._historico = (self.journal, self._offset) if self.journal else self._historico
+            copia._memoria = list(self._memoria)
+            return copia
+
+# --- UM LIVRO POR CONCURSO ---
+_lock = threading.Lock()
+_ledgers = {}
+_copias = {}    # contest_id -> ((versão do snapshot, seq do livro), cópia em memória)
+
+def ledger_for(snap):
+    """
+    Livro do concurso do snapshot, carregado uma vez por processo. Só o snapshot lido
+    da planilha (source "planilha") sincroniza o livro gravado; os demais (arquivo,
+    fallback, fila) recebem uma cópia em memória sincronizada com eles.
+    """
+    contest = snap.contest
+    with _lock:
+        ledger = _ledgers.get(contest.id)
+        if ledger is None or ledger.fund_id != snap.fund_id or ledger.custo != to_cents(contest.custo_individual):
+            ledger = Ledger(contest.id, contest.custo_individual, snap.fund_id).load()
+            _ledgers[contest.id] = ledger
+    if snap.source == "planilha":
+        ledger.sync(snap)
+        return ledger
+    with ledger._lock:
+        ledger._catch_up()
+        chave = (snap.version, ledger.seq)
+        with _lock:
+            guardada = _copias.get(contest.id)
+        if guardada and guardada[0] == chave:
+            return guardada[1]
+        copia = ledger.detached()
+    copia.sync(snap)
+    with _lock:
+        _copias[contest.id] = (chave, copia)
+    return copia
@@ -0,0 +1,175 @@
+"""
+Simulador Monte Carlo do bolão: sorteia milhões de resultados aleatórios e confere
+cada um contra a tabela inteira de apostas (máscaras de bits dos dois lados).
+
+O trabalho é dividido em lotes de tamanho fixo, cada um com sua própria semente
+(SeedSequence.spawn), e distribuído num pool de processos. Como a divisão não depende
+do número de processos, a mesma semente dá sempre o mesmo resultado.
+Cada lote devolve só histogramas e somas — nunca os sorteios — então a memória
+fica limitada pelo tamanho do lote, não pelo número de sorteios.
+"""
+
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from rateio_mb import bet_shares
+from utils_mb import random_draw_masks, score_masks
+
+# --- CONFIGURAÇÃO ---
+TASK_DRAWS = 50_000        # sorteios por tarefa enviada ao pool
+CELLS = 2_000_000          # células (sorteios x apostas) por bloco dentro da tarefa
+SIM_SEED = 2025
+PUBLIC_MAX_DRAWS = 100_000 # teto da página pública (1 processo, em cache); mais que isso, pela CLI
+
+# --- TRABALHO DE CADA PROCESSO ---
+_worker = {}
+
+def _init_worker(lo, hi, rules, premios, dono, fatia):
+    """
+    Recebe os arrays uma vez por processo (initargs), em vez de a cada lote, e já deixa
+    as apostas individuais ordenadas por dono para somar cada grupo com reduceat.
+    """
+    individuais = np.flatnonzero(dono >= 0)
+    ordem = individuais[np.argsort(dono[individuais], kind="stable")]
+    donos = dono[ordem]
+    inicio = np.flatnonzero(np.r_[True, donos[1:] != donos[:-1]]) if ordem.size else ordem
+    _worker.update(lo=lo, hi=hi, rules=rules, premios=premios, fatia=fatia,
+                   ordem=ordem, inicio=inicio, colunas=donos[inicio], fundo=np.flatnonzero(dono < 0))
+
+def _per_player(por_aposta):
+    """Prêmio de cada participante por sorteio (sorteios x participantes)."""
+    fatia, ordem, inicio, colunas, fundo = (_worker[k] for k in ("fatia", "ordem", "inicio", "colunas", "fundo"))
+    pessoa = np.zeros((len(por_aposta), len(fatia)))
+    if ordem.size:
+        pessoa[:, colunas] = np.add.reduceat(por_aposta[:, ordem], inicio, axis=1)
+    if fundo.size:
+        pessoa += np.outer(por_aposta[:, fundo].sum(axis=1), fatia)
+    return pessoa
+
+def _simulate_task(seed_seq, draws):
+    """
+    Um lote de sorteios contra os dados de _init_worker: `premios` é o vetor de valores
+    por faixa (ordem de rules.faixas); o rateio vem de rateio_mb.bet_shares.
+    Devolve só agregados.
+    """
+    lo, hi, rules, premios = (_worker[k] for k in ("lo", "hi", "rules", "premios"))
+    rng = np.random.default_rng(seed_seq)
+    step = max(1, CELLS // max(len(lo), 1))
+    valores = Counter()
+    faixas = [Counter() for _ in rules.faixas]
+    n_players = len(_worker["fatia"])
+    ganhou = np.zeros(n_players, dtype=np.int64)
+    soma = np.zeros(n_players)
+    soma_q = np.zeros(n_players)
+    maximo = np.zeros(n_players)
+
+    done = 0
+    while done < draws:
+        d = min(step, draws - done)
+        d_lo, d_hi = random_draw_masks(rng, d, rules)
+        placar = score_masks(lo, hi, d_lo[:, None], d_hi[:, None], rules)
+        por_aposta = np.zeros((d, len(lo)))
+        for j, (_, key, _) in enumerate(rules.faixas):
+            jogos = placar[key]
+            por_aposta += jogos * premios[j]
+            faixas[j].update(dict(zip(*np.unique(jogos.sum(axis=1), return_counts=True))))
+        grupo = por_aposta.sum(axis=1)
+        valores.update(dict(zip(*np.unique(grupo, return_counts=True))))
+        pessoa = _per_player(por_aposta)
+        ganhou += np.count_nonzero(pessoa > 0, axis=0)
+        soma += pessoa.sum(axis=0)
+        soma_q += (pessoa ** 2).sum(axis=0)
+        np.maximum(maximo, pessoa.max(axis=0, initial=0.0), out=maximo)
+        done += d
+    return valores, faixas, ganhou, soma, soma_q, maximo
+
+# --- RESULTADO ---
+@dataclass(frozen=True)
+class SimulationResult:
+    """Histogramas da simulação: {valor: frequência} e um resumo por jogador."""
+    draws: int
+    seed: int
+    premio_grupo: dict      # prêmio total do bolão -> nº de sorteios
+    faixas: dict            # chave da faixa -> {jogos premiados: nº de sorteios}
+    jogadores: pd.DataFrame
+
+    def distribution(self):
+        """Distribuição do prêmio do grupo como DataFrame (valor, sorteios, probabilidade)."""
+        df = pd.DataFrame(sorted(self.premio_grupo.items()), columns=["valor", "sorteios"])
+        df["probabilidade"] = df["sorteios"] / self.draws
+        return df
+
+    def tier_distribution(self, key):
+        df = pd.DataFrame(sorted(self.faixas[key].items()), columns=["jogos", "sorteios"])
+        df["probabilidade"] = df["sorteios"] / self.draws
+        return df
+
+    @property
+    def p_any(self):
+        """Fração dos sorteios em que o bolão ganhou alguma coisa."""
+        return 1 - self.premio_grupo.get(0.0, 0) / self.draws
+
+# --- API ---
+def simulate(snap, premios, draws=1_000_000, seed=SIM_SEED, workers=None, shares=None):
+    """
+    Simula `draws` sorteios contra as apostas de `snap`.
+    `premios`: {chave da faixa: valor}. `shares`: (dono, fatia, ids, nomes); o padrão é
+    o rateio do bolão (rateio_mb.bet_shares), então o resumo por jogador já mostra
+    quanto cada um receberia. `workers=1` roda tudo no processo atual.
+    """
+    rules = snap.contest.rules
+    lo = np.ascontiguousarray(snap.bets.mascara)
+    hi = np.ascontiguousarray(snap.bets.mascara_hi)
+    premio_vec = np.array([float(premios.get(key, 0) or 0) for _, key, _ in rules.faixas])
+    if shares is None:
+        shares = bet_shares(snap)
+    dono, fatia, player_ids, nomes = shares
+
+    tamanhos = [TASK_DRAWS] * (draws // TASK_DRAWS)
+    if draws % TASK_DRAWS:
+        tamanhos.append(draws % TASK_DRAWS)
+    seeds = np.random.SeedSequence(seed).spawn(len(tamanhos))
+    dados = (lo, hi, rules, premio_vec, np.asarray(dono, dtype=np.int64), np.asarray(fatia, dtype=np.float64))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tamanhos) == 1:
+        _init_worker(*dados)
+        parciais = list(map(_simulate_task, seeds, tamanhos))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tamanhos)), initializer=_init_worker,
+                                 initargs=dados) as pool:
+            parciais = list(pool.map(_simulate_task, seeds, tamanhos))
+
+    valores, faixas = Counter(), [Counter() for _ in rules.faixas]
+    n_players = len(player_ids)
+    ganhou, soma, soma_q, maximo = (np.zeros(n_players) for _ in range(4))
+    for v, f, g, s, sq, mx in parciais:
+        valores.update(v)
+        for total, parcial in zip(faixas, f):
+            total.update(parcial)
+        ganhou += g
+        soma += s
+        soma_q += sq
+        np.maximum(maximo, mx, out=maximo)
+
+    media = soma / draws
+    jogadores = pd.DataFrame({
+        "player_id": player_ids,
+        "nome": nomes,
+        "p_premio": ganhou / draws,
+        "media": media,
+        "desvio": np.sqrt(np.maximum(soma_q / draws - media ** 2, 0)),
+        "maximo": maximo,
+    })
+    return SimulationResult(
+        draws=draws,
+        seed=seed,
+        premio_grupo={float(k): int(v) for k, v in valores.items()},
+        faixas={key: {int(k): int(v) for k, v in c.items()} for (_, key, _), c in zip(rules.faixas, faixas)},
+        jogadores=jogadores,
+    )
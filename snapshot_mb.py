@@ -0,0 +1,168 @@
+"""
+Exporta / importa o estado completo do bolão (jogadores, apostas com as máscaras
+já calculadas e contribuições) num único arquivo .npz, com um cabeçalho de schema em JSON.
+
+Textos são gravados como UTF-8 concatenado + offsets (sem pickle), categorias como
+códigos + lista de categorias, e colunas numéricas como arrays NumPy. Quando o
+arquivo não é comprimido, as colunas numéricas das apostas são abertas com
+memmap direto de dentro do .npz, sem ler o arquivo inteiro.
+"""
+import json
+import os
+import struct
+import zipfile
+from dataclasses import asdict, fields
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils_mb import (BetStore, Contest, DEFAULT_CONTEST, _assemble_snapshot, _fallback_path, _write_base,
+                      get_contest, contest_archive_path)
+
+FORMAT = "bolao-snapshot"
+FORMAT_VERSION = 1
+SCHEMA_KEY = "__schema__"
+
+# --- CODIFICAÇÃO DE COLUNAS ---
+def _encode_strings(values):
+    strs = ["" if v is None or (isinstance(v, float) and np.isnan(v)) else str(v) for v in values]
+    raw = [s.encode("utf-8") for s in strs]
+    offsets = np.zeros(len(raw) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter((len(b) for b in raw), dtype=np.int64, count=len(raw)), out=offsets[1:])
+    return np.frombuffer(b"".join(raw), dtype=np.uint8), offsets
+
+def _decode_strings(data, offsets):
+    buf = np.asarray(data).tobytes()
+    return np.array([buf[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)], dtype=object)
+
+def _encode_column(arrays, key, values):
+    """Grava a coluna em `arrays` e devolve o tipo registrado no schema."""
+    if isinstance(values, pd.Categorical) or isinstance(getattr(values, "dtype", None), pd.CategoricalDtype):
+        cat = pd.Categorical(values)
+        arrays[f"{key}__codes"] = cat.codes
+        arrays[f"{key}__cats"], arrays[f"{key}__cats_off"] = _encode_strings(cat.categories)
+        return "category"
+    arr = np.asarray(values)
+    if arr.dtype.kind in "biuf":
+        arrays[key] = arr
+        return arr.dtype.str
+    arrays[f"{key}__utf8"], arrays[f"{key}__off"] = _encode_strings(arr)
+    return "str"
+
+def _decode_column(npz, key, kind, mmap_path=None):
+    if kind == "category":
+        cats = _decode_strings(npz[f"{key}__cats"], npz[f"{key}__cats_off"])
+        return pd.Categorical.from_codes(npz[f"{key}__codes"], categories=cats)
+    if kind == "str":
+        return _decode_strings(npz[f"{key}__utf8"], npz[f"{key}__off"])
+    if mmap_path:
+        arr = _mmap_member(mmap_path, key)
+        if arr is not None:
+            return arr
+    return npz[key]
+
+def _mmap_member(path, key):
+    """Abre um array de dentro do .npz via memmap (só se o membro não estiver comprimido)."""
+    with zipfile.ZipFile(path) as zf:
+        info = zf.getinfo(key + ".npy")
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+    with open(path, "rb") as f:
+        f.seek(info.header_offset)
+        local = f.read(30)
+        name_len, extra_len = struct.unpack("<HH", local[26:30])
+        f.seek(info.header_offset + 30 + name_len + extra_len)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    if dtype.hasobject or int(np.prod(shape)) == 0:
+        return None
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape, offset=offset, order="F" if fortran else "C")
+
+# --- EXPORTAÇÃO / IMPORTAÇÃO ---
+def export_snapshot(snap, path, compress=False):
+    """
+    Grava o snapshot em `path` (escrita atômica). Sem compressão o arquivo pode ser
+    aberto com memmap; com compress=True fica menor, mas é lido inteiro.
+    """
+    tables = {
+        "jogadores": snap.players,
+        "apostas": {f.name: getattr(snap.bets, f.name) for f in fields(BetStore)},
+        "contribuicoes": snap.contributions,
+    }
+    arrays = {}
+    schema = {
+        "format": FORMAT,
+        "format_version": FORMAT_VERSION,
+        "data_version": snap.version,
+        "concurso": asdict(snap.contest),
+        "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "tables": {},
+    }
+    for table, cols in tables.items():
+        schema["tables"][table] = {c: _encode_column(arrays, f"{table}.{c}", v) for c, v in cols.items()}
+    arrays[SCHEMA_KEY] = np.frombuffer(json.dumps(schema).encode("utf-8"), dtype=np.uint8)
+
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        (np.savez_compressed if compress else np.savez)(f, **arrays)
+    os.replace(tmp, path)
+    return schema
+
+def read_schema(path):
+    with np.load(path, allow_pickle=False) as npz:
+        return json.loads(npz[SCHEMA_KEY].tobytes().decode("utf-8"))
+
+def import_snapshot(path, mmap=True, contest_id=None, source="arquivo"):
+    """
+    Lê o arquivo de volta no mesmo Snapshot que get_snapshot() devolve, marcado com
+    `source`. Com `contest_id`, levanta ValueError se o arquivo for de outro concurso.
+    """
+    with np.load(path, allow_pickle=False) as npz:
+        schema = json.loads(npz[SCHEMA_KEY].tobytes().decode("utf-8"))
+        if schema.get("format") != FORMAT or schema.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Arquivo {path} não é um snapshot do bolão compatível.")
+        # Arquivos anteriores aos concursos particionados são do concurso legado
+        do_arquivo = str(schema.get("concurso", {}).get("id", DEFAULT_CONTEST.id))
+        if contest_id is not None and do_arquivo != str(contest_id):
+            raise ValueError(f"Arquivo {path} é do concurso {do_arquivo}, não do {contest_id}.")
+        tables = {}
+        for table, cols in schema["tables"].items():
+            mmap_path = path if mmap and table == "apostas" else None
+            tables[table] = {c: _decode_column(npz, f"{table}.{c}", kind, mmap_path) for c, kind in cols.items()}
+
+    bets = tables["apostas"]
+    # Arquivos anteriores às máscaras de 128 bits não têm a palavra alta
+    bets.setdefault("mascara_hi", np.zeros(len(bets["id"]), dtype=np.uint64))
+    store = BetStore(**bets)
+    players = pd.DataFrame(tables["jogadores"])
+    contrib = pd.DataFrame(tables["contribuicoes"])
+    return _assemble_snapshot(schema["data_version"], players, contrib, store,
+                              Contest(**schema["concurso"]) if "concurso" in schema else DEFAULT_CONTEST,
+                              source=source)
+
+def backup_current(path=None, compress=False, contest_id=None):
+    """
+    Exporta o estado atual da planilha do concurso. Sem `path`, grava no arquivo de
+    fallback do próprio concurso (o que _remote_snapshot usa quando o Google falha).
+    Com a planilha fora do ar levanta SheetReadError em vez de copiar a cópia antiga.
+    """
+    contest = get_contest(contest_id)
+    return export_snapshot(_write_base(contest), path or _fallback_path(contest), compress=compress)
+
+def archive_contest(contest_id):
+    """
+    Compacta um concurso encerrado no formato de snapshot. Marque-o como "arquivado"
+    na aba "concursos" e ele passa a ser lido deste arquivo, sem baixar as abas dele.
+    """
+    contest = get_contest(contest_id)
+    path = contest_archive_path(contest.id)
+    export_snapshot(_write_base(contest), path)
+    return path
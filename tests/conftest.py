@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fila_mb  # noqa: E402
+import utils_mb as mb  # noqa: E402
+from carga_mb import MemorySheet, fake_tabs, reset_caches  # noqa: E402
+
+
+@pytest.fixture
+def planilha(tmp_path, monkeypatch):
+    """Planilha em memória (sem latência nem cota) no lugar do Google, com fila e dados locais em tmp."""
+    monkeypatch.chdir(tmp_path)
+    sheet = MemorySheet(fake_tabs(players=10, bets=40, contributions=12), latency=0, latency_per_1k=0,
+                        jitter=0, read_quota=0)
+    monkeypatch.setattr(mb, "get_db_connection", lambda: sheet)
+    monkeypatch.setattr(mb, "SNAPSHOT_FILE", str(tmp_path / "sem_fallback.npz"))
+    monkeypatch.setattr(fila_mb, "FILA_FILE", str(tmp_path / "fila.jsonl"))
+    monkeypatch.setattr(fila_mb, "FLUSH_DELAY", 3600)
+    monkeypatch.setattr(fila_mb, "_state", {"loaded": False, "seq": 0, "pending": {}, "conflicts": [], "revision": 0})
+    monkeypatch.setattr(fila_mb, "_overlay", {})
+    reset_caches()
+    yield sheet
+    if fila_mb._timer is not None:
+        fila_mb._timer.cancel()
+        fila_mb._timer = None
+    reset_caches()
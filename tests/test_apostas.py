@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from utils_mb import (MEGA_SENA, BetStore, bet_numbers, build_bet_store, draw_masks, join_mask,
+                      mask_to_numbers, numbers_to_mask, score_masks, split_mask)
+
+
+def _store(apostas):
+    return build_bet_store(pd.DataFrame({"id": [f"b{i}" for i in range(len(apostas))],
+                                         "numeros": [str(a) for a in apostas]}))
+
+
+def test_mascara_ida_e_volta_nas_duas_palavras():
+    numeros = [1, 2, 63, 64, 65, 100, 128]
+    lo, hi = split_mask(numbers_to_mask(numeros))
+    assert mask_to_numbers(join_mask(lo, hi)) == numeros
+    assert numbers_to_mask("04, 12 - 23") == numbers_to_mask([4, 12, 23])
+
+
+def test_store_tipado_a_partir_das_celulas_cruas():
+    raw = pd.DataFrame({
+        "id": ["a", "b", "c"],
+        "player_id": ["1", "2.0", ""],
+        "apostador": ["Ana", "Bia", "Fundo"],
+        "numeros": ["[4, 12, 23, 35, 47, 58]", "1 2 3 4 5 6 70", "ilegível"],
+        "custo_total": ["R$ 6,00", "42", ""],
+        "conferido": ["TRUE", "falso", "SIM"],
+    })
+    store = build_bet_store(raw)
+    assert store.mascara.dtype == np.uint64 and store.player_id.dtype == np.int32
+    assert store.qtd_numeros.tolist() == [6, 7, 0]
+    assert store.player_id.tolist() == [1, 2, 0]
+    assert store.custo_total.tolist() == [6.0, 42.0, 0.0]
+    assert store.conferido.tolist() == [True, False, True]
+    assert bet_numbers(store.to_frame().iloc[1]) == [1, 2, 3, 4, 5, 6, 70]
+
+    de_volta = BetStore.from_frame(store.to_frame())
+    assert np.array_equal(de_volta.mascara, store.mascara)
+    assert np.array_equal(de_volta.mascara_hi, store.mascara_hi)
+
+
+def test_score_masks_com_desdobramento_e_broadcasting():
+    store = _store([[1, 2, 3, 4, 5, 6, 7], [1, 2, 3, 4, 5, 6], [10, 20, 30, 40, 50, 60]])
+    lo, hi = draw_masks([1, 2, 3, 4, 5, 6])
+    placar = score_masks(store.mascara, store.mascara_hi, lo, hi, MEGA_SENA)
+    assert placar["acertos"].tolist() == [6, 6, 0]
+    # 7 dezenas com a sena: 1 jogo com 6 acertos e 6 jogos com 5
+    assert placar["senas"].tolist() == [1, 1, 0]
+    assert placar["quinas"].tolist() == [6, 0, 0]
+    assert placar["quadras"].tolist() == [0, 0, 0]
+
+    sorteios = [[1, 2, 3, 4, 5, 6], [1, 2, 3, 4, 59, 60]]
+    d_lo, d_hi = (np.array(x)[:, None] for x in zip(*(draw_masks(d) for d in sorteios)))
+    matriz = score_masks(store.mascara, store.mascara_hi, d_lo, d_hi, MEGA_SENA)
+    assert matriz["acertos"].shape == (2, 3)
+    assert matriz["quadras"][1].tolist() == [3, 1, 0]       # C(4,4) * C(3,2) jogos com 4 acertos
@@ -0,0 +1,16 @@
+from decimal import Decimal
+
+import pytest
+
+from cli_mb import parse_prizes
+
+
+def test_parse_prizes_aceita_formato_brasileiro():
+    premios = parse_prizes(["quadras=1.200,50", "quinas=55000", "senas=850.000.000", "extra=12.5"])
+    assert premios == {"quadras": Decimal("1200.50"), "quinas": Decimal("55000"),
+                       "senas": Decimal("850000000"), "extra": Decimal("12.5")}
+
+
+def test_parse_prizes_rejeita_valor_invalido():
+    with pytest.raises(SystemExit):
+        parse_prizes(["quadras=mil"])
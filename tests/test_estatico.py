@@ -0,0 +1,37 @@
+import dataclasses
+import os
+
+import cli_mb
+import estatico_mb
+import utils_mb as mb
+
+SORTEIO = [4, 12, 23, 35, 47, 58]
+
+
+def test_publica_com_premios_padrao_e_apaga_versoes_antigas(planilha, monkeypatch, tmp_path):
+    monkeypatch.setattr(estatico_mb, "STATIC_DIR", str(tmp_path / "static"))
+    snap = mb.get_snapshot()
+    assert estatico_mb.published_result(snap, SORTEIO) is None
+
+    antigo = estatico_mb.publish_result(snap, SORTEIO)
+    outro = estatico_mb.publish_result(snap, [1, 2, 3, 4, 5, 6])
+    assert estatico_mb.published_result(snap, SORTEIO) == antigo
+
+    novo_snap = dataclasses.replace(snap, version=snap.version + "-nova")
+    assert estatico_mb.published_result(novo_snap, SORTEIO) is None
+    novo = estatico_mb.publish_result(novo_snap, SORTEIO)
+    assert novo != antigo
+    assert sorted(os.listdir(tmp_path / "static")) == sorted(
+        os.path.basename(p) + ext for p in (novo, outro) for ext in ("", ".gz"))
+
+    with open(novo, encoding="utf-8") as f:
+        pagina = f.read()
+    esperado = estatico_mb.render_result_html(novo_snap, SORTEIO, mb.default_prizes(snap.contest.rules))
+    assert pagina == esperado
+
+
+def test_lancar_grava_e_publica(planilha, monkeypatch, tmp_path):
+    monkeypatch.setattr(estatico_mb, "STATIC_DIR", str(tmp_path / "static"))
+    assert cli_mb.main(["lancar", "--sorteio", " ".join(map(str, SORTEIO))]) == 0
+    assert SORTEIO in [d["dezenas"] for d in mb.load_draws()]
+    assert estatico_mb.published_result(mb.get_snapshot(), SORTEIO) is not None
@@ -0,0 +1,91 @@
+import random
+from collections import Counter
+from types import SimpleNamespace
+
+import estatisticas_mb
+from estatisticas_mb import StatsStore
+from utils_mb import numbers_to_mask, split_mask
+
+
+def _snap(versao, apostas):
+    """Snapshot mínimo para StatsStore.sync: [(id, dezenas, nome)]."""
+    partes = [split_mask(numbers_to_mask(dezenas)) for _, dezenas, _ in apostas]
+    bets = SimpleNamespace(id=[a[0] for a in apostas], mascara=[lo for lo, _ in partes],
+                           mascara_hi=[hi for _, hi in partes])
+    return SimpleNamespace(version=versao, bets=bets, bet_nome=[a[2] for a in apostas])
+
+
+def _estado(store):
+    return store.version, store.freq, store.histogram(), sorted(store.duplicates()), store.nomes, store.pairs
+
+
+def test_dezenas_fora_do_universo_sao_ignoradas(tmp_path):
+    store = StatsStore("t", 60, str(tmp_path))
+    store.add("a", numbers_to_mask([1, 2, 3, 4, 5, 61, 80]), "Ana")
+    assert len(store.freq) == 60
+    assert store.masks["a"] == numbers_to_mask([1, 2, 3, 4, 5])
+    # a mesma aposta na próxima versão não conta como mudança
+    assert store.sync(_snap(1, [("a", [1, 2, 3, 4, 5, 61, 80], "Ana")])) == 0
+
+
+def test_diario_grava_so_o_delta_e_compacta(tmp_path, monkeypatch):
+    apostas = [("a", [1, 2, 3, 4, 5, 6], "Ana"), ("b", [1, 2, 3, 7, 8, 9], "Bia"), ("c", [1, 2, 3, 4, 5, 6], "Caio")]
+    store = StatsStore("t", 60, str(tmp_path)).load()
+    store.sync(_snap(1, apostas))
+    store.sync(_snap(2, [("a", [1, 2, 3, 4, 5, 6], "Ana Maria"), ("b", [1, 2, 3, 7, 8, 10], "Bia")]))
+
+    registros = open(store.journal, encoding="utf-8").read().splitlines()
+    assert len(registros) == 2 and '"Caio"' not in registros[1]   # só o que mudou
+    assert _estado(StatsStore("t", 60, str(tmp_path)).load()) == _estado(store)
+
+    monkeypatch.setattr(estatisticas_mb, "CHECKPOINT_EVERY", 1)
+    store.sync(_snap(3, apostas))
+    assert open(store.journal, encoding="utf-8").read() == ""
+    assert _estado(StatsStore("t", 60, str(tmp_path)).load()) == _estado(store)
+
+
+def _do_zero(apostas, universo=60):
+    """Frequência, histograma, pares e repetidos recalculados comparando todos os pares."""
+    conjuntos = {bid: frozenset(n for n in dezenas if n <= universo) for bid, dezenas, _ in apostas}
+    freq = [sum(n in s for s in conjuntos.values()) for n in range(1, universo + 1)]
+    hist, pares = Counter(), {}
+    ids = list(conjuntos)
+    for i, a in enumerate(ids):
+        for b in ids[i + 1:]:
+            k = len(conjuntos[a] & conjuntos[b])
+            hist[k] += 1
+            if k >= estatisticas_mb.MIN_LEVEL:
+                pares.setdefault(k, set()).add(frozenset((a, b)))
+    grupos = Counter(conjuntos.values())
+    repetidos = sorted(sorted(s) for s, n in grupos.items() if n > 1)
+    return freq, dict(hist), pares, repetidos
+
+
+def test_deltas_batem_com_o_recalculo_completo(tmp_path):
+    rng = random.Random(3)
+    apostas = {}
+    store = StatsStore("t", 60, str(tmp_path))
+    for versao in range(1, 40):
+        antes = {bid: dezenas for bid, (dezenas, _) in apostas.items()}
+        for _ in range(rng.randint(1, 6)):
+            acao = rng.random()
+            if apostas and acao < 0.3:
+                del apostas[rng.choice(sorted(apostas))]
+            elif apostas and acao < 0.5:
+                bid = rng.choice(sorted(apostas))          # aposta editada: mesma id, outras dezenas
+                apostas[bid] = (sorted(rng.sample(range(1, 16), 6)), apostas[bid][1])
+            else:
+                # universo pequeno de dezenas para gerar repetidos e pares com muito em comum
+                apostas[f"b{versao}_{acao:.6f}"] = (sorted(rng.sample(range(1, 16), rng.choice([6, 6, 7]))), "X")
+        lista = [(bid, dezenas, nome) for bid, (dezenas, nome) in apostas.items()]
+        depois = {bid: dezenas for bid, dezenas, _ in lista}
+        # editada conta duas vezes (sai a versão antiga, entra a nova)
+        mudou = sum(depois.get(b) != d for b, d in antes.items()) + sum(antes.get(b) != d for b, d in depois.items())
+        assert store.sync(_snap(versao, lista)) == mudou
+
+        freq, hist, pares, repetidos = _do_zero(lista)
+        assert store.freq == freq
+        assert {k: v for k, v in store.histogram().items() if v} == {k: v for k, v in hist.items() if v}
+        assert {k: {frozenset(p) for p in v} for k, v in store.pairs.items() if v} == pares
+        assert sorted(numeros for numeros, _ in store.duplicates()) == repetidos
+        assert store.pair_count(5) == len(pares.get(5, ()))
@@ -0,0 +1,27 @@
+import io
+import os
+
+from exportar_mb import export_file
+from openpyxl import load_workbook
+
+
+def _linhas():
+    yield ["nome", "valor"]
+    for i in range(12_000):
+        yield [f"Jogador {i}", i / 100]
+
+
+def test_export_file_csv_sai_do_disco_e_fica_so_o_arquivo_aberto():
+    with export_file(_linhas(), "csv") as f:
+        assert isinstance(f, io.BufferedReader)      # tipo aceito por st.download_button
+        assert not os.path.exists(f.name)
+        texto = f.read().decode("utf-8-sig").splitlines()
+    assert texto[0] == "nome;valor" and len(texto) == 12_001
+    assert texto[-1] == "Jogador 11999;119.99"
+
+
+def test_export_file_xlsx():
+    with export_file(_linhas(), "xlsx", "Teste") as f:
+        wb = load_workbook(io.BytesIO(f.read()), read_only=True)
+    linhas = list(wb["Teste"].iter_rows(values_only=True))
+    assert len(linhas) == 12_001 and linhas[-1] == ("Jogador 11999", 119.99)
@@ -0,0 +1,150 @@
+import json
+
+import pytest
+
+import fila_mb
+import utils_mb as mb
+from carga_mb import MemoryWorksheet, QuotaExceeded
+
+
+def _nova_aposta():
+    return {"id": "nova-1", "player_id": 1, "apostador": "Jogador 0001", "numeros": [1, 2, 3, 4, 5, 6],
+            "custo_total": 6.0, "conferido": False, "ts": "2025-12-30 20:00:00", "descricao": "Bolão"}
+
+
+def _falha_na_leitura(monkeypatch, aba, erro):
+    original = MemoryWorksheet.get_values
+
+    def get_values(self):
+        if self.title == aba:
+            return erro(self)
+        return original(self)
+
+    monkeypatch.setattr(MemoryWorksheet, "get_values", get_values)
+
+
+def _levanta_429(ws):
+    raise QuotaExceeded("429: cota excedida")
+
+
+@pytest.mark.parametrize("erro", [_levanta_429, lambda ws: []], ids=["429", "vazia"])
+def test_flush_nao_grava_se_a_leitura_falhar(planilha, monkeypatch, erro):
+    antes = [list(r) for r in planilha.tabs["apostas"].values]
+    fila_mb.enqueue("add_bet", "apostas", {"row": _nova_aposta()}, "2025")
+
+    _falha_na_leitura(monkeypatch, "apostas", erro)
+    res = fila_mb.flush()
+
+    assert res["gravadas"] == 0
+    assert res["nao_lidas"] == ["apostas"]
+    assert planilha.tabs["apostas"].values == antes
+    assert [rec["payload"]["row"]["id"] for rec in fila_mb.pending()] == ["nova-1"]
+
+
+def test_flush_grava_quando_a_leitura_funciona(planilha):
+    linhas = len(planilha.tabs["apostas"].values)
+    fila_mb.enqueue("add_bet", "apostas", {"row": _nova_aposta()}, "2025")
+
+    res = fila_mb.flush()
+
+    assert res["gravadas"] == 1 and res["nao_lidas"] == []
+    assert len(planilha.tabs["apostas"].values) == linhas + 1
+    assert fila_mb.pending() == []
+
+
+def test_flush_preserva_colunas_extras_e_numeros_ilegiveis(planilha):
+    aba = planilha.tabs["apostas"]
+    aba.values = [aba.values[0] + ["observacao"]] + [r + [f"obs {i}"] for i, r in enumerate(aba.values[1:])]
+    col = aba.values[0].index("numeros")
+    aba.values[1][col] = "ver foto no grupo"
+    original = [list(r) for r in aba.values]
+
+    fila_mb.enqueue("add_bet", "apostas", {"row": _nova_aposta()}, "2025")
+    assert fila_mb.flush()["gravadas"] == 1
+
+    cabecalho, *linhas = aba.values
+    assert cabecalho[-1] == "observacao"
+    por_id = {r[cabecalho.index("id")]: r for r in linhas}
+    for r in original[1:]:
+        gravada = por_id[r[original[0].index("id")]]
+        assert gravada[-1] == r[-1]
+    assert por_id[original[1][0]][cabecalho.index("numeros")] == "ver foto no grupo"
+    assert por_id["nova-1"][cabecalho.index("numeros")] == "[1, 2, 3, 4, 5, 6]"
+    assert por_id["nova-1"][-1] == ""
+
+
+def _linha(planilha, bet_id):
+    cabecalho, *linhas = planilha.tabs["apostas"].values
+    return next(dict(zip(cabecalho, r)) for r in linhas if r[0] == bet_id)
+
+
+def _reinicia_processo(monkeypatch):
+    """Esquece o estado em memória, como um servidor que caiu e subiu de novo."""
+    monkeypatch.setattr(fila_mb, "_state", {"loaded": False, "seq": 0, "pending": {}, "conflicts": [], "revision": 0})
+    monkeypatch.setattr(fila_mb, "_overlay", {})
+
+
+def test_replay_depois_do_crash_nao_duplica(planilha, monkeypatch):
+    linhas = len(planilha.tabs["apostas"].values)
+    fila_mb.enqueue("add_bet", "apostas", {"row": _nova_aposta()}, "2025")
+    assert fila_mb.flush()["gravadas"] == 1
+
+    # Caiu depois de gravar na planilha e antes de marcar "done": o journal ainda tem a operação
+    with open(fila_mb.FILA_FILE, "w", encoding="utf-8") as f:
+        f.write('{"seq": 1, "op": "add_bet", "tab": "apostas", "concurso": "2025", "payload": {"row": '
+                + json.dumps(_nova_aposta()) + '}}\n{"seq": 2, "op": "add_b')   # última linha truncada
+    _reinicia_processo(monkeypatch)
+
+    assert [rec["seq"] for rec in fila_mb.pending()] == [1]
+    res = fila_mb.flush()
+    assert res["gravadas"] == 1 and res["conflitos"] == []
+    assert len(planilha.tabs["apostas"].values) == linhas + 1
+    assert fila_mb.pending() == []
+
+
+def test_pendente_aparece_no_snapshot_antes_do_flush(planilha):
+    mb.add_bet("Jogador 0001", [1, 2, 3, 4, 5, 6], player_id=1)
+    snap = mb.get_snapshot()
+    assert snap.source == "fila"
+    assert [1, 2, 3, 4, 5, 6] in [mb.bet_numbers(r) for _, r in snap.bets_frame().iterrows()]
+    assert "[1, 2, 3, 4, 5, 6]" not in [r[3] for r in planilha.tabs["apostas"].values]
+
+
+def test_exclusao_de_linha_alterada_vira_conflito(planilha):
+    mb.delete_bets(["b0", "b1"])
+    planilha.tabs["apostas"].values[1][4] = "99,00"    # alguém mexeu no custo de b0 direto na planilha
+
+    res = fila_mb.flush()
+
+    assert res["gravadas"] == 0 and len(res["conflitos"]) == 1
+    assert "b0" in res["conflitos"][0]["motivo"]
+    assert _linha(planilha, "b0") and _linha(planilha, "b1")     # nada foi apagado
+    assert fila_mb.pending() == [] and len(fila_mb.conflicts()) == 1
+
+
+def test_toggle_reaplicado_nao_inverte_de_novo(planilha, monkeypatch):
+    antes = _linha(planilha, "b2")["conferido"]
+    assert mb.toggle_bet_verified("b2")
+    assert fila_mb.flush()["gravadas"] == 1
+    depois = _linha(planilha, "b2")["conferido"]
+    assert depois != antes
+
+    # O mesmo registro reaplicado (replay) grava o valor final, não inverte outra vez
+    rec = {"seq": 1, "op": "set_bet_verified", "tab": "apostas", "concurso": "2025",
+           "payload": {"id": "b2", "conferido": depois == "TRUE", "expected": "qualquer"}}
+    with open(fila_mb.FILA_FILE, "w", encoding="utf-8") as f:
+        f.write(json.dumps(rec) + "\n")
+    _reinicia_processo(monkeypatch)
+    res = fila_mb.flush()
+    assert res["gravadas"] == 1 and res["conflitos"] == []
+    assert _linha(planilha, "b2")["conferido"] == depois
+
+
+def test_toggle_de_aposta_apagada_vira_conflito(planilha):
+    assert mb.toggle_bet_verified("b3")
+    planilha.tabs["apostas"].values = [r for r in planilha.tabs["apostas"].values if r[0] != "b3"]
+
+    res = fila_mb.flush()
+
+    assert res["gravadas"] == 0
+    assert "não existe mais" in res["conflitos"][0]["motivo"]
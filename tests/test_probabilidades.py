@@ -0,0 +1,54 @@
+from itertools import combinations
+from math import comb
+
+import pandas as pd
+import pytest
+
+import probabilidades_mb
+from utils_mb import LotteryRules, build_bet_store
+
+MINI = LotteryRules("mini", "Mini", 12, 3, 5, ((3, "ternos", "Terno"), (2, "duques", "Duque")), 1.0)
+APOSTAS = [[1, 2, 3], [3, 4, 5, 6], [1, 2, 3], [7, 8, 9, 10, 11], [2, 6, 12]]
+
+
+def _store(apostas):
+    return build_bet_store(pd.DataFrame({"id": [f"b{i}" for i in range(len(apostas))],
+                                         "numeros": [str(a) for a in apostas]}))
+
+
+def _forca_bruta(apostas, rules, m):
+    """Fração dos sorteios possíveis em que alguma aposta faz `m` acertos ou mais."""
+    ganhos = [any(len(set(a) & set(d)) >= m for a in apostas)
+              for d in combinations(range(1, rules.universo + 1), rules.sorteadas)]
+    return sum(ganhos) / comb(rules.universo, rules.sorteadas)
+
+
+@pytest.mark.parametrize("m", [2, 3])
+def test_uniao_exata_igual_a_forca_bruta(m):
+    p, metodo, erro = probabilidades_mb.union_probability(_store(APOSTAS), MINI, min_hits=m)
+    assert metodo == "exato" and erro == 0.0
+    assert p == pytest.approx(_forca_bruta(APOSTAS, MINI, m), abs=1e-12)
+
+
+def test_monte_carlo_fica_dentro_do_erro(monkeypatch):
+    monkeypatch.setattr(probabilidades_mb, "EXACT_LIMIT", 0)
+    p, metodo, erro = probabilidades_mb.union_probability(_store(APOSTAS), MINI, min_hits=2, draws=50_000)
+    assert metodo == "monte_carlo" and erro > 0
+    assert abs(p - _forca_bruta(APOSTAS, MINI, 2)) < 5 * erro
+
+
+def test_aposta_unica_da_a_hipergeometrica():
+    store = _store([[4, 12, 23, 35, 47, 58]])
+    esperado = sum(comb(6, h) * comb(54, 6 - h) for h in (4, 5, 6)) / comb(60, 6)
+    p, metodo, _ = probabilidades_mb.union_probability(store)
+    assert metodo == "exato" and p == pytest.approx(esperado, rel=1e-12)
+    assert probabilidades_mb.bet_odds(store)["p_premio"].iloc[0] == pytest.approx(esperado, rel=1e-12)
+
+
+def test_valor_esperado_conta_os_jogos_do_desdobramento():
+    store = _store([list(range(1, 8))])                      # 7 dezenas = 7 jogos simples
+    odds = probabilidades_mb.bet_odds(store, premios={"senas": 1_000_000})
+    p_sena_simples = 1 / comb(60, 6)
+    assert odds["e_senas"].iloc[0] == pytest.approx(7 * p_sena_simples)
+    assert odds["valor_esperado"].iloc[0] == pytest.approx(7 * p_sena_simples * 1_000_000)
+
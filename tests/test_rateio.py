@@ -0,0 +1,78 @@
+import dataclasses
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+import utils_mb as mb
+from rateio_mb import (bet_prizes_cents, distribute, from_cents, fund_bet_mask, fund_weights, payout,
+                       split_cents, to_cents)
+
+PREMIOS = {"senas": Decimal("850000000.01"), "quinas": 55_000, "quadras": "1200.50"}
+
+
+@pytest.mark.parametrize("total, pesos, esperado", [
+    (100, [1, 1, 1], [34, 33, 33]),
+    (100, [0, 3, 1], [0, 75, 25]),
+    (7, [2, 2, 1], [3, 3, 1]),
+    (0, [5, 5], [0, 0]),
+    (100, [0, 0], [0, 0]),
+    (100, [], []),
+])
+def test_split_cents_maiores_restos(total, pesos, esperado):
+    assert split_cents(total, pesos).tolist() == esperado
+
+
+def test_split_cents_soma_exata_com_valores_grandes():
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        pesos = rng.integers(0, 10**7, size=rng.integers(1, 40))
+        total = int(rng.integers(1, 10**12))
+        partes = split_cents(total, pesos)
+        if pesos.sum():
+            assert int(partes.sum()) == total
+            assert np.all(np.abs(partes - total * pesos / pesos.sum()) < 1 + 1e-6)
+
+
+def test_centavos_sem_ponto_flutuante():
+    assert to_cents("0.005") == 1 and to_cents(0.1 + 0.2) == 30 and to_cents(None) == 0
+    assert from_cents(123456789) == Decimal("1234567.89")
+
+
+def test_premio_por_aposta_conta_o_desdobramento():
+    rules = mb.MEGA_SENA
+    placar = {"senas": np.array([1, 0]), "quinas": np.array([6, 1]), "quadras": np.array([0, 0])}
+    premios = {"senas": 1000, "quinas": "10.50"}
+    assert bet_prizes_cents(placar, premios, rules).tolist() == [100_000 + 6 * 1_050, 1_050]
+
+
+def test_rateio_fecha_com_o_premio_e_respeita_o_fundo(planilha):
+    snap = mb.get_snapshot()
+    fundo = fund_bet_mask(snap)
+    bets = snap.bets_frame()
+    aposta_fundo = int(np.flatnonzero(fundo)[0])
+    dezenas = sorted(mb.bet_numbers(bets.iloc[aposta_fundo]))[:6]
+
+    placar = snap.score(dezenas)
+    centavos = bet_prizes_cents(placar, PREMIOS, snap.contest.rules)
+    rateio = payout(snap, dezenas, PREMIOS).set_index("player_id")
+
+    assert sum(rateio["total"]) == from_cents(centavos.sum())
+    assert sum(rateio["fundo"]) == from_cents(centavos[fundo].sum())
+    ids, pesos = fund_weights(snap)
+    esperado = split_cents(int(centavos[fundo].sum()), pesos)
+    assert [to_cents(rateio.at[int(i), "fundo"]) for i in ids] == esperado.tolist()
+
+    donos = snap.bets.player_id[~fundo]
+    individual = {int(p): 0 for p in rateio.index}
+    for pid, c in zip(donos, centavos[~fundo]):
+        individual[int(pid)] += int(c)
+    assert {int(p): to_cents(v) for p, v in rateio["individual"].items()} == individual
+
+
+def test_sem_contribuicao_ao_fundo_o_premio_fica_no_fundo(planilha):
+    snap = dataclasses.replace(mb.get_snapshot(), pagamentos={})
+    fundo = fund_bet_mask(snap)
+    centavos = np.where(fundo, 500, 0)
+    rateio = distribute(snap, centavos).set_index("player_id")
+    assert to_cents(rateio.at[snap.fund_id, "total"]) == 500 * int(fundo.sum())
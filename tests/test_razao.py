@@ -0,0 +1,146 @@
+import json
+import os
+
+import razao_mb
+import utils_mb as mb
+from carga_mb import reset_caches
+from rateio_mb import fund_bet_mask
+from razao_mb import Ledger
+
+
+def _livro(snap, pasta):
+    return Ledger(snap.contest.id, snap.contest.custo_individual, snap.fund_id, folder=str(pasta)).load()
+
+
+def _saldos(livro, snap):
+    return {pid: livro.balance(pid) for pid in snap.player_map}
+
+
+def test_dois_processos_no_mesmo_diario_nao_duplicam(planilha, tmp_path):
+    snap = mb.get_snapshot()
+    app, cli = _livro(snap, tmp_path), _livro(snap, tmp_path)
+    assert app.sync(snap) > 0
+    assert cli.sync(snap) == 0              # releu o diário antes de comparar
+    app.transfer_to_fund(1, 5)
+    cli.sync(snap)
+    assert cli.balance(1) == app.balance(1)  # a transferência do outro processo também chega
+
+    depois = _livro(snap, tmp_path)
+    assert _saldos(depois, snap) == _saldos(app, snap)
+    assert depois.fund() == app.fund()
+    refs = [ev["ref"] for ev in app.events() if ev["tipo"] != "transferencia_fundo"]
+    assert len(refs) == len(set(refs))
+
+
+def test_replay_conta_uma_vez_o_lancamento_repetido(tmp_path):
+    ev = {"tipo": "contribuicao", "player_id": 1, "valor": 5000, "ref": "c:c1", "fundo": False}
+    with open(tmp_path / "razao_2025.jsonl", "w", encoding="utf-8") as f:
+        # diário antigo gravado por dois processos sem trava: mesmo ref e mesmo seq
+        for seq in (1, 1, 2):
+            f.write(json.dumps({**ev, "seq": seq}) + "\n")
+    livro = Ledger("2025", 30, 99, folder=str(tmp_path)).load()
+    assert livro.paid(1) == 50.0
+    assert livro.fund()["arrecadado"] == razao_mb.from_cents(2000)
+
+
+def test_so_a_planilha_ao_vivo_grava_no_diario(planilha, monkeypatch, tmp_path):
+    from snapshot_mb import export_snapshot, import_snapshot
+    monkeypatch.setattr(razao_mb, "_ledgers", {})
+    monkeypatch.setattr(razao_mb, "_copias", {})
+    diario = os.path.join(razao_mb.RAZAO_DIR, "razao_2025.jsonl")
+    snap = mb.get_snapshot()
+
+    export_snapshot(snap, str(tmp_path / "antigo.npz"))
+    do_arquivo = razao_mb.ledger_for(import_snapshot(str(tmp_path / "antigo.npz")))
+    assert not os.path.exists(diario)       # ler um .npz não escreve no livro
+    assert do_arquivo.paid(1) == snap.pagamentos.get(1, 0.0)
+
+    ao_vivo = razao_mb.ledger_for(snap)
+    tamanho = os.path.getsize(diario)
+    mb.add_contribution(1, 10)               # fica na fila: get_snapshot() devolve a visão "fila"
+    pendente = mb.get_snapshot()
+    assert pendente.source == "fila"
+    assert razao_mb.ledger_for(pendente).paid(1) == ao_vivo.paid(1) + 10
+    assert os.path.getsize(diario) == tamanho
+    assert ao_vivo.paid(1) == snap.pagamentos.get(1, 0.0)
+
+
+def _relida():
+    reset_caches()
+    return mb.get_snapshot()
+
+
+def _esperado(snap):
+    """Pago e gasto (centavos) por jogador, contados direto do snapshot."""
+    fundo = fund_bet_mask(snap)
+    gasto = {}
+    for pid, custo in zip(snap.bets.player_id[~fundo], snap.bets.custo_total[~fundo]):
+        gasto[int(pid)] = gasto.get(int(pid), 0) + razao_mb.to_cents(round(float(custo), 2))
+    pago = {int(pid): razao_mb.to_cents(v) for pid, v in snap.pagamentos.items()}
+    return pago, gasto, sum(razao_mb.to_cents(round(float(c), 2)) for c in snap.bets.custo_total[fundo])
+
+
+def _confere(livro, snap):
+    pago, gasto, gasto_fundo = _esperado(snap)
+    for pid in snap.player_map:
+        b = livro.balance(pid)
+        assert razao_mb.to_cents(b["total_pago"]) == pago.get(pid, 0)
+        assert razao_mb.to_cents(b["total_gasto"]) == gasto.get(pid, 0)
+    custo = razao_mb.to_cents(snap.contest.custo_individual)
+    cotas = sum(max(0, v - custo) for pid, v in pago.items() if pid != snap.fund_id)
+    assert livro.fund() == {"arrecadado": razao_mb.from_cents(cotas), "gasto": razao_mb.from_cents(gasto_fundo),
+                            "saldo": razao_mb.from_cents(cotas - gasto_fundo)}
+
+
+def test_sync_registra_so_a_diferenca(planilha, tmp_path):
+    snap = mb.get_snapshot()
+    livro = _livro(snap, tmp_path)
+    assert livro.sync(snap) == len(snap.bets) + len(snap.contributions["player_id"])
+    _confere(livro, snap)
+    assert livro.sync(snap) == 0                               # mesma versão: nada a fazer
+
+    contrib = planilha.tabs["contribuicoes"].values
+    contrib[1][2] = "R$ 80,00"                                 # valor alterado: estorno + lançamento
+    planilha.tabs["apostas"].values.pop(1)                     # aposta apagada: só o estorno
+    contrib.append(["c-nova", "2", "R$ 15,00", "TRUE", "2025-12-21 10:00:00", "Pix"])
+    snap = _relida()
+    assert livro.sync(snap) == 4
+    _confere(livro, snap)
+
+    tipos = [ev["tipo"] for ev in livro.events()][-4:]
+    assert sorted(tipos) == ["contribuicao", "contribuicao", "estorno", "estorno"]
+
+
+def test_transferencia_move_saldo_para_o_fundo(planilha, tmp_path):
+    snap = mb.get_snapshot()
+    livro = _livro(snap, tmp_path)
+    livro.sync(snap)
+    antes, fundo = livro.balance(1), livro.fund()
+    livro.transfer_to_fund(1, "12.34")
+    depois = livro.balance(1)
+    assert depois["saldo"] == antes["saldo"] - razao_mb.from_cents(1234)
+    assert depois["transferido"] == razao_mb.from_cents(1234)
+    assert livro.fund()["arrecadado"] == fundo["arrecadado"] + razao_mb.from_cents(1234)
+
+    livro.sync(_relida())                                      # a planilha não apaga a transferência
+    assert livro.balance(1)["transferido"] == razao_mb.from_cents(1234)
+
+
+def test_checkpoint_e_replay_dao_o_mesmo_saldo(planilha, monkeypatch, tmp_path):
+    monkeypatch.setattr(razao_mb, "CHECKPOINT_EVERY", 7)
+    snap = mb.get_snapshot()
+    livro = _livro(snap, tmp_path)
+    livro.sync(snap)
+    planilha.tabs["contribuicoes"].values[2][2] = "R$ 1.000,00"
+    livro.sync(_relida())
+    livro.transfer_to_fund(3, 5)
+    assert os.path.exists(livro.checkpoint_file)
+
+    atual = mb.get_snapshot()
+    do_checkpoint = _livro(snap, tmp_path)
+    os.remove(livro.checkpoint_file)
+    do_zero = _livro(snap, tmp_path)
+    for outro in (do_checkpoint, do_zero):
+        assert _saldos(outro, snap) == _saldos(livro, snap)
+        assert outro.fund() == livro.fund()
+        assert outro.sync(atual) == 0                          # os ativos já batem com a planilha
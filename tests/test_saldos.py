@@ -0,0 +1,24 @@
+import pandas as pd
+
+import cli_mb
+import razao_mb
+import utils_mb as mb
+from exportar_mb import balance_rows
+
+
+def test_livro_exportacao_e_cli_concordam(planilha, monkeypatch, tmp_path):
+    monkeypatch.setattr(razao_mb, "_ledgers", {})
+    snap = mb.get_snapshot()
+    monkeypatch.setattr(cli_mb, "load_source", lambda fonte=None, contest_id=None: snap)
+
+    livro = mb.balances()
+    assert not livro.empty and livro["total_pago"].sum() > 0
+
+    linhas = balance_rows(snap)
+    cabecalho = next(linhas)
+    exportado = pd.DataFrame(list(linhas), columns=cabecalho)
+    pd.testing.assert_frame_equal(exportado, livro, check_dtype=False)
+
+    saida = tmp_path / "saldos.csv"
+    assert cli_mb.main(["saldos", "-o", str(saida)]) == 0
+    pd.testing.assert_frame_equal(pd.read_csv(saida), livro, check_dtype=False)
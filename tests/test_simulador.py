@@ -0,0 +1,44 @@
+import numpy as np
+
+import simulador_mb
+import utils_mb as mb
+from rateio_mb import bet_prizes_cents, bet_shares, distribute, fund_bet_mask
+
+PREMIOS = {"senas": 1_000_000, "quinas": 5_000, "quadras": 1_000}
+
+
+def _sorteios_premiados(snap):
+    """Sorteios tirados das próprias apostas (uma individual e uma do Fundo), para haver prêmio."""
+    fundo = fund_bet_mask(snap)
+    bets = snap.bets_frame()
+    escolhidas = [np.flatnonzero(~fundo)[0]] + ([np.flatnonzero(fundo)[0]] if fundo.any() else [])
+    return [sorted(mb.bet_numbers(bets.iloc[i]))[:snap.contest.rules.sorteadas] for i in escolhidas]
+
+
+def test_rateio_por_participante_igual_ao_distribute(planilha):
+    snap = mb.get_snapshot()
+    rules = snap.contest.rules
+    dono, fatia, ids, _ = bet_shares(snap)
+    premio_vec = np.array([float(PREMIOS.get(key, 0)) for _, key, _ in rules.faixas])
+    simulador_mb._init_worker(snap.bets.mascara, snap.bets.mascara_hi, rules, premio_vec, dono, fatia)
+
+    for dezenas in _sorteios_premiados(snap):
+        placar = snap.score(dezenas)
+        centavos = bet_prizes_cents(placar, PREMIOS, rules)
+        assert centavos.sum() > 0
+        pessoa = simulador_mb._per_player((centavos / 100.0)[None, :])[0]
+        esperado = distribute(snap, centavos).set_index("player_id")["total"].astype(float)
+        # distribute arredonda a parte do Fundo em centavos; o simulador usa a fração exata
+        np.testing.assert_allclose(pessoa, esperado.loc[ids].to_numpy(), atol=0.01)
+        assert abs(pessoa.sum() - centavos.sum() / 100) < 1e-6
+
+
+def test_simulacao_reproduzivel_e_independente_dos_processos(planilha, monkeypatch):
+    monkeypatch.setattr(simulador_mb, "TASK_DRAWS", 1_000)
+    snap = mb.get_snapshot()
+    um = simulador_mb.simulate(snap, PREMIOS, draws=3_000, seed=7, workers=1)
+    dois = simulador_mb.simulate(snap, PREMIOS, draws=3_000, seed=7, workers=2)
+    assert um.premio_grupo == dois.premio_grupo
+    np.testing.assert_allclose(um.jogadores["media"], dois.jogadores["media"])
+    media_grupo = sum(v * n for v, n in um.premio_grupo.items()) / um.draws
+    assert abs(um.jogadores["media"].sum() - media_grupo) < 1e-6
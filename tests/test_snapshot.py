@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+import utils_mb as mb
+from carga_mb import MemoryWorksheet, QuotaExceeded, reset_caches
+from snapshot_mb import backup_current, import_snapshot
+
+
+def _com_dois_concursos(sheet):
+    sheet.tabs["concursos"] = MemoryWorksheet(sheet, "concursos", [
+        ["id", "nome", "ativo"], ["2025", "Bolão 2025", "FALSE"], ["2026", "Bolão 2026", "TRUE"]])
+    for tab in ("apostas", "contribuicoes"):
+        sheet.tabs[f"{tab}_2026"] = MemoryWorksheet(sheet, f"{tab}_2026", [list(r) for r in sheet.tabs[tab].values])
+    reset_caches()
+
+
+def test_backup_vai_para_o_fallback_do_proprio_concurso(planilha):
+    _com_dois_concursos(planilha)
+
+    backup_current(contest_id="2026")
+
+    path = mb._fallback_path(mb.get_contest("2026"))
+    assert os.path.exists(path)
+    assert not os.path.exists(mb.SNAPSHOT_FILE)  # o fallback do concurso legado não foi tocado
+    assert import_snapshot(path, contest_id="2026").contest.id == "2026"
+    with pytest.raises(ValueError):
+        import_snapshot(path, contest_id="2025")
+
+
+def _novos_jogadores(sheet, n=3):
+    base = len(sheet.tabs["jogadores"].values)
+    sheet.tabs["jogadores"].values += [[str(base + i), f"Novo {base + i}", ""] for i in range(n)]
+
+
+def test_gravacao_recusa_snapshot_do_fallback(planilha, monkeypatch):
+    backup_current()
+    _novos_jogadores(planilha)
+
+    def instavel(self):
+        raise QuotaExceeded("429: cota excedida")
+
+    original = MemoryWorksheet.get_values
+    monkeypatch.setattr(MemoryWorksheet, "get_values", instavel)
+    reset_caches()
+    assert mb.get_snapshot().source == "fallback"
+    with pytest.raises(mb.SheetReadError):
+        mb.add_player("Maria")
+
+    monkeypatch.setattr(MemoryWorksheet, "get_values", original)
+    nomes = [r[1] for r in planilha.tabs["jogadores"].values]
+    assert "Maria" not in nomes and nomes[-3:] == ["Novo 12", "Novo 13", "Novo 14"]
+
+
+def test_gravacao_parte_da_planilha_e_nao_do_cache(planilha):
+    antes = mb.get_snapshot()            # snapshot em cache, sem os jogadores novos
+    _novos_jogadores(planilha)
+    mb.add_player("Maria")
+    nomes = [r[1] for r in planilha.tabs["jogadores"].values[1:]]
+    assert len(nomes) == len(antes.player_map) + 4
+    assert nomes[-4:] == ["Novo 12", "Novo 13", "Novo 14", "Maria"]
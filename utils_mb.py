@@ -1,40 +1,114 @@
 import pandas as pd
 import streamlit as st
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime
+import os
+import time
+import threading
 import uuid
 import ast
-from itertools import combinations
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from functools import lru_cache
+from itertools import zip_longest
+import hashlib
+import unicodedata
+from collections.abc import Mapping
+from decimal import Decimal, InvalidOperation
+from dataclasses import dataclass, fields
+from types import MappingProxyType
+from math import comb
+import numpy as np
+
+# gspread / oauth2client são importados só na hora de conectar (cold start mais rápido)
 
 # --- CONFIGURAÇÃO ---
 SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
 SHEET_NAME = "DB_Bolao_Mega" 
+# Id da planilha (trecho da URL). Também pode vir de "sheet_key" nos secrets.
+# Abrir pelo id evita a busca por nome no Drive a cada reconexão.
+SHEET_KEY = os.environ.get("BOLAO_SHEET_KEY", "")
+HTTP_POOL_SIZE = 10
+# Cópia local do estado completo, usada quando o Google está fora ou lento
+SNAPSHOT_FILE = os.environ.get("BOLAO_SNAPSHOT_FILE", "data/bolao_snapshot.npz")
+FETCH_TIMEOUT = 20   # segundos (só vale quando existe SNAPSHOT_FILE)
+TOKEN_REFRESH_SECONDS = 45 * 60   # o token do Google vale 1h
+LIVE_POLL_SECONDS = 10   # modo ao vivo da conferência: no máximo uma leitura de "sorteios" nesse intervalo
 PRICE_PER_GAME = 6.00
+DEZENAS = 60
+# Concurso cujas abas não levam sufixo ("apostas", "contribuicoes")
+LEGACY_CONTEST_ID = "2025"
+ARCHIVE_DIR = os.environ.get("BOLAO_ARCHIVE_DIR", "data/arquivo")
 
-@st.cache_resource
-def get_db_connection():
+# Colunas gravadas na aba "apostas" (na ordem da planilha)
+BET_COLUMNS = ["id", "player_id", "apostador", "numeros", "custo_total", "conferido", "ts", "descricao"]
+
+# Id encontrado pela busca por nome, reaproveitado quando o cache de recursos é limpo
+_found_sheet_key = {}
+
+@lru_cache(maxsize=1)
+def _service_account_config():
+    """Lê credenciais e id da planilha uma única vez por processo."""
     try:
         # Tenta pegar do st.secrets (funciona na nuvem e local se configurado)
         creds_dict = dict(st.secrets["gcp_service_account"])
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, SCOPE)
-        client = gspread.authorize(creds)
+        sheet_key = st.secrets.get("sheet_key", "")
+    except Exception:
+        # Fallback local: lê o secrets.toml manualmente
+        import toml
+        creds_data = toml.load(".streamlit/secrets.toml")
+        creds_dict = creds_data["gcp_service_account"]
+        sheet_key = creds_data.get("sheet_key", "")
+    return creds_dict, sheet_key or SHEET_KEY
+
+def _client_session(client):
+    # gspread >= 6 guarda a sessão HTTP em client.http_client
+    http = getattr(client, "http_client", client)
+    return getattr(http, "session", None)
+
+def _start_token_refresher(session):
+    """Renova o token antes de expirar, em segundo plano, para nenhuma leitura pagar esse round-trip."""
+    def loop():
+        from google.auth.transport.requests import Request
+        while True:
+            time.sleep(TOKEN_REFRESH_SECONDS)
+            try:
+                session.credentials.refresh(Request())
+            except Exception:
+                pass
+    threading.Thread(target=loop, name="bolao-token-refresh", daemon=True).start()
+
+@lru_cache(maxsize=1)
+def _authorized_client():
+    """Cliente gspread autorizado uma vez por processo, com pool de conexões HTTP."""
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+    from requests.adapters import HTTPAdapter
+
+    creds_dict, _ = _service_account_config()
+    creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, SCOPE)
+    client = gspread.authorize(creds)
+    session = _client_session(client)
+    if session is not None:
+        session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=HTTP_POOL_SIZE))
+        if hasattr(session, "credentials"):
+            _start_token_refresher(session)
+    return client
+
+@st.cache_resource
+def get_db_connection():
+    try:
+        client = _authorized_client()
+        _, sheet_key = _service_account_config()
+        sheet_key = sheet_key or _found_sheet_key.get(SHEET_NAME)
+        if sheet_key:
+            return client.open_by_key(sheet_key)
+        # Sem id configurado: busca pelo nome (Drive) uma vez e guarda o id
         sheet = client.open(SHEET_NAME)
+        _found_sheet_key[SHEET_NAME] = sheet.id
         return sheet
     except Exception as e:
-        # Se falhar, tenta procurar o arquivo secrets.toml manualmente (fallback local)
-        try:
-            # Caminho relativo padrão
-            import toml
-            creds_data = toml.load(".streamlit/secrets.toml")
-            creds_dict = creds_data["gcp_service_account"]
-            creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, SCOPE)
-            client = gspread.authorize(creds)
-            sheet = client.open(SHEET_NAME)
-            return sheet
-        except:
-            st.error(f"Erro Conexão: {e}")
-            return None
+        st.error(f"Erro Conexão: {e}")
+        return None
 
 # --- AUXILIARES ---
 def money(val):
@@ -61,18 +135,496 @@ def _to_int_list(data):
     except:
         return []
 
+# --- MÁSCARAS DE BITS ---
+# Cada aposta vira um inteiro: a dezena n liga o bit n-1. Nos arrays a máscara fica em
+# duas palavras de 64 bits, "mascara" (dezenas 1-64) e "mascara_hi" (65-128, ex.: Quina).
+WORD = (1 << 64) - 1
+_POP8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def numbers_to_mask(data):
+    """Converte uma aposta (qualquer formato aceito por _to_int_list) em máscara de bits."""
+    mask = 0
+    for n in _to_int_list(data):
+        if 1 <= n <= 128:
+            mask |= 1 << (n - 1)
+    return mask
+
+def mask_to_numbers(mask):
+    """Inverso de numbers_to_mask: devolve a lista ordenada de dezenas."""
+    mask = int(mask)
+    return [i + 1 for i in range(mask.bit_length()) if mask >> i & 1]
+
+def split_mask(mask):
+    """Máscara inteira -> (palavra baixa, palavra alta)."""
+    return mask & WORD, mask >> 64
+
+def join_mask(lo, hi=0):
+    return int(lo) | int(hi) << 64
+
+def bet_numbers(row):
+    """Dezenas de uma linha de apostas (Series ou dict com "mascara"/"mascara_hi")."""
+    return mask_to_numbers(join_mask(row["mascara"], row.get("mascara_hi", 0)))
+
+def popcount64(arr):
+    """Conta os bits ligados de cada elemento de um array uint64 (vetorizado)."""
+    arr = np.ascontiguousarray(arr, dtype=np.uint64)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(arr).astype(np.uint8)
+    return _POP8[arr.view(np.uint8)].reshape(arr.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+# --- ARMAZENAMENTO COLUNAR DAS APOSTAS ---
+@dataclass(frozen=True)
+class BetStore:
+    """
+    Apostas em colunas tipadas, montadas uma única vez por leitura.
+    Cada posição dos arrays corresponde a uma aposta.
+    """
+    id: np.ndarray            # object (uuid)
+    player_id: np.ndarray     # int32
+    apostador: pd.Categorical
+    mascara: np.ndarray       # uint64 (dezenas 1-64)
+    mascara_hi: np.ndarray    # uint64 (dezenas 65-128)
+    qtd_numeros: np.ndarray   # uint8
+    custo_total: np.ndarray   # float32
+    conferido: np.ndarray     # bool
+    ts: np.ndarray            # object
+    descricao: pd.Categorical
+
+    def __len__(self):
+        return len(self.id)
+
+    @classmethod
+    def from_frame(cls, df):
+        """Reconstrói o store a partir de um DataFrame no formato de to_frame()."""
+        return cls(
+            id=df["id"].astype(str).to_numpy(object),
+            player_id=df["player_id"].to_numpy(np.int32),
+            apostador=pd.Categorical(df["apostador"].astype(str)),
+            mascara=df["mascara"].to_numpy(np.uint64),
+            mascara_hi=(df["mascara_hi"].fillna(0).to_numpy(np.uint64) if "mascara_hi" in df.columns
+                        else np.zeros(len(df), dtype=np.uint64)),
+            qtd_numeros=df["qtd_numeros"].to_numpy(np.uint8),
+            custo_total=df["custo_total"].to_numpy(np.float32),
+            conferido=df["conferido"].to_numpy(bool),
+            ts=df["ts"].astype(str).to_numpy(object),
+            descricao=pd.Categorical(df["descricao"].astype(str)),
+        )
+
+    def to_frame(self, **extra):
+        """DataFrame que referencia os próprios arrays do store (sem cópia)."""
+        return pd.DataFrame({
+            "id": self.id,
+            "player_id": self.player_id,
+            "apostador": self.apostador,
+            "mascara": self.mascara,
+            "mascara_hi": self.mascara_hi,
+            "qtd_numeros": self.qtd_numeros,
+            "custo_total": self.custo_total,
+            "conferido": self.conferido,
+            "ts": self.ts,
+            "descricao": self.descricao,
+            **extra,
+        }, copy=False)
+
+# --- CONVERSÃO VETORIZADA DAS CÉLULAS (strings cruas da planilha) ---
+def _bool_column(series):
+    return series.astype(str).str.upper().isin(["TRUE", "VERDADEIRO", "1", "SIM"]).to_numpy(bool)
+
+_THOUSANDS = re.compile(r"-?\d{1,3}(\.\d{3})+")   # "1.200", "850.000.000": ponto de milhar, sem centavos
+
+def _money_column(series, fill=0.0):
+    """ "R$ 1.234,56", "50,00", "1.200", "50.5" ou 50 -> float64 (mesmas regras de parse_money)."""
+    s = series.astype(str).str.replace(r"[R$\s]", "", regex=True)
+    br = s.str.contains(",", regex=False) | s.str.fullmatch(_THOUSANDS.pattern)
+    s = s.where(~br, s.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    return pd.to_numeric(s, errors="coerce").fillna(fill).to_numpy(np.float64)
+
+def parse_money(valor):
+    """ "R$ 1.234,56", "1.200", "-50,00", "(50,00)", "50.5" ou número -> Decimal (None se não for valor)."""
+    if isinstance(valor, (int, float, Decimal)):
+        return Decimal(str(valor))
+    s = re.sub(r"[R$\s]", "", str(valor or ""))
+    negativo = s.startswith("(") and s.endswith(")")
+    s = s.strip("()")
+    if s[-1:].upper() in ("C", "D"):                # "50,00 D" em alguns bancos
+        negativo, s = negativo or s[-1].upper() == "D", s[:-1]
+    if "," in s or _THOUSANDS.fullmatch(s):
+        s = s.replace(".", "").replace(",", ".")
+    try:
+        d = Decimal(s)
+    except InvalidOperation:
+        return None
+    return -d if negativo else d
+
+def _id_column(series):
+    """Ids numéricos ("3", "3.0", 3); vazio ou inválido vira 0."""
+    return pd.to_numeric(series, errors="coerce").fillna(0).to_numpy(np.int64)
+
+def _mask_columns(series):
+    """Coluna "numeros" (texto) -> (mascara, mascara_hi) uint64, sem laço por linha."""
+    n = len(series)
+    lo, hi = np.zeros(n, dtype=np.uint64), np.zeros(n, dtype=np.uint64)
+    found = series.reset_index(drop=True).astype(str).str.extractall(r"(\d+)")[0]
+    if found.empty:
+        return lo, hi
+    rows = found.index.get_level_values(0).to_numpy()
+    nums = pd.to_numeric(found, errors="coerce").fillna(0).to_numpy(np.int64)
+    ok = (nums >= 1) & (nums <= 128)
+    rows, bits = rows[ok], (nums[ok] - 1).astype(np.uint64)
+    low = bits < 64
+    one = np.uint64(1)
+    np.bitwise_or.at(lo, rows[low], np.left_shift(one, bits[low]))
+    np.bitwise_or.at(hi, rows[~low], np.left_shift(one, bits[~low] - np.uint64(64)))
+    return lo, hi
+
+def build_bet_store(df):
+    """Monta o BetStore a partir das colunas cruas da aba "apostas"."""
+    n = len(df)
+    def col(c):
+        return df[c] if c in df.columns else pd.Series([""] * n, index=df.index, dtype=object)
+
+    mascara, mascara_hi = _mask_columns(col("numeros"))
+    return BetStore(
+        id=col("id").astype(str).to_numpy(object),
+        player_id=_id_column(col("player_id")).astype(np.int32),
+        apostador=pd.Categorical(col("apostador").astype(str)),
+        mascara=mascara,
+        mascara_hi=mascara_hi,
+        qtd_numeros=popcount64(mascara) + popcount64(mascara_hi),
+        custo_total=_money_column(col("custo_total")).astype(np.float32),
+        conferido=_bool_column(col("conferido")),
+        ts=col("ts").astype(str).to_numpy(object),
+        descricao=pd.Categorical(col("descricao").astype(str)),
+    )
+
+def bet_sheet_frame(raw):
+    """
+    Aba "apostas" crua -> DataFrame tipado para reescrever a aba (to_frame), levando junto
+    o texto original de "numeros" e as colunas que o app não conhece, para que
+    save_to_sheet as devolva como estavam.
+    """
+    store = build_bet_store(raw)
+    proprias = set(store.to_frame().columns)
+    extra = {c: raw[c].to_numpy(object) for c in raw.columns if c == "numeros" or c not in proprias}
+    return store.to_frame(**extra)
+
 # --- LEITURA ---
+SNAPSHOT_TABS = ("jogadores", "apostas", "contribuicoes")
+
+def _columns_frame(values):
+    """
+    Valores crus da aba (lista de linhas, 1ª = cabeçalho) -> DataFrame montado coluna a
+    coluna: transpõe uma vez com zip_longest, sem criar um dict por linha.
+    """
+    if not values:
+        return pd.DataFrame()
+    header = [str(h).strip() for h in values[0]]
+    body = values[1:]
+    if not body:
+        return pd.DataFrame(columns=[h for h in header if h])
+    cols = zip_longest(*body, fillvalue="")
+    data = {}
+    for name, col in zip_longest(header, cols, fillvalue=None):
+        if name and col is not None:
+            data[name] = np.array(col, dtype=object)
+    n = len(body)
+    for name in header:
+        if name and name not in data:  # coluna sem nenhuma célula preenchida
+            data[name] = np.full(n, "", dtype=object)
+    return pd.DataFrame(data, copy=False)
+
+def _fetch_columns(sh, tab_name):
+    try:
+        return _columns_frame(sh.worksheet(tab_name).get_values())
+    except: pass
+    return pd.DataFrame()
+
+class SheetReadError(RuntimeError):
+    """A leitura da planilha falhou: nada pode ser gravado por cima do que não foi lido."""
+
+def read_tab(tab_name):
+    """
+    Lê a aba direto da planilha, sem cache e sem cópia local (usado antes de reescrever
+    uma aba). Devolve (DataFrame, existe); levanta SheetReadError em qualquer falha.
+    """
+    sh = get_db_connection()
+    if not sh:
+        raise SheetReadError("sem conexão com a planilha")
+    import gspread
+    try:
+        values = sh.worksheet(tab_name).get_values()
+    except gspread.exceptions.WorksheetNotFound:
+        return pd.DataFrame(), False  # aba de concurso novo: criada na primeira gravação
+    except Exception as e:
+        raise SheetReadError(f"falha ao ler a aba {tab_name}: {e}") from e
+    return _columns_frame(values), True
+
+def read_tab_strict(tab_name, known_rows=0):
+    """
+    read_tab para quem vai reescrever a aba: também desconfia de uma leitura vazia
+    quando a aba existe sem cabeçalho ou tinha `known_rows` linhas no último snapshot.
+    Aba que ainda não existe volta vazia (concurso novo).
+    """
+    raw, existe = read_tab(tab_name)
+    if existe and raw.empty and (len(raw.columns) == 0 or known_rows > 0):
+        raise SheetReadError(f"aba {tab_name} voltou vazia (antes tinha {known_rows} linhas)")
+    return raw
+
 @st.cache_data(ttl=60)
 def load_data(tab_name):
     sh = get_db_connection()
     if sh:
-        try:
-            return pd.DataFrame(sh.worksheet(tab_name).get_all_records())
-        except: pass
+        return _fetch_columns(sh, tab_name)
     return pd.DataFrame()
 
-def load_players():
-    df = load_data("jogadores")
+def _fetch_snapshot_tabs(contest, timeout=None):
+    """
+    Baixa as abas do snapshot (só a partição do concurso) em paralelo, usando o mesmo
+    cliente autorizado. As apostas já são convertidas para o BetStore enquanto as outras
+    abas ainda chegam, então o tempo total fica perto do da aba mais lenta.
+    Com timeout, levanta FuturesTimeout se alguma aba não chegar a tempo.
+    """
+    raw = {tab: pd.DataFrame() for tab in SNAPSHOT_TABS}
+    store = None
+    sh = get_db_connection()
+    if sh:
+        pool = ThreadPoolExecutor(max_workers=len(SNAPSHOT_TABS))
+        try:
+            futures = {pool.submit(_fetch_columns, sh, contest.tab(tab)): tab for tab in SNAPSHOT_TABS}
+            for fut in as_completed(futures, timeout=timeout):
+                tab = futures[fut]
+                raw[tab] = fut.result()
+                if tab == "apostas":
+                    store = build_bet_store(raw[tab])
+        finally:
+            # Não espera downloads atrasados: a thread termina sozinha depois
+            pool.shutdown(wait=False)
+    return raw, store
+
+# --- LOTERIAS ---
+@dataclass(frozen=True)
+class LotteryRules:
+    """
+    Regras de uma loteria. O jogo simples tem `sorteadas` dezenas; apostas maiores
+    (até `max_dezenas`) valem por todos os jogos simples contidos nelas.
+    `faixas` lista (acertos, chave, rótulo) da faixa principal para a menor.
+    """
+    key: str
+    nome: str
+    universo: int
+    sorteadas: int
+    max_dezenas: int
+    faixas: tuple
+    preco_base: float
+
+    def price(self, qtd, base=None):
+        """Preço de uma aposta com `qtd` dezenas (0 se o tamanho não é aceito)."""
+        if qtd < self.sorteadas or qtd > self.max_dezenas:
+            return 0.0
+        return comb(qtd, self.sorteadas) * (self.preco_base if base is None else base)
+
+LOTTERIES = {
+    "megasena": LotteryRules("megasena", "Mega-Sena", 60, 6, 20,
+                             ((6, "senas", "Sena"), (5, "quinas", "Quina"), (4, "quadras", "Quadra")), PRICE_PER_GAME),
+    "quina": LotteryRules("quina", "Quina", 80, 5, 15,
+                          ((5, "quinas", "Quina"), (4, "quadras", "Quadra"), (3, "ternos", "Terno"), (2, "duques", "Duque")), 3.00),
+    "lotofacil": LotteryRules("lotofacil", "Lotofácil", 25, 15, 20,
+                              tuple((t, f"pontos_{t}", f"{t} pontos") for t in range(15, 10, -1)), 3.50),
+}
+MEGA_SENA = LOTTERIES["megasena"]
+
+# Estimativa padrão dos prêmios das três faixas principais (a mesma da página pública)
+PRIZE_ESTIMATES = (850000000.0, 55000.0, 1200.0)
+
+def default_prizes(rules=MEGA_SENA):
+    """{chave da faixa: valor estimado} para as faixas principais de `rules`."""
+    return {key: valor for (_, key, _), valor in zip(rules.faixas, PRIZE_ESTIMATES)}
+
+def _normalize_text(text):
+    """Minúsculas, sem acentos e sem espaços nas pontas (para comparar nomes)."""
+    text = unicodedata.normalize("NFKD", str(text))
+    return "".join(ch for ch in text if not unicodedata.combining(ch)).strip().lower()
+
+def get_rules(key):
+    return LOTTERIES.get(_normalize_text(key).replace("-", "").replace(" ", ""), MEGA_SENA)
+
+@lru_cache(maxsize=None)
+def _comb_table(size):
+    """C[a, b] = combinações de a tomadas b, para 0 <= a, b <= size."""
+    table = np.zeros((size + 1, size + 1), dtype=np.int64)
+    for a in range(size + 1):
+        for b in range(a + 1):
+            table[a, b] = comb(a, b)
+    table.setflags(write=False)
+    return table
+
+def score_masks(lo, hi, draw_lo, draw_hi, rules=MEGA_SENA):
+    """
+    Pontuação vetorizada de apostas (máscaras lo/hi) contra sorteios, para qualquer loteria.
+    Segue o broadcasting do NumPy: apostas (N,) contra um sorteio escalar dá arrays (N,);
+    sorteios (D, 1) contra apostas (N,) dá matrizes D x N.
+    Devolve {"acertos": ..., <chave da faixa>: jogos simples premiados na faixa}.
+
+    Desdobramento: uma aposta com n dezenas e h acertos contém exatamente
+    C(h, t) * C(n - h, k - t) jogos simples de k dezenas com t acertos.
+    """
+    lo, hi = np.asarray(lo, dtype=np.uint64), np.asarray(hi, dtype=np.uint64)
+    draw_lo, draw_hi = np.asarray(draw_lo, dtype=np.uint64), np.asarray(draw_hi, dtype=np.uint64)
+    hits = popcount64(lo & draw_lo) + popcount64(hi & draw_hi)
+    n = popcount64(lo) + popcount64(hi)
+    k, top = rules.sorteadas, rules.max_dezenas
+    table = _comb_table(top)
+    valid = (n >= k) & (n <= top)
+    h = hits.astype(np.intp)
+    rest = np.minimum(n, top).astype(np.intp) - h
+    out = {"acertos": hits}
+    for t, key, _ in rules.faixas:
+        out[key] = np.where(valid, table[h, t] * table[rest, k - t], 0)
+    return out
+
+def draw_masks(numbers):
+    """Dezenas sorteadas -> (palavra baixa, palavra alta) como np.uint64."""
+    lo, hi = split_mask(numbers_to_mask(numbers))
+    return np.uint64(lo), np.uint64(hi)
+
+def random_draw_masks(rng, count, rules=MEGA_SENA):
+    """`count` sorteios aleatórios (sem reposição) já como máscaras (lo, hi) uint64."""
+    keys = rng.random((count, rules.universo))
+    idx = np.argpartition(keys, rules.sorteadas - 1, axis=1)[:, :rules.sorteadas].astype(np.uint64)
+    one, zero = np.uint64(1), np.uint64(0)
+    low = idx < 64
+    lo_bits = np.where(low, np.left_shift(one, np.where(low, idx, zero)), zero)
+    hi_bits = np.where(low, zero, np.left_shift(one, np.where(low, zero, idx - np.uint64(64))))
+    return np.bitwise_or.reduce(lo_bits, axis=1), np.bitwise_or.reduce(hi_bits, axis=1)
+
+def score_bets(store, draw_numbers, rules=MEGA_SENA):
+    """Pontua todas as apostas de um BetStore contra um sorteio."""
+    return score_masks(store.mascara, store.mascara_hi, *draw_masks(draw_numbers), rules)
+
+# --- CONCURSOS ---
+@dataclass(frozen=True)
+class Contest:
+    """
+    Configuração de um concurso. Apostas e contribuições de cada concurso ficam em
+    abas próprias ("apostas_<id>", "contribuicoes_<id>"); o concurso legado usa as
+    abas sem sufixo. A lista vem da aba opcional "concursos".
+    """
+    id: str
+    nome: str
+    valor_cota: float = 50.00
+    jogos_por_cota: int = 5
+    custo_individual: float = 30.00   # parte da cota que vira jogos individuais
+    preco_jogo: float = None          # None = preço oficial da loteria
+    ativo: bool = True
+    arquivado: bool = False
+    loteria: str = "megasena"
+
+    @property
+    def rules(self):
+        return get_rules(self.loteria)
+
+    def tab(self, base):
+        if base == "jogadores" or self.id == LEGACY_CONTEST_ID:
+            return base
+        return f"{base}_{self.id}"
+
+    def price(self, qtd):
+        """Preço de uma aposta com `qtd` dezenas (desdobramento em jogos simples)."""
+        return self.rules.price(qtd, self.preco_jogo)
+
+DEFAULT_CONTEST = Contest(id=LEGACY_CONTEST_ID, nome="Bolão 2025")
+
+def _num(val, default):
+    val = _money_column(pd.Series([val], dtype=object), fill=np.nan)[0]
+    return default if pd.isna(val) else float(val)
+
+@st.cache_data(ttl=300)
+def list_contests():
+    df = load_data("concursos")
+    if df.empty:
+        return (DEFAULT_CONTEST,)
+    df.columns = df.columns.str.strip().str.lower()
+    def flags(c):
+        return _bool_column(df[c]) if c in df.columns else np.zeros(len(df), dtype=bool)
+    ativos, arquivados = flags("ativo"), flags("arquivado")
+    contests = []
+    for i, (_, r) in enumerate(df.iterrows()):
+        cid = str(r.get("id", "")).strip()
+        if not cid:
+            continue
+        contests.append(Contest(
+            id=cid,
+            nome=str(r.get("nome", "") or f"Bolão {cid}"),
+            valor_cota=float(_num(r.get("valor_cota"), DEFAULT_CONTEST.valor_cota)),
+            jogos_por_cota=int(_num(r.get("jogos_por_cota"), DEFAULT_CONTEST.jogos_por_cota)),
+            custo_individual=float(_num(r.get("custo_individual"), DEFAULT_CONTEST.custo_individual)),
+            preco_jogo=_num(r.get("preco_jogo"), None),
+            ativo=bool(ativos[i]),
+            arquivado=bool(arquivados[i]),
+            loteria=get_rules(r.get("loteria", "") or "megasena").key,
+        ))
+    return tuple(contests) or (DEFAULT_CONTEST,)
+
+def get_contest(contest_id=None):
+    """Concurso pelo id; sem id, o último marcado como ativo (ou o legado)."""
+    contests = list_contests()
+    if contest_id:
+        for c in contests:
+            if c.id == str(contest_id):
+                return c
+    ativos = [c for c in contests if c.ativo and not c.arquivado]
+    return ativos[-1] if ativos else contests[-1]
+
+def contest_archive_path(contest_id):
+    return os.path.join(ARCHIVE_DIR, f"concurso_{contest_id}.npz")
+
+def _fallback_path(contest):
+    if contest.id == LEGACY_CONTEST_ID:
+        return SNAPSHOT_FILE
+    root, ext = os.path.splitext(SNAPSHOT_FILE)
+    return f"{root}_{contest.id}{ext}"
+
+# --- SORTEIOS (aba "sorteios": concurso, dezenas, ts) ---
+def load_draws(contest_id=None):
+    contest = get_contest(contest_id)
+    df = load_data("sorteios")
+    if df.empty or "concurso" not in df.columns:
+        return []
+    df = df[df["concurso"].astype(str) == contest.id]
+    return [{"dezenas": _to_int_list(r["dezenas"]), "ts": str(r.get("ts", ""))} for _, r in df.iterrows()]
+
+@st.cache_data(ttl=LIVE_POLL_SECONDS, show_spinner=False)
+def latest_draw(contest_id=None):
+    """Último sorteio lançado do concurso (modo ao vivo); relido da planilha a cada LIVE_POLL_SECONDS."""
+    contest = get_contest(contest_id)
+    sh = get_db_connection()
+    df = _fetch_columns(sh, "sorteios") if sh else pd.DataFrame()
+    if df.empty or "concurso" not in df.columns:
+        return None
+    df = df[df["concurso"].astype(str) == contest.id]
+    if df.empty:
+        return None
+    r = df.iloc[-1]
+    return {"dezenas": _to_int_list(r["dezenas"]), "ts": str(r.get("ts", ""))}
+
+def save_draw(numeros, contest_id=None):
+    contest = get_contest(contest_id)
+    # Reescreve a aba inteira: a base vem de uma leitura estrita (levanta SheetReadError)
+    df = read_tab_strict("sorteios", len(load_data("sorteios")))
+    new_row = {"concurso": contest.id, "dezenas": str(sorted(int(n) for n in numeros)),
+               "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+    df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
+    ok = save_to_sheet("sorteios", df)
+    if ok:
+        # Página estática do resultado (estatico_mb); se falhar aqui, `cli_mb.py publicar` regera
+        try:
+            from estatico_mb import publish_result
+            publish_result(get_snapshot(contest.id), numeros)
+        except Exception:
+            pass
+    return ok
+
+def _prepare_players(df):
     if not df.empty:
         # Normaliza colunas para evitar erros de caixa alta/baixa
         df.columns = df.columns.str.strip().str.lower()
@@ -82,57 +634,238 @@ def load_players():
         if c not in df.columns: df[c] = ""
             
     if "player_id" in df.columns:
-        df["player_id"] = pd.to_numeric(df["player_id"], errors='coerce').fillna(0).astype(int)
+        df["player_id"] = _id_column(df["player_id"])
     
     return df[req] if not df.empty else pd.DataFrame(columns=req)
 
-def load_bets():
-    df = load_data("apostas")
-    req = ["id", "player_id", "apostador", "numeros", "custo_total", "conferido", "ts", "descricao"]
-    
-    if df.empty: 
-        return pd.DataFrame(columns=req)
-        
-    for c in req:
-        if c not in df.columns: df[c] = ""
-    
-    if "conferido" in df.columns:
-        df["conferido"] = df["conferido"].astype(str).str.upper().isin(["TRUE", "VERDADEIRO", "1", "SIM"])
-    
-    if "numeros" in df.columns:
-        df["qtd_numeros"] = df["numeros"].apply(lambda x: len(_to_int_list(x)))
-    
-    df["n_jogos"] = 1
-    return df
+def _name_lookup(players):
+    """Array id -> nome (posição = player_id), para trocar merges por indexação."""
+    ids = players["player_id"].to_numpy(np.int64) if not players.empty else np.zeros(0, dtype=np.int64)
+    ok = ids >= 0
+    names = np.full(int(ids[ok].max()) + 1 if ok.any() else 0, None, dtype=object)
+    names[ids[ok]] = players["nome"].to_numpy(object)[ok]
+    return names
+
+def _names_for(ids, lookup, default):
+    """Nome de cada id via `lookup`; ids fora da tabela (ou sem nome) recebem `default` (escalar ou array)."""
+    ids = np.asarray(ids, dtype=np.int64)
+    inside = (ids >= 0) & (ids < len(lookup))
+    found = np.full(len(ids), None, dtype=object)
+    found[inside] = lookup[ids[inside]]
+    return np.where(pd.isna(found), default, found).astype(object)
 
-def load_contributions():
-    df = load_data("contribuicoes")
+def _prepare_contributions(df, players, lookup=None):
     if df.empty: return pd.DataFrame(columns=["id", "player_id", "valor", "pago", "ts", "nome", "obs"])
     
     if "pago" in df.columns:
-        df["pago"] = df["pago"].astype(str).str.upper().isin(["TRUE", "VERDADEIRO", "1", "SIM"])
+        df["pago"] = _bool_column(df["pago"])
+    if "valor" in df.columns:
+        df["valor"] = _money_column(df["valor"])
     if "data" in df.columns: df = df.rename(columns={"data": "ts"})
     if "id" in df.columns and "contrib_id" not in df.columns: df["contrib_id"] = df["id"]
         
-    players = load_players()
     if not players.empty and "player_id" in df.columns:
-        df["player_id"] = pd.to_numeric(df["player_id"], errors='coerce').fillna(0).astype(int)
-        # Faz o merge para garantir que temos o nome atualizado
-        df = df.merge(players[["player_id", "nome"]], on="player_id", how="left")
-        df["nome"] = df["nome"].fillna("Desconhecido")
+        df["player_id"] = _id_column(df["player_id"])
+        # Nome atualizado pelo id (indexação no array id -> nome, sem merge)
+        lookup = _name_lookup(players) if lookup is None else lookup
+        df["nome"] = _names_for(df["player_id"], lookup, "Desconhecido")
     elif "nome" not in df.columns:
         df["nome"] = "Desconhecido"
         
     return df
 
+def _find_fund(players):
+    """Retorna (player_id, nome) do jogador que representa o Fundo do bolão."""
+    for pid, nome in zip(players["player_id"], players["nome"]):
+        if "fundo" in str(nome).lower():
+            return int(pid), str(nome)
+    return 0, "Fundo Bolão"
+
+# --- SNAPSHOT COMPARTILHADO (TODAS AS SESSÕES) ---
+def _readonly(arr):
+    arr = np.asarray(arr)
+    arr.setflags(write=False)
+    return arr
+
+def _frozen_columns(df):
+    """Colunas do DataFrame como arrays somente leitura (categorias ficam como estão)."""
+    cols = {}
+    for c in df.columns:
+        if isinstance(df[c].dtype, pd.CategoricalDtype):
+            cols[c] = df[c].array
+        else:
+            cols[c] = _readonly(df[c].to_numpy(copy=True))
+    return cols
+
+def _data_version(*frames):
+    h = hashlib.blake2b(digest_size=8)
+    for df in frames:
+        h.update(",".join(map(str, df.columns)).encode())
+        if not df.empty:
+            h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+def _number_frequency(store, universo=DEZENAS):
+    freq = np.zeros(universo, dtype=np.int32)
+    for i in range(universo):
+        word = store.mascara if i < 64 else store.mascara_hi
+        freq[i] = np.count_nonzero(word & np.uint64(1 << (i % 64)))
+    return freq
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    Foto imutável das três abas, compartilhada por todas as sessões via cache_resource.
+    Os arrays são somente leitura; cada página recebe DataFrames novos que apontam
+    para eles (sem cópia), então colunas extras ficam só na sessão que as criou.
+
+    `source` diz de onde a foto veio: "planilha" (leitura normal), "fallback" (cópia
+    local usada porque o Google falhou), "arquivo" (.npz importado) ou "fila" (planilha
+    com as operações pendentes de fila_mb aplicadas por cima).
+    """
+    version: str
+    bets: BetStore
+    players: dict
+    contributions: dict
+    bet_nome: np.ndarray        # nome atual do dono de cada aposta
+    freq_dezenas: np.ndarray    # int32[universo]: quantas apostas têm cada dezena
+    player_map: Mapping
+    pagamentos: Mapping         # player_id -> total pago
+    jogos_por_pessoa: Mapping   # player_id -> qtd de apostas
+    fund_id: int
+    fund_name: str
+    contest: Contest = DEFAULT_CONTEST
+    source: str = "planilha"
+
+    def bets_frame(self):
+        return self.bets.to_frame(nome=self.bet_nome)
+
+    def score(self, draw_numbers):
+        """Pontua todas as apostas do concurso contra um sorteio (ver score_masks)."""
+        return score_bets(self.bets, draw_numbers, self.contest.rules)
+
+    def players_frame(self):
+        return pd.DataFrame(self.players, copy=False)
+
+    def contributions_frame(self):
+        return pd.DataFrame(self.contributions, copy=False)
+
+def build_snapshot(raw_players, raw_bets, raw_contrib, store=None, contest=DEFAULT_CONTEST):
+    version = _data_version(raw_players, raw_bets, raw_contrib)
+    players = _prepare_players(raw_players)
+    lookup = _name_lookup(players)
+    contrib = _prepare_contributions(raw_contrib, players, lookup)
+    if store is None:
+        store = build_bet_store(raw_bets)
+    return _assemble_snapshot(version, players, contrib, store, contest, lookup)
+
+def _assemble_snapshot(version, players, contrib, store, contest=DEFAULT_CONTEST, lookup=None, source="planilha"):
+    """Calcula os dados derivados e congela tudo (usado também ao importar um arquivo)."""
+    player_map = dict(zip(players["player_id"].astype(int).tolist(), players["nome"].tolist()))
+    lookup = _name_lookup(players) if lookup is None else lookup
+    bet_nome = _names_for(store.player_id, lookup, np.asarray(store.apostador, dtype=object))
+
+    pagamentos = {}
+    if not contrib.empty and {"player_id", "pago"} <= set(contrib.columns):
+        pagos = contrib[contrib["pago"] == True]
+        pagamentos = {int(k): float(v) for k, v in pagos.groupby("player_id")["valor"].sum().items()}
+    pids, counts = np.unique(store.player_id, return_counts=True)
+
+    for f in fields(store):
+        v = getattr(store, f.name)
+        if isinstance(v, np.ndarray):
+            v.setflags(write=False)
+
+    fund_id, fund_name = _find_fund(players)
+    return Snapshot(
+        version=version,
+        bets=store,
+        players=_frozen_columns(players),
+        contributions=_frozen_columns(contrib),
+        bet_nome=_readonly(bet_nome),
+        freq_dezenas=_readonly(_number_frequency(store, contest.rules.universo)),
+        player_map=MappingProxyType(player_map),
+        pagamentos=MappingProxyType(pagamentos),
+        jogos_por_pessoa=MappingProxyType({int(p): int(c) for p, c in zip(pids, counts)}),
+        fund_id=fund_id,
+        fund_name=fund_name,
+        contest=contest,
+        source=source,
+    )
+
+@st.cache_resource(ttl=60)
+def _remote_snapshot(contest_id):
+    contest = get_contest(contest_id)
+    # Concursos arquivados são lidos do arquivo compactado, sem tocar na planilha
+    archive = contest_archive_path(contest.id)
+    if contest.arquivado and os.path.exists(archive):
+        from snapshot_mb import import_snapshot
+        return import_snapshot(archive, contest_id=contest.id)
+
+    # Se o Google cair ou demorar, usa a última cópia local (ver snapshot_mb.export_snapshot)
+    fallback = _fallback_path(contest)
+    has_fallback = os.path.exists(fallback)
+    try:
+        raw, store = _fetch_snapshot_tabs(contest, timeout=FETCH_TIMEOUT if has_fallback else None)
+    except FuturesTimeout:
+        raw, store = None, None
+    if has_fallback and (raw is None or all(df.empty for df in raw.values())):
+        from snapshot_mb import import_snapshot
+        try:
+            return import_snapshot(fallback, contest_id=contest.id, source="fallback")
+        except ValueError:
+            pass  # cópia de outro concurso (ou formato incompatível): não serve de fallback
+    if raw is None:
+        raw, store = {tab: pd.DataFrame() for tab in SNAPSHOT_TABS}, None
+    return build_snapshot(raw["jogadores"], raw["apostas"], raw["contribuicoes"], store=store, contest=contest)
+
+def get_snapshot(contest_id=None):
+    """Snapshot do concurso (o ativo, se não informado) com as escritas da fila (fila_mb) já aplicadas."""
+    from fila_mb import with_pending  # import tardio: fila_mb importa este módulo
+    return with_pending(_remote_snapshot(get_contest(contest_id).id))
+
+# Leitores usados nas rotinas de escrita: a aba é lida direto da planilha (nunca do
+# cache nem da cópia local), porque o que voltar aqui é reescrito por cima dela.
+def _write_base(contest):
+    """Snapshot remoto só para conferir a origem e quantas linhas cada aba tinha."""
+    snap = _remote_snapshot(contest.id)
+    if snap.source == "fallback":
+        raise SheetReadError("planilha indisponível (usando a cópia local): nada foi gravado")
+    return snap
+
+def load_players():
+    snap = _write_base(get_contest())
+    return _prepare_players(read_tab_strict("jogadores", len(snap.player_map)))
+
+def load_bets(contest_id=None):
+    """Apostas já tipadas; as dezenas ficam na coluna "mascara" (ver mask_to_numbers)."""
+    contest = get_contest(contest_id)
+    snap = _write_base(contest)
+    return bet_sheet_frame(read_tab_strict(contest.tab("apostas"), len(snap.bets)))
+
+def load_contributions(contest_id=None):
+    contest = get_contest(contest_id)
+    snap = _write_base(contest)
+    c = snap.contributions
+    raw = read_tab_strict(contest.tab("contribuicoes"), len(c["player_id"]) if "player_id" in c else 0)
+    return _prepare_contributions(raw, snap.players_frame())
+
 # --- SALVAMENTO BLINDADO (FIX JSON) ---
+def _get_or_create_worksheet(sh, tab_name):
+    # Abas de concursos novos ("apostas_<id>") são criadas na primeira gravação
+    import gspread
+    try:
+        return sh.worksheet(tab_name)
+    except gspread.exceptions.WorksheetNotFound:
+        return sh.add_worksheet(title=tab_name, rows=100, cols=12)
+
 def save_to_sheet(tab_name, df):
     if df is None or df.empty:
         if tab_name == "jogadores": return 
     
     sh = get_db_connection()
     if sh:
-        ws = sh.worksheet(tab_name)
+        ws = _get_or_create_worksheet(sh, tab_name)
         df_save = df.copy()
         
         aux_cols = ["qtd_numeros", "n_jogos", "nome", "contrib_id"]
@@ -141,14 +874,33 @@ def save_to_sheet(tab_name, df):
         else:
             df_save = df_save.drop(columns=[c for c in ["qtd_numeros", "n_jogos", "contrib_id"] if c in df_save.columns])
 
+        if "mascara" in df_save.columns:
+            his = df_save["mascara_hi"].fillna(0) if "mascara_hi" in df_save.columns else [0] * len(df_save)
+            numeros = [str(mask_to_numbers(join_mask(lo, hi))) for lo, hi in zip(df_save["mascara"], his)]
+            if "numeros" in df_save.columns:
+                # Texto que não virou nenhuma dezena volta como estava, e não como "[]"
+                lidas = [n != "[]" for n in numeros]
+                numeros = np.where(lidas, numeros, df_save["numeros"].fillna("").astype(str))
+            df_save["numeros"] = numeros
+            df_save["custo_total"] = df_save["custo_total"].astype(float).round(2)
+            # Colunas que o app não conhece seguem depois das dele, na ordem da planilha
+            extras = [c for c in df_save.columns if c not in BET_COLUMNS and c not in ("mascara", "mascara_hi")]
+            df_save = df_save[[c for c in BET_COLUMNS if c in df_save.columns] + extras]
+
         for c in ["conferido", "pago"]:
             if c in df_save.columns: df_save[c] = df_save[c].astype(str).str.upper()
+
+        for c in df_save.select_dtypes("category").columns:
+            df_save[c] = df_save[c].astype(object)
             
         df_save = df_save.fillna("") 
             
         ws.clear()
         ws.update([df_save.columns.values.tolist()] + df_save.values.tolist())
         st.cache_data.clear()
+        _remote_snapshot.clear()
+        return True
+    return False
 
 def save_players(df): save_to_sheet("jogadores", df)
 def save_bets(df): save_to_sheet("apostas", df)
@@ -189,91 +941,100 @@ def upsert_player(nome):
     save_players(df)
     return int(new_id)
 
-def add_bet(apostador_nome, numeros_lista, custo_manual=None, descricao="Bolão", player_id=0):
-    df = load_bets()
-    custo = 0.0
+# Apostas e contribuições passam pela fila de escrita (fila_mb): a operação é
+# confirmada na hora e gravada na planilha em lote logo depois.
+
+def add_bet(apostador_nome, numeros_lista, custo_manual=None, descricao="Bolão", player_id=0, contest_id=None):
+    from fila_mb import enqueue
+    contest = get_contest(contest_id)
     qtde = len(numeros_lista)
-    if custo_manual: custo = float(custo_manual)
-    else:
-        if qtde == 6: custo = PRICE_PER_GAME
-        elif qtde == 7: custo = 42.00
-        elif qtde == 8: custo = 168.00
-        elif qtde == 9: custo = 504.00
+    custo = float(custo_manual) if custo_manual else contest.price(qtde)
         
     new_row = {
         "id": str(uuid.uuid4()),
         "player_id": int(player_id),
         "apostador": apostador_nome,
-        "numeros": str(sorted(numeros_lista)),
+        "numeros": sorted(int(n) for n in numeros_lista),
         "custo_total": custo,
         "conferido": False,
         "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "descricao": descricao
     }
-    df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-    save_bets(df)
+    enqueue("add_bet", contest.tab("apostas"), {"row": new_row}, contest.id)
 
-def delete_bets(bet_ids):
-    df = load_bets()
-    df = df[~df["id"].isin(bet_ids)]
-    save_bets(df)
+def delete_bets(bet_ids, contest_id=None):
+    from fila_mb import enqueue, row_fingerprint
+    contest = get_contest(contest_id)
+    df = get_snapshot(contest.id).bets.to_frame()
+    ids = [str(i) for i in bet_ids]
+    expected = {str(r["id"]): row_fingerprint(r) for _, r in df[df["id"].isin(ids)].iterrows()}
+    enqueue("delete_bets", contest.tab("apostas"), {"ids": ids, "expected": expected}, contest.id)
 
-def add_contribution(player_id, valor, obs=""):
-    df = load_contributions()
+def add_contribution(player_id, valor, obs="", contest_id=None):
+    from fila_mb import enqueue
+    contest = get_contest(contest_id)
     new_row = {
         "id": str(uuid.uuid4()),
         "player_id": int(player_id),
         "valor": float(valor),
         "pago": True,
         "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "obs": obs
+        "obs": obs,
+        "nome": get_snapshot(contest.id).player_map.get(int(player_id), "Desconhecido"),
     }
-    df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-    save_contributions(df)
-
-def delete_contributions(contrib_ids):
-    df = load_contributions()
-    df = df[~df["id"].isin(contrib_ids)]
-    save_contributions(df)
-
-def toggle_bet_verified(bet_id):
-    df = load_bets()
-    if bet_id in df["id"].values:
-        idx = df[df["id"] == bet_id].index[0]
-        atual = bool(df.at[idx, "conferido"])
-        df.at[idx, "conferido"] = not atual
-        save_bets(df)
-        return True
-    return False
+    enqueue("add_contribution", contest.tab("contribuicoes"), {"row": new_row}, contest.id)
 
-def balances():
-    df_players = load_players()
-    df_bets = load_bets()
-    df_contrib = load_contributions()
-    
-    bal_data = []
-    if df_players.empty: return pd.DataFrame()
+def add_contributions(itens, contest_id=None):
+    """
+    Várias contribuições numa única operação da fila (importação de extrato, ver pix_mb).
+    Cada item: {"player_id", "valor"} e, opcionais, "id", "ts" e "obs". Devolve quantas entraram.
+    """
+    from fila_mb import enqueue
+    contest = get_contest(contest_id)
+    player_map = get_snapshot(contest.id).player_map
+    agora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows = [{
+        "id": str(item.get("id") or uuid.uuid4()),
+        "player_id": int(item["player_id"]),
+        "valor": float(item["valor"]),
+        "pago": True,
+        "ts": item.get("ts") or agora,
+        "obs": item.get("obs", ""),
+        "nome": player_map.get(int(item["player_id"]), "Desconhecido"),
+    } for item in itens]
+    if rows:
+        enqueue("add_contributions", contest.tab("contribuicoes"), {"rows": rows}, contest.id)
+    return len(rows)
 
-    for pid in df_players["player_id"].unique():
-        nome = df_players[df_players["player_id"]==pid]["nome"].iloc[0]
-        
-        credito = 0.0
-        if not df_contrib.empty:
-            df_c = df_contrib[df_contrib["player_id"] == pid]
-            df_c["valor"] = pd.to_numeric(df_c["valor"], errors='coerce').fillna(0)
-            credito = df_c[df_c["pago"] == True]["valor"].sum()
-            
-        debito = 0.0
-        if not df_bets.empty:
-            df_b = df_bets[df_bets["player_id"] == pid]
-            df_b["custo_total"] = pd.to_numeric(df_b["custo_total"], errors='coerce').fillna(0)
-            debito = df_b["custo_total"].sum()
-            
-        bal_data.append({
-            "player_id": pid, "nome": nome,
-            "total_pago": credito, "total_gasto": debito, "saldo": credito - debito
-        })
-    return pd.DataFrame(bal_data)
+def delete_contributions(contrib_ids, contest_id=None):
+    from fila_mb import enqueue, row_fingerprint
+    contest = get_contest(contest_id)
+    df = get_snapshot(contest.id).contributions_frame()
+    ids = [str(i) for i in contrib_ids]
+    expected = {str(r["id"]): row_fingerprint(r) for _, r in df[df["id"].astype(str).isin(ids)].iterrows()}
+    enqueue("delete_contributions", contest.tab("contribuicoes"), {"ids": ids, "expected": expected}, contest.id)
+
+def toggle_bet_verified(bet_id, contest_id=None):
+    from fila_mb import enqueue, row_fingerprint
+    contest = get_contest(contest_id)
+    df = get_snapshot(contest.id).bets.to_frame()
+    match = df[df["id"] == str(bet_id)]
+    if match.empty:
+        return False
+    row = match.iloc[0]
+    enqueue("set_bet_verified", contest.tab("apostas"), {
+        "id": str(bet_id), "conferido": not bool(row["conferido"]), "expected": row_fingerprint(row)
+    }, contest.id)
+    return True
+
+def balances(contest_id=None):
+    """
+    Saldos por jogador a partir do livro razão (razao_mb), sem somar o histórico de novo.
+    É a única definição de saldo: exportação e CLI usam o mesmo livro (ledger_for).
+    """
+    from razao_mb import ledger_for
+    snap = get_snapshot(contest_id)
+    return ledger_for(snap).frame(snap.player_map)
 
 # --- FUNÇÕES DE CONFERÊNCIA (PÚBLICO E ADMIN) ---
 
@@ -286,56 +1047,23 @@ def score_bet_against_draw(bet_data, draw_data):
     hits = set(bet_list).intersection(set(draw_list))
     return len(hits)
 
-def check_bet_results(bet_data, draw_data):
+def check_bet_results(bet_data, draw_data, rules=MEGA_SENA):
     """
-    Calcula prêmios considerando desdobramento (apostas > 6 números).
-    Retorna dict: {'senas': int, 'quinas': int, 'quadras': int, 'best_hits': int}
+    Calcula prêmios considerando desdobramento (apostas maiores que o jogo simples).
+    Retorna dict com a chave de cada faixa + 'best_hits'
+    (na Mega: {'senas': int, 'quinas': int, 'quadras': int, 'best_hits': int}).
     """
-    bet_list = _to_int_list(bet_data)
-    draw_list = _to_int_list(draw_data)
-    draw_set = set(draw_list)
-    
-    # Se a aposta tem menos de 6, não tem como ganhar
-    if len(bet_list) < 6:
-        return {'senas': 0, 'quinas': 0, 'quadras': 0, 'best_hits': 0}
-        
-    # Se for aposta simples (6 números), cálculo direto
-    if len(bet_list) == 6:
-        hits = len(set(bet_list).intersection(draw_set))
-        return {
-            'senas': 1 if hits == 6 else 0,
-            'quinas': 1 if hits == 5 else 0,
-            'quadras': 1 if hits == 4 else 0,
-            'best_hits': hits
-        }
-        
-    # Aposta múltipla: desdobramento matemático
-    results = {'senas': 0, 'quinas': 0, 'quadras': 0, 'best_hits': 0}
-    
-    # 1. Total de acertos brutos da aposta inteira
-    total_hits = len(set(bet_list).intersection(draw_set))
-    results['best_hits'] = total_hits
-    
-    # Se não acertou nem a quadra, sai
-    if total_hits < 4:
-        return results
-        
-    # 2. Desdobramento (Combinação de 6 em 6)
-    for game in combinations(bet_list, 6):
-        hits = len(set(game).intersection(draw_set))
-        if hits == 6: results['senas'] += 1
-        elif hits == 5: results['quinas'] += 1
-        elif hits == 4: results['quadras'] += 1
-        
+    lo, hi = split_mask(numbers_to_mask(bet_data))
+    res = score_masks(np.array([lo], dtype=np.uint64), np.array([hi], dtype=np.uint64), *draw_masks(draw_data), rules)
+    results = {key: int(res[key][0]) for _, key, _ in rules.faixas}
+    # Se a aposta tem menos dezenas que o jogo simples, não tem como ganhar
+    qtd = bin(lo).count("1") + bin(hi).count("1")
+    results['best_hits'] = int(res["acertos"][0]) if qtd >= rules.sorteadas else 0
     return results
 
-def calculate_draw_stats(bets_df, draw_numbers):
-    results = {'quadras': 0, 'quinas': 0, 'senas': 0}
+def calculate_draw_stats(bets_df, draw_numbers, rules=MEGA_SENA):
+    results = {key: 0 for _, key, _ in rules.faixas}
     if bets_df is None or bets_df.empty: return results
-    for _, row in bets_df.iterrows():
-        # Usa a função detalhada para somar tudo
-        res = check_bet_results(row['numeros'], draw_numbers)
-        results['quadras'] += res['quadras']
-        results['quinas'] += res['quinas']
-        results['senas'] += res['senas']
-    return results
+    his = bets_df["mascara_hi"] if "mascara_hi" in bets_df.columns else np.zeros(len(bets_df), dtype=np.uint64)
+    res = score_masks(bets_df["mascara"].to_numpy(np.uint64), np.asarray(his, dtype=np.uint64), *draw_masks(draw_numbers), rules)
+    return {key: int(res[key].sum()) for key in results}